@@ -1,29 +1,88 @@
 #!/usr/bin/env python3
 import time
+_process_started = time.perf_counter()
 import numpy as np
 import sounddevice as sd
 import obsws_python as obs
+from obsws_python.error import OBSSDKTimeoutError
+from websocket import WebSocketException, create_connection
 import threading
-import tkinter as tk
-from tkinter import ttk
 import json
 import os
 import math
 import sys
+import signal
+import argparse
+import types
+import asyncio
+import base64
+import hashlib
+import struct
+import concurrent.futures
+import random
+import logging
+import mimetypes
+from collections import OrderedDict, deque
+from urllib.parse import quote, unquote, urlsplit
 from typing import Optional, Tuple, List, Dict
 
+logging.getLogger("obsws_python").addHandler(logging.NullHandler())
+
 OBS_HOST = "localhost"
 OBS_PORT = 4455
 OBS_PASSWORD = "OBS_Password"
+OBS_PIPELINED = True
+OBS_MAX_IN_FLIGHT = 4
+OBS_REQUEST_TIMEOUT = 5.0
+OBS_HEALTH_INTERVAL = 1.0
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+OUTPUT_BACKEND = "obs"
+OUTPUT_BACKENDS = ["obs", "browser"]
+BROWSER_SOURCE_HOST = "127.0.0.1"
+BROWSER_SOURCE_PORT = 4460
+BROWSER_SOURCE_MAX_BUFFER = 65536
+BROWSER_SOURCE_IMAGES: Dict[str, str] = {}
 
 CLOSED_MOUTH_SOURCE = "Avatar_Closed"
 OPEN_MOUTH_SOURCE = "Avatar_Open"
 AVATAR_BASE_SOURCE = "Avatar_Base"
 
 THRESHOLD = 0.0005
+THRESHOLD_MIN = 0.00001
+THRESHOLD_MAX = 0.01
+ADAPTIVE_THRESHOLD = False
+THRESHOLD_MARGIN_DB = 12.0
+NOISE_FLOOR_QUANTILE = 0.1
+NOISE_FLOOR_RATE_DB = 18.75
+CALIBRATION_SECONDS = 3.0
+VISEME_MODE = False
+VISEME_LOW_BAND = (150.0, 1000.0)
+VISEME_HIGH_BAND = (1000.0, 3500.0)
+VISEME_SWITCH_MARGIN = 0.1
+VISEME_WINDOW_SECONDS = 0.02
+DEFAULT_VISEME_SHAPES = [
+    {"name": "ahh", "source": "Avatar_Ahh", "f1": 720.0, "f2": 1650.0, "brightness": 0.53, "enter": 0.5, "exit": 0.3},
+    {"name": "ee", "source": "Avatar_Ee", "f1": 300.0, "f2": 2450.0, "brightness": 0.33, "enter": 0.5, "exit": 0.3},
+    {"name": "oo", "source": "Avatar_Oo", "f1": 510.0, "f2": 2150.0, "brightness": 0.13, "enter": 0.5, "exit": 0.3},
+]
+VISEME_SHAPES = [dict(shape) for shape in DEFAULT_VISEME_SHAPES]
 MIC_DEVICE_NAME = "Mic/Aux"
+DEVICE_REFRESH_INTERVAL = 5.0
+DEVICE_STALL_SECONDS = 2.0
+DEVICE_RESCAN_MAX_INTERVAL = 60.0
 
 ws = None
+events_ws = None
+obs_output = None
+obs_connected = False
+obs_connecting = False
+obs_link_lost = threading.Event()
+obs_supervisor_thread = None
+obs_supervisor_stop = threading.Event()
+obs_reconnect_state = {"attempt": 0, "next_at": 0.0, "reconnects": 0}
+browser_source = None
+browser_images: Dict[str, str] = {}
 scene = None
 stream = None
 stream_active = False
@@ -31,20 +90,52 @@ lipsync_running = False
 open_item_id = None
 closed_item_id = None
 base_item_id = None
+open_item_scene = None
+closed_item_scene = None
+base_item_scene = None
+viseme_items: List[Tuple[Optional[str], Optional[int]]] = []
+current_viseme = -1
+active_mouth_item = None
+channels: List["Channel"] = []
+channel_streams: Dict[int, object] = {}
+channel_stream_seen: Dict[int, float] = {}
+primary_device_channels: List["Channel"] = []
 device_index = None
+startup_tasks: Dict[str, concurrent.futures.Future] = {}
+startup_timings: Dict[str, float] = {}
+device_watch_thread = None
+device_watch_stop = threading.Event()
+mic_lost = False
+device_recovery = {"delay": DEVICE_REFRESH_INTERVAL, "next_at": 0.0}
 last_warned_scene = None
 current_volume = 0.0
 VOLUME_MULTIPLIER = 1.0
-SMOOTH_FACTOR = 0.2
+GATE_ATTACK_MS = 10.0
+GATE_HOLD_MS = 80.0
+GATE_RELEASE_MS = 60.0
+GATE_CLOSE_RATIO = 0.6
+GATE_SUBBLOCK_MS = 1.0
 mouth_state = 0.0
 CONFIG_FILE = "lipsync_config.json"
 SAMPLE_RATE = 48000
 EQUALIZER_GAINS = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+EQUALIZER_FREQUENCIES = [80.0, 250.0, 500.0, 1000.0, 2000.0, 4000.0, 8000.0]
+EQUALIZER_Q = 1.0
+BLOCK_SIZE = 512
+LATENCY_PROFILE = "balanced"
+LATENCY_PROFILES = {
+    "low": {"blocksize": 0, "latency": "low", "analysis_block": 256},
+    "balanced": {"blocksize": BLOCK_SIZE, "latency": "high", "analysis_block": BLOCK_SIZE},
+    "efficient": {"blocksize": 1024, "latency": "high", "analysis_block": BLOCK_SIZE},
+}
 LIPSYNC_ENABLED = True
 BOBBING_ENABLED = True
 BOBBING_INTENSITY = 5.0
+BOBBING_SPEED_HZ = 4.5
+ANIMATION_FPS = 0.0
+DEFAULT_ANIMATION_FPS = 60.0
+obs_output_fps = None
 bobbing_phase = 0.0
-_original_positions = {}
 
 available_mics = []
 available_scenes = []
@@ -54,11 +145,236 @@ current_mic_name = None
 selected_closed_source = CLOSED_MOUTH_SOURCE
 selected_open_source = OPEN_MOUTH_SOURCE
 selected_base_source = AVATAR_BASE_SOURCE
-ui_warnings = []
+
+class WarningLog:
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._records: "OrderedDict[str, Dict]" = OrderedDict()
+        self._next_seq = 1
+        self.oldest_seq = 1
+        self.version = 0
+
+    def add(self, message: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self.version += 1
+            record = self._records.get(message)
+            if record is not None:
+                record["count"] += 1
+                record["last_seen"] = now
+                record["version"] = self.version
+                return False
+            if len(self._records) >= self.capacity:
+                self._records.popitem(last=False)
+            self._records[message] = {"seq": self._next_seq, "message": message, "count": 1,
+                                      "first_seen": now, "last_seen": now, "version": self.version}
+            self._next_seq += 1
+            self.oldest_seq = next(iter(self._records.values()))["seq"]
+            return True
+
+    def changes_since(self, version: int) -> Tuple[int, int, List[Dict]]:
+        with self._lock:
+            changed = [dict(r) for r in self._records.values() if r["version"] > version]
+            return self.version, self.oldest_seq, changed
+
+    def messages(self) -> List[str]:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.oldest_seq = self._next_seq
+            self.version += 1
+
+warning_log = WarningLog(50)
+
+def format_warning(record: Dict) -> str:
+    text = f"[{time.strftime('%H:%M:%S', time.localtime(record['first_seen']))}] {record['message']}"
+    if record["count"] > 1:
+        text += f" (x{record['count']}, last {time.strftime('%H:%M:%S', time.localtime(record['last_seen']))})"
+    return text
+
+CONFIG_SAVE_DELAY = 0.5
+config_dirty = threading.Event()
+config_dirty_at = 0.0
+config_write_lock = threading.Lock()
+config_writer_thread = None
+config_writer_stop = threading.Event()
+equalizer_lock = threading.Lock()
+equalizer_dirty = threading.Event()
+equalizer_updater_thread = None
+equalizer_updater_stop = threading.Event()
+
+obs_lock = threading.RLock()
+output_thread = None
+output_stop = threading.Event()
+animation_stats = {"frames": 0, "late_frames": 0, "dropped_frames": 0}
+audio_stats = {
+    "callbacks": 0,
+    "input_overflows": 0,
+    "coalesced_states": 0,
+    "last_callback_ms": 0.0,
+    "max_callback_ms": 0.0,
+    "input_latency_ms": 0.0,
+    "stream_latency_ms": 0.0,
+    "decision_latency_ms": 0.0,
+    "last_callback_at": 0.0,
+}
+
+class LatestValueSlot:
+    def __init__(self):
+        self._latest: Tuple[int, float, object] = (0, 0.0, None)
+        self._taken_seq = 0
+        self._event = threading.Event()
+        self.overwrites = 0
+
+    def publish(self, value, stamp: float):
+        seq = self._latest[0]
+        if seq != self._taken_seq:
+            self.overwrites += 1
+        self._latest = (seq + 1, stamp, value)
+        if not self._event.is_set():
+            self._event.set()
+
+    def take(self, timeout: Optional[float] = None):
+        if not self._event.wait(timeout):
+            return None
+        self._event.clear()
+        seq, stamp, value = self._latest
+        if seq == self._taken_seq:
+            return None
+        self._taken_seq = seq
+        return value, stamp
+
+    def reset(self):
+        self._latest = (self._latest[0], 0.0, None)
+        self._taken_seq = self._latest[0]
+        self._event.clear()
+        self.overwrites = 0
+
+output_slot = LatestValueSlot()
+
+scene_item_mirror: Dict[Tuple[str, int], Dict] = {}
+obs_request_stats = {"sent": 0, "suppressed": 0, "failed": 0, "batches": 0, "coalesced": 0}
+browser_stats = {"messages": 0, "bytes": 0, "skipped": 0}
+
+class LatencyHistogram:
+    MIN_MS = 0.001
+    BINS_PER_OCTAVE = 8
+    BINS = 8 * 24
+
+    def __init__(self):
+        self.counts = [0] * self.BINS
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        if ms > self.MIN_MS:
+            index = int(math.log2(ms / self.MIN_MS) * self.BINS_PER_OCTAVE)
+            if index >= self.BINS:
+                index = self.BINS - 1
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> float:
+        counts = list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        target = total * p / 100.0
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= target:
+                return min(self.MIN_MS * 2.0 ** ((index + 0.5) / self.BINS_PER_OCTAVE), self.max_ms)
+        return self.max_ms
+
+    def reset(self):
+        for i in range(self.BINS):
+            self.counts[i] = 0
+        self.count = 0
+        self.max_ms = 0.0
+
+PERF_STAGE_ORDER = ["input buffer", "analysis", "decision", "callback", "queue", "frame", "applied"]
+profiling_enabled = False
+perf_stages: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in PERF_STAGE_ORDER}
+decision_latency: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in LATENCY_PROFILES}
+
+def record_stage_ms(name: str, ms: float):
+    if not profiling_enabled:
+        return
+    histogram = perf_stages.get(name)
+    if histogram is None:
+        histogram = perf_stages.setdefault(name, LatencyHistogram())
+    histogram.record(ms)
+
+def record_stage(name: str, started: float):
+    if profiling_enabled:
+        record_stage_ms(name, (time.perf_counter() - started) * 1000.0)
+
+def set_profiling(enabled: bool):
+    global profiling_enabled
+    if enabled and not profiling_enabled:
+        reset_perf_stages()
+    profiling_enabled = enabled
+
+def reset_perf_stages():
+    for histogram in perf_stages.values():
+        histogram.reset()
+
+def perf_stage_names() -> List[str]:
+    return PERF_STAGE_ORDER + sorted(name for name in list(perf_stages) if name not in PERF_STAGE_ORDER)
+
+def format_perf_report(previous_counts: Optional[Dict[str, int]] = None, interval: float = 0.0) -> str:
+    lines = []
+    for name in perf_stage_names():
+        histogram = perf_stages[name]
+        if not histogram.count:
+            continue
+        line = (f"{name:<28} p50 {histogram.percentile(50):8.3f} ms  "
+                f"p99 {histogram.percentile(99):8.3f} ms  max {histogram.max_ms:8.3f} ms")
+        if previous_counts is not None and interval > 0:
+            line += f"  {(histogram.count - previous_counts.get(name, 0)) / interval:7.1f}/s"
+        lines.append(line)
+    return "\n".join(lines)
+
+scene_item_index: Dict[Tuple[str, str], Tuple[str, int]] = {}
+scene_containers: Dict[str, set] = {}
+transform_cache: Dict[Tuple[str, int], Dict] = {}
+bobbing_offsets: Dict[Tuple[str, int], float] = {}
+recent_transform_sends: Dict[Tuple[str, int], deque] = {}
+TRANSFORM_ECHO_TOLERANCE = 0.01
+TRANSFORM_ECHO_HISTORY = 16
+
+REQUEST_BATCH_SERIAL_REALTIME = 0
+REQUEST_BATCH_SERIAL_FRAME = 1
+REQUEST_BATCH_PARALLEL = 2
+_batch_counter = 0
+
+class FrameBatch:
+    def __init__(self):
+        self.requests: List[Dict] = []
+        self.updates: List[Tuple[Tuple[str, int], str, object]] = []
+
+    def add(self, request_type: str, request_data: Dict, key: Tuple[str, int], field: str, value):
+        self.requests.append({"requestType": request_type, "requestData": request_data})
+        self.updates.append((key, field, value))
+
+    def __len__(self):
+        return len(self.requests)
 
 def load_config():
     global THRESHOLD, VOLUME_MULTIPLIER, SAMPLE_RATE, EQUALIZER_GAINS, LIPSYNC_ENABLED, BOBBING_ENABLED, BOBBING_INTENSITY
-    global selected_closed_source, selected_open_source, selected_base_source, current_mic_device, current_mic_name
+    global ANIMATION_FPS, ADAPTIVE_THRESHOLD, THRESHOLD_MARGIN_DB, VISEME_MODE, VISEME_SHAPES
+    global GATE_ATTACK_MS, GATE_HOLD_MS, GATE_RELEASE_MS, GATE_CLOSE_RATIO, LATENCY_PROFILE
+    global OBS_PIPELINED, OBS_MAX_IN_FLIGHT, OUTPUT_BACKEND, BROWSER_SOURCE_PORT, BROWSER_SOURCE_IMAGES
+    global selected_closed_source, selected_open_source, selected_base_source, current_mic_name
     if not os.path.exists(CONFIG_FILE):
         return
     try:
@@ -67,75 +383,206 @@ def load_config():
             THRESHOLD = cfg.get("threshold", THRESHOLD)
             VOLUME_MULTIPLIER = cfg.get("multiplier", VOLUME_MULTIPLIER)
             SAMPLE_RATE = cfg.get("sample_rate", SAMPLE_RATE)
+            LATENCY_PROFILE = cfg.get("latency_profile", LATENCY_PROFILE)
+            if LATENCY_PROFILE not in LATENCY_PROFILES:
+                LATENCY_PROFILE = "balanced"
             EQUALIZER_GAINS = cfg.get("equalizer_gains", EQUALIZER_GAINS)
             LIPSYNC_ENABLED = cfg.get("lipsync_enabled", LIPSYNC_ENABLED)
             BOBBING_ENABLED = cfg.get("bobbing_enabled", BOBBING_ENABLED)
             BOBBING_INTENSITY = cfg.get("bobbing_intensity", BOBBING_INTENSITY)
+            ANIMATION_FPS = cfg.get("animation_fps", ANIMATION_FPS)
+            ADAPTIVE_THRESHOLD = cfg.get("adaptive_threshold", ADAPTIVE_THRESHOLD)
+            THRESHOLD_MARGIN_DB = cfg.get("threshold_margin_db", THRESHOLD_MARGIN_DB)
+            VISEME_MODE = cfg.get("viseme_mode", VISEME_MODE)
+            GATE_ATTACK_MS = cfg.get("gate_attack_ms", GATE_ATTACK_MS)
+            GATE_HOLD_MS = cfg.get("gate_hold_ms", GATE_HOLD_MS)
+            GATE_RELEASE_MS = cfg.get("gate_release_ms", GATE_RELEASE_MS)
+            GATE_CLOSE_RATIO = cfg.get("gate_close_ratio", GATE_CLOSE_RATIO)
+            VISEME_SHAPES = cfg.get("viseme_shapes", VISEME_SHAPES)
+            OBS_PIPELINED = cfg.get("obs_pipelined", OBS_PIPELINED)
+            OBS_MAX_IN_FLIGHT = max(1, int(cfg.get("obs_max_in_flight", OBS_MAX_IN_FLIGHT)))
+            OUTPUT_BACKEND = cfg.get("output_backend", OUTPUT_BACKEND)
+            if OUTPUT_BACKEND not in OUTPUT_BACKENDS:
+                OUTPUT_BACKEND = "obs"
+            BROWSER_SOURCE_PORT = int(cfg.get("browser_source_port", BROWSER_SOURCE_PORT))
+            BROWSER_SOURCE_IMAGES = cfg.get("browser_source_images", BROWSER_SOURCE_IMAGES)
+            channels[:] = [Channel(channel_cfg) for channel_cfg in cfg.get("channels", [])]
             selected_closed_source = cfg.get("closed_source", CLOSED_MOUTH_SOURCE)
             selected_open_source = cfg.get("open_source", OPEN_MOUTH_SOURCE)
             selected_base_source = cfg.get("base_source", AVATAR_BASE_SOURCE)
             current_mic_name = cfg.get("mic_device_name", None)
-            if current_mic_name:
-                try:
-                    current_mic_device = find_mic_by_name(current_mic_name)
-                except Exception:
-                    current_mic_device = None
     except Exception as e:
         print(f"Config load error: {e}")
 
-def save_config():
-    cfg = {
+def config_snapshot() -> Dict:
+    return {
         "threshold": THRESHOLD,
         "multiplier": VOLUME_MULTIPLIER,
         "sample_rate": SAMPLE_RATE,
+        "latency_profile": LATENCY_PROFILE,
         "equalizer_gains": EQUALIZER_GAINS,
         "lipsync_enabled": LIPSYNC_ENABLED,
         "bobbing_enabled": BOBBING_ENABLED,
         "bobbing_intensity": BOBBING_INTENSITY,
+        "animation_fps": ANIMATION_FPS,
+        "adaptive_threshold": ADAPTIVE_THRESHOLD,
+        "threshold_margin_db": THRESHOLD_MARGIN_DB,
+        "viseme_mode": VISEME_MODE,
+        "gate_attack_ms": GATE_ATTACK_MS,
+        "gate_hold_ms": GATE_HOLD_MS,
+        "gate_release_ms": GATE_RELEASE_MS,
+        "gate_close_ratio": GATE_CLOSE_RATIO,
+        "viseme_shapes": VISEME_SHAPES,
+        "obs_pipelined": OBS_PIPELINED,
+        "obs_max_in_flight": OBS_MAX_IN_FLIGHT,
+        "output_backend": OUTPUT_BACKEND,
+        "browser_source_port": BROWSER_SOURCE_PORT,
+        "browser_source_images": BROWSER_SOURCE_IMAGES,
+        "channels": [channel.to_config() for channel in channels],
         "closed_source": selected_closed_source,
         "open_source": selected_open_source,
         "base_source": selected_base_source,
         "mic_device_name": current_mic_name
     }
-    try:
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(cfg, f, indent=2)
-    except Exception as e:
-        print(f"Config save error: {e}")
 
-def find_mic_by_name(name: str) -> Optional[int]:
-    try:
-        devices = sd.query_devices()
-        for i, dev in enumerate(devices):
-            if dev['max_input_channels'] > 0 and name.lower() in dev['name'].lower():
+def flush_config() -> bool:
+    with config_write_lock:
+        cfg = config_snapshot()
+        tmp_path = f"{CONFIG_FILE}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(cfg, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, CONFIG_FILE)
+            return True
+        except Exception as e:
+            print(f"Config save error: {e}")
+            try:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+def save_config():
+    global config_dirty_at
+    config_dirty_at = time.monotonic()
+    config_dirty.set()
+    start_config_writer()
+
+def config_writer():
+    while not config_writer_stop.is_set():
+        if not config_dirty.wait(0.5):
+            continue
+        quiet = config_dirty_at + CONFIG_SAVE_DELAY - time.monotonic()
+        if quiet > 0:
+            config_writer_stop.wait(quiet)
+            continue
+        config_dirty.clear()
+        flush_config()
+
+def start_config_writer():
+    global config_writer_thread
+    if config_writer_thread and config_writer_thread.is_alive():
+        return
+    config_writer_stop.clear()
+    config_writer_thread = threading.Thread(target=config_writer, name="lipsync-config", daemon=True)
+    config_writer_thread.start()
+
+def stop_config_writer():
+    global config_writer_thread
+    config_writer_stop.set()
+    if config_writer_thread and config_writer_thread is not threading.current_thread():
+        config_writer_thread.join(timeout=2.0)
+    config_writer_thread = None
+    if config_dirty.is_set():
+        config_dirty.clear()
+        flush_config()
+
+class DeviceRegistry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.devices: List[Dict] = []
+        self.inputs: List[Tuple[int, str]] = []
+        self.by_name: Dict[str, int] = {}
+        self.hostapis: Tuple[str, ...] = ()
+        self.version = 0
+        self.scan_ms = 0.0
+
+    def refresh(self, rescan: bool = False) -> bool:
+        started = time.perf_counter()
+        with self.lock:
+            if rescan and hasattr(sd, "_terminate") and hasattr(sd, "_initialize"):
+                sd._terminate()
+                sd._initialize()
+            devices = [dict(dev) for dev in sd.query_devices()]
+            inputs = [(i, dev['name']) for i, dev in enumerate(devices) if dev['max_input_channels'] > 0]
+            hostapis = tuple(api['name'] for api in sd.query_hostapis())
+            changed = inputs != self.inputs or hostapis != self.hostapis or not self.version
+            self.devices = devices
+            self.inputs = inputs
+            self.hostapis = hostapis
+            self.by_name = {name.lower(): i for i, name in reversed(inputs)}
+            if changed:
+                self.version += 1
+        self.scan_ms = (time.perf_counter() - started) * 1000.0
+        if changed:
+            print(f"Found {len(inputs)} audio input devices ({self.scan_ms:.0f} ms)")
+        return changed
+
+    def ensure(self):
+        if not self.version:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error listing audio devices: {e}")
+
+    def find(self, name: str) -> Optional[int]:
+        self.ensure()
+        key = name.lower()
+        if key in self.by_name:
+            return self.by_name[key]
+        for i, device_name in self.inputs:
+            if key in device_name.lower():
                 return i
-    except Exception as e:
-        print(f"Error finding mic by name: {e}")
-    return None
+        return None
+
+    def name_of(self, index: int) -> Optional[str]:
+        self.ensure()
+        devices = self.devices
+        if 0 <= index < len(devices):
+            return devices[index]['name']
+        return None
+
+    def input_devices(self) -> List[Tuple[int, str]]:
+        self.ensure()
+        return list(self.inputs)
+
+device_registry = DeviceRegistry()
+
+def find_mic_by_name(name: str) -> Optional[int]:
+    return device_registry.find(name)
 
 def add_warning(message: str):
-    global ui_warnings
-    if message not in ui_warnings:
-        ui_warnings.append(message)
+    if warning_log.add(message):
         print(f"WARNING: {message}")
-        if len(ui_warnings) > 50:
-            ui_warnings.pop(0)
+
+def is_connection_error(e: Exception) -> bool:
+    return isinstance(e, (OSError, WebSocketException, OBSSDKTimeoutError))
+
+def handle_obs_error(e: Exception, message: str):
+    if is_connection_error(e):
+        mark_obs_disconnected(f"{message}: {e}")
+    else:
+        add_warning(f"{message}: {e}")
 
 def clear_warnings():
-    global ui_warnings
-    ui_warnings = []
+    warning_log.clear()
 
 def get_audio_devices() -> List[Tuple[int, str]]:
     global available_mics
-    available_mics = []
-    try:
-        devices = sd.query_devices()
-        for i, dev in enumerate(devices):
-            if dev['max_input_channels'] > 0:
-                available_mics.append((i, dev['name']))
-        print(f"Found {len(available_mics)} audio input devices")
-    except Exception as e:
-        add_warning(f"Error getting audio devices: {e}")
+    available_mics = device_registry.input_devices()
     return available_mics
 
 def get_obs_scenes() -> List[str]:
@@ -144,10 +591,14 @@ def get_obs_scenes() -> List[str]:
     if not ws:
         return available_scenes
     try:
-        scenes = ws.get_scene_list()
+        with obs_lock:
+            scenes = ws.get_scene_list()
         if hasattr(scenes, 'scenes'):
             for s in scenes.scenes:
-                name = getattr(s, 'sceneName', getattr(s, 'name', None))
+                if isinstance(s, dict):
+                    name = s.get('sceneName') or s.get('name')
+                else:
+                    name = getattr(s, 'sceneName', getattr(s, 'name', None))
                 if name:
                     available_scenes.append(name)
         elif isinstance(scenes, dict):
@@ -156,7 +607,7 @@ def get_obs_scenes() -> List[str]:
                 if name:
                     available_scenes.append(name)
     except Exception as e:
-        add_warning(f"Error getting OBS scenes: {e}")
+        handle_obs_error(e, "Error getting OBS scenes")
     return available_scenes
 
 def _normalize_scene_name(value) -> str:
@@ -178,6 +629,23 @@ def _normalize_scene_name(value) -> str:
     
     return str(value)
 
+def query_current_program_scene() -> Optional[str]:
+    global ws
+    if ws is None:
+        return None
+    try:
+        with obs_lock:
+            resp = ws.get_current_program_scene()
+        name = _normalize_scene_name(resp)
+    except Exception:
+        try:
+            with obs_lock:
+                resp = ws.get_current_scene()
+            name = _normalize_scene_name(resp)
+        except Exception:
+            return None
+    return name if isinstance(name, str) and name else None
+
 def _ensure_scene_name(scene_candidate=None, fallback_scene: str = "test avatar") -> str:
     global ws, scene
     
@@ -195,20 +663,10 @@ def _ensure_scene_name(scene_candidate=None, fallback_scene: str = "test avatar"
     try:
         if isinstance(scene, str) and scene:
             return scene
-        if ws is not None:
-            try:
-                resp = ws.get_current_program_scene()
-                name = _normalize_scene_name(resp)
-                if isinstance(name, str) and name:
-                    return name
-            except Exception:
-                try:
-                    resp = ws.get_current_scene()
-                    name = _normalize_scene_name(resp)
-                    if isinstance(name, str) and name:
-                        return name
-                except Exception:
-                    pass
+        if events_ws is None:
+            name = query_current_program_scene()
+            if name:
+                return name
     except Exception:
         pass
     
@@ -221,9 +679,13 @@ def safe_get_scene_item_list(scene_candidate=None):
         add_warning("OBS not connected (get_scene_item_list)")
         return []
     try:
-        return ws.get_scene_item_list(scene_name)
+        started = time.perf_counter()
+        with obs_lock:
+            response = ws.get_scene_item_list(scene_name)
+        record_stage("rpc GetSceneItemList", started)
+        return response
     except Exception as e:
-        add_warning(f"Could not get scene item list for scene '{scene_name}': {e}")
+        handle_obs_error(e, f"Could not get scene item list for scene '{scene_name}'")
         return None
 
 def safe_get_scene_item_transform(scene_candidate, item_id: int):
@@ -233,9 +695,13 @@ def safe_get_scene_item_transform(scene_candidate, item_id: int):
         add_warning("OBS not connected (get_scene_item_transform)")
         return None
     try:
-        return ws.get_scene_item_transform(scene_name, item_id)
+        started = time.perf_counter()
+        with obs_lock:
+            response = ws.get_scene_item_transform(scene_name, item_id)
+        record_stage("rpc GetSceneItemTransform", started)
+        return response
     except Exception as e:
-        add_warning(f"Could not get scene item transform for scene '{scene_name}', item '{item_id}': {e}")
+        handle_obs_error(e, f"Could not get scene item transform for scene '{scene_name}', item '{item_id}'")
         return None
 
 def safe_set_scene_item_enabled(scene_candidate, item_id: int, enabled: bool) -> bool:
@@ -247,10 +713,15 @@ def safe_set_scene_item_enabled(scene_candidate, item_id: int, enabled: bool) ->
         add_warning("OBS not connected (set_scene_item_enabled)")
         return False
     try:
-        ws.set_scene_item_enabled(scene_name, item_id, enabled)
+        started = time.perf_counter()
+        with obs_lock:
+            ws.set_scene_item_enabled(scene_name, item_id, enabled)
+        record_stage("rpc SetSceneItemEnabled", started)
+        obs_request_stats["sent"] += 1
         return True
     except Exception as e:
-        add_warning(f"Could not set scene item enabled for scene '{scene_name}', item '{item_id}': {e}")
+        obs_request_stats["failed"] += 1
+        handle_obs_error(e, f"Could not set scene item enabled for scene '{scene_name}', item '{item_id}'")
         return False
 
 def safe_set_scene_item_transform(scene_candidate, item_id: int, transform) -> bool:
@@ -262,11 +733,165 @@ def safe_set_scene_item_transform(scene_candidate, item_id: int, transform) -> b
         add_warning("OBS not connected (set_scene_item_transform)")
         return False
     try:
-        ws.set_scene_item_transform(scene_name, item_id, transform)
+        started = time.perf_counter()
+        with obs_lock:
+            ws.set_scene_item_transform(scene_name, item_id, transform)
+        record_stage("rpc SetSceneItemTransform", started)
+        obs_request_stats["sent"] += 1
         return True
     except Exception as e:
-        add_warning(f"Could not set scene item transform for scene '{scene_name}', item '{item_id}': {e}")
+        obs_request_stats["failed"] += 1
+        handle_obs_error(e, f"Could not set scene item transform for scene '{scene_name}', item '{item_id}'")
+        return False
+
+def safe_send_request_batch(requests: List[Dict], execution_type: int = REQUEST_BATCH_SERIAL_FRAME) -> Optional[List[Dict]]:
+    global ws, _batch_counter
+    if not requests:
+        return []
+    if ws is None:
+        add_warning("OBS not connected (request batch)")
+        return None
+    _batch_counter += 1
+    request_id = f"lipsync-batch-{_batch_counter}"
+    payload = {
+        "op": 8,
+        "d": {
+            "requestId": request_id,
+            "haltOnFailure": False,
+            "executionType": execution_type,
+            "requests": requests,
+        },
+    }
+    try:
+        started = time.perf_counter()
+        with obs_lock:
+            conn = ws.base_client.ws
+            conn.send(json.dumps(payload))
+            while True:
+                response = json.loads(conn.recv())
+                if response.get("op") == 9 and response.get("d", {}).get("requestId") == request_id:
+                    break
+        record_stage("rpc RequestBatch", started)
+        obs_request_stats["batches"] += 1
+        return response["d"].get("results", [])
+    except Exception as e:
+        obs_request_stats["failed"] += len(requests)
+        handle_obs_error(e, "Could not send request batch")
+        return None
+
+def send_frame_batch(batch: FrameBatch, stamp: Optional[float] = None) -> bool:
+    if not batch.requests:
+        return True
+    pipeline = obs_output
+    if pipeline is not None and pipeline.connected:
+        return pipeline.submit(batch, stamp)
+    results = safe_send_request_batch(batch.requests, REQUEST_BATCH_SERIAL_FRAME)
+    if results is None:
+        for key, field, _ in batch.updates:
+            _forget_mirror_field(key, field)
         return False
+    if stamp is not None:
+        record_stage_ms("applied", (time.perf_counter() - stamp) * 1000.0 + audio_stats["input_latency_ms"])
+    ok = True
+    for i, (key, field, value) in enumerate(batch.updates):
+        status = results[i].get("requestStatus", {}) if i < len(results) else {}
+        if status.get("result"):
+            obs_request_stats["sent"] += 1
+            _apply_mirror_field(key, field, value)
+        else:
+            ok = False
+            obs_request_stats["failed"] += 1
+            _forget_mirror_field(key, field)
+            request = batch.requests[i]
+            add_warning(f"{request['requestType']} failed for item '{key[1]}' in scene '{key[0]}': "
+                        f"{status.get('comment', 'no response')}")
+    return ok
+
+def _apply_mirror_field(key: Tuple[str, int], field: str, value):
+    known = scene_item_mirror.get(key)
+    if known is None:
+        known = scene_item_mirror[key] = {"enabled": None, "transform": {}}
+    if field == "transform":
+        known["transform"].update(value)
+    else:
+        known[field] = value
+
+def _forget_mirror_field(key: Tuple[str, int], field: str):
+    known = scene_item_mirror.get(key)
+    if known is None:
+        return
+    known[field] = {} if field == "transform" else None
+
+def _item_fields(item):
+    if isinstance(item, dict):
+        src_name = item.get('sourceName') or item.get('source_name') or item.get('name')
+        sid = item.get('sceneItemId') or item.get('scene_item_id') or item.get('id')
+        enabled = item.get('sceneItemEnabled', item.get('scene_item_enabled'))
+        transform = item.get('sceneItemTransform') or item.get('scene_item_transform')
+    else:
+        src_name = getattr(item, 'sourceName', getattr(item, 'source_name', getattr(item, 'name', None)))
+        sid = getattr(item, 'sceneItemId', getattr(item, 'scene_item_id', getattr(item, 'id', None)))
+        enabled = getattr(item, 'sceneItemEnabled', getattr(item, 'scene_item_enabled', None))
+        transform = getattr(item, 'sceneItemTransform', getattr(item, 'scene_item_transform', None))
+    return src_name, sid, enabled, transform
+
+def invalidate_scene_item_mirror(scene_name: Optional[str] = None):
+    if scene_name is None:
+        scene_item_mirror.clear()
+        return
+    for key in [k for k in scene_item_mirror if k[0] == scene_name]:
+        del scene_item_mirror[key]
+
+def mirror_scene_items(scene_name: str, items):
+    invalidate_scene_item_mirror(scene_name)
+    for item in items:
+        _, sid, enabled, transform = _item_fields(item)
+        if sid is None:
+            continue
+        scene_item_mirror[(scene_name, sid)] = {
+            "enabled": enabled if isinstance(enabled, bool) else None,
+            "transform": dict(transform) if isinstance(transform, dict) else {},
+        }
+
+def set_scene_item_enabled_edge(scene_candidate, item_id: int, enabled: bool, batch: Optional[FrameBatch] = None) -> bool:
+    if item_id is None:
+        return False
+    scene_name = _ensure_scene_name(scene_candidate)
+    key = (scene_name, item_id)
+    known = scene_item_mirror.get(key)
+    if known is not None and known.get("enabled") == enabled:
+        obs_request_stats["suppressed"] += 1
+        return True
+    if batch is not None:
+        batch.add("SetSceneItemEnabled",
+                  {"sceneName": scene_name, "sceneItemId": item_id, "sceneItemEnabled": enabled},
+                  key, "enabled", enabled)
+        return True
+    if not safe_set_scene_item_enabled(scene_name, item_id, enabled):
+        _forget_mirror_field(key, "enabled")
+        return False
+    _apply_mirror_field(key, "enabled", enabled)
+    return True
+
+def set_scene_item_transform_edge(scene_candidate, item_id: int, transform: Dict, batch: Optional[FrameBatch] = None) -> bool:
+    if item_id is None:
+        return False
+    scene_name = _ensure_scene_name(scene_candidate)
+    key = (scene_name, item_id)
+    known = scene_item_mirror.get(key)
+    if known is not None and all(known["transform"].get(k) == v for k, v in transform.items()):
+        obs_request_stats["suppressed"] += 1
+        return True
+    if batch is not None:
+        batch.add("SetSceneItemTransform",
+                  {"sceneName": scene_name, "sceneItemId": item_id, "sceneItemTransform": transform},
+                  key, "transform", transform)
+        return True
+    if not safe_set_scene_item_transform(scene_name, item_id, transform):
+        _forget_mirror_field(key, "transform")
+        return False
+    _apply_mirror_field(key, "transform", transform)
+    return True
 
 def get_obs_sources() -> List[str]:
     global available_sources, ws, scene
@@ -317,58 +942,114 @@ def _extract_transform(transform_resp):
             return getattr(transform_resp, name)
     return None
 
-def update_scene_items():
+def _scene_item_list_items(scene_items_resp) -> List:
+    if hasattr(scene_items_resp, 'scene_items'):
+        return scene_items_resp.scene_items or []
+    if isinstance(scene_items_resp, dict):
+        return scene_items_resp.get('sceneItems') or scene_items_resp.get('scene_items') or []
+    if isinstance(scene_items_resp, list):
+        return scene_items_resp
+    return []
+
+def _item_nesting(item) -> Tuple[bool, bool]:
+    if isinstance(item, dict):
+        is_group = bool(item.get('isGroup') or item.get('is_group'))
+        source_type = item.get('sourceType') or item.get('source_type')
+    else:
+        is_group = bool(getattr(item, 'isGroup', getattr(item, 'is_group', False)))
+        source_type = getattr(item, 'sourceType', getattr(item, 'source_type', None))
+    return is_group, source_type == "OBS_SOURCE_TYPE_SCENE"
+
+def safe_get_group_scene_item_list(group_name: str):
+    global ws
+    if ws is None:
+        return None
+    try:
+        started = time.perf_counter()
+        with obs_lock:
+            response = ws.get_group_scene_item_list(group_name)
+        record_stage("rpc GetGroupSceneItemList", started)
+        return response
+    except Exception as e:
+        handle_obs_error(e, f"Could not get scene item list for group '{group_name}'")
+        return None
+
+def build_scene_item_index():
+    global scene_item_index, scene_containers
+    index: Dict[Tuple[str, str], Tuple[str, int]] = {}
+    containers: Dict[str, set] = {}
+    listed: Dict[str, List] = {}
+
+    def list_container(name: str, is_group: bool) -> List:
+        if name not in listed:
+            resp = safe_get_group_scene_item_list(name) if is_group else safe_get_scene_item_list(name)
+            listed[name] = _scene_item_list_items(resp)
+            mirror_scene_items(name, listed[name])
+            cache_scene_item_transforms(name, listed[name])
+        return listed[name]
+
+    for top_scene in get_obs_scenes():
+        pending = [(top_scene, False)]
+        visited = set()
+        while pending:
+            container, is_group = pending.pop(0)
+            if container in visited:
+                continue
+            visited.add(container)
+            containers.setdefault(container, set()).add(top_scene)
+            for item in list_container(container, is_group):
+                src_name, sid, _, _ = _item_fields(item)
+                if src_name is None or sid is None:
+                    continue
+                index.setdefault((top_scene, src_name), (container, sid))
+                item_is_group, item_is_scene = _item_nesting(item)
+                if item_is_group or item_is_scene:
+                    pending.append((src_name, item_is_group))
+
+    scene_item_index = index
+    scene_containers = containers
+    print(f"Indexed {len(index)} scene items across {len(listed)} scenes and groups")
+
+def lookup_scene_item(scene_name: str, source_name: str) -> Tuple[Optional[str], Optional[int]]:
+    return scene_item_index.get((scene_name, source_name), (None, None))
+
+def update_scene_items(scene_name: Optional[str] = None):
     global ws, scene, open_item_id, closed_item_id, base_item_id, last_warned_scene
-    open_item_id = closed_item_id = base_item_id = None
+    global open_item_scene, closed_item_scene, base_item_scene, viseme_items
     
     if ws is None:
+        open_item_id = closed_item_id = base_item_id = None
+        viseme_items = []
         add_warning("OBS WebSocket not connected")
         return
     
     try:
-        scene_name = None
-        try:
-            scene_resp = ws.get_current_program_scene()
-            scene_name = _normalize_scene_name(scene_resp)
-        except Exception:
-            try:
-                scene_resp = ws.get_current_scene()
-                scene_name = _normalize_scene_name(scene_resp)
-            except Exception:
-                scene_name = None
+        if not scene_name:
+            if events_ws is not None and isinstance(scene, str) and scene:
+                scene_name = scene
+            else:
+                scene_name = query_current_program_scene()
 
         if not scene_name:
+            open_item_id = closed_item_id = base_item_id = None
+            viseme_items = []
             if scene != last_warned_scene:
                 add_warning("Could not get current scene from OBS")
                 last_warned_scene = scene
             return
 
-        scene = scene_name
+        if scene_name not in scene_containers:
+            build_scene_item_index()
 
-        scene_items_resp = safe_get_scene_item_list(scene_name)
-        items = []
-        
-        if hasattr(scene_items_resp, 'scene_items'):
-            items = scene_items_resp.scene_items
-        elif isinstance(scene_items_resp, dict):
-            items = scene_items_resp.get('sceneItems') or scene_items_resp.get('scene_items') or []
-        elif isinstance(scene_items_resp, list):
-            items = scene_items_resp
+        new_open = lookup_scene_item(scene_name, selected_open_source)
+        new_closed = lookup_scene_item(scene_name, selected_closed_source)
+        new_base = lookup_scene_item(scene_name, selected_base_source)
 
-        for item in items:
-            if isinstance(item, dict):
-                src_name = item.get('sourceName') or item.get('source_name') or item.get('name')
-                sid = item.get('sceneItemId') or item.get('scene_item_id') or item.get('id')
-            else:
-                src_name = getattr(item, 'sourceName', getattr(item, 'source_name', getattr(item, 'name', None)))
-                sid = getattr(item, 'sceneItemId', getattr(item, 'scene_item_id', getattr(item, 'id', None)))
-            
-            if src_name == selected_open_source:
-                open_item_id = sid
-            elif src_name == selected_closed_source:
-                closed_item_id = sid
-            elif src_name == selected_base_source:
-                base_item_id = sid
+        (scene, open_item_scene, open_item_id, closed_item_scene, closed_item_id,
+         base_item_scene, base_item_id) = (scene_name, *new_open, *new_closed, *new_base)
+        viseme_items = [lookup_scene_item(scene_name, shape.get("source", "")) for shape in VISEME_SHAPES]
+        for channel in channels:
+            channel.bind(scene_name)
 
         if not any([open_item_id, closed_item_id]):
             add_warning(f"Could not find mouth sources in scene: {scene}")
@@ -376,614 +1057,4027 @@ def update_scene_items():
     except Exception as e:
         add_warning(f"Failed to update scene items: {e}")
 
-def update_bobbing_motion():
-    global ws, scene, base_item_id, open_item_id, closed_item_id, bobbing_phase, mouth_state, _original_positions
-    
-    if not ws or not scene or not BOBBING_ENABLED:
-        return
-    
+def primary_scene_items() -> List[Tuple[str, int]]:
+    return [(owner, sid) for owner, sid in ((base_item_scene, base_item_id),
+                                            (open_item_scene, open_item_id),
+                                            (closed_item_scene, closed_item_id),
+                                            *viseme_items)
+            if owner and sid]
+
+def bound_scene_items() -> List[Tuple[str, int]]:
+    items = primary_scene_items()
+    for channel in channels:
+        items.extend(channel.bound_items())
+    return items
+
+def viseme_source_names() -> List[str]:
+    return [shape.get("source") for shape in VISEME_SHAPES if shape.get("source")]
+
+def on_current_program_scene_changed(data):
     try:
-        bobbing_phase += 0.3
-        offset = math.sin(bobbing_phase) * BOBBING_INTENSITY * mouth_state
+        new_scene = getattr(data, 'scene_name', None)
+        if not new_scene or new_scene == scene:
+            return
+        update_scene_items(new_scene)
+        if lipsync_running:
+            restore_rest_transforms(exclude=bound_scene_items())
+    except Exception as e:
+        add_warning(f"Scene change handling failed: {e}")
 
-        items = [base_item_id, open_item_id, closed_item_id]
-        
-        for item_id in items:
-            if not item_id:
-                continue
-            
-            try:
-                key = f"{scene}:{item_id}"
-                transform_resp = safe_get_scene_item_transform(scene, item_id)
-                transform = _extract_transform(transform_resp)
-                
-                if not transform:
-                    continue
+def on_scene_created(data):
+    try:
+        if getattr(data, 'is_group', False):
+            return
+        scene_name = getattr(data, 'scene_name', None)
+        if scene_name:
+            scene_containers.setdefault(scene_name, set()).add(scene_name)
+    except Exception as e:
+        add_warning(f"Scene creation handling failed: {e}")
 
-                def tget(o, name, default=0):
-                    if o is None:
-                        return default
-                    if isinstance(o, dict):
-                        return o.get(name, default)
-                    return getattr(o, name, default)
-
-                def tset(o, name, value):
-                    if isinstance(o, dict):
-                        o[name] = value
-                    else:
-                        try:
-                            setattr(o, name, value)
-                        except Exception:
-                            pass
-
-                if key not in _original_positions:
-                    _original_positions[key] = tget(transform, 'positionY', 0)
-
-                orig_y = _original_positions[key]
-
-                if isinstance(transform, dict):
-                    transform = transform.copy()
-                    if transform.get('boundsWidth', 0) < 1.0:
-                        transform['boundsWidth'] = max(transform.get('boundsWidth', 1.0), 1.0)
-                    if transform.get('boundsHeight', 0) < 1.0:
-                        transform['boundsHeight'] = max(transform.get('boundsHeight', 1.0), 1.0)
-                    transform['positionY'] = orig_y + offset
-                    safe_set_scene_item_transform(scene, item_id, transform)
-                else:
-                    if tget(transform, 'boundsWidth', 0) < 1.0:
-                        tset(transform, 'boundsWidth', max(tget(transform, 'boundsWidth', 1.0), 1.0))
-                    if tget(transform, 'boundsHeight', 0) < 1.0:
-                        tset(transform, 'boundsHeight', max(tget(transform, 'boundsHeight', 1.0), 1.0))
-                    tset(transform, 'positionY', orig_y + offset)
-                    safe_set_scene_item_transform(scene, item_id, transform)
-                    
-            except Exception:
-                continue
-    except Exception:
-        pass
+def on_scene_removed(data):
+    try:
+        scene_name = getattr(data, 'scene_name', None)
+        for key in [k for k in scene_item_index if k[0] == scene_name or scene_item_index[k][0] == scene_name]:
+            del scene_item_index[key]
+        scene_containers.pop(scene_name, None)
+        for parents in scene_containers.values():
+            parents.discard(scene_name)
+        invalidate_scene_item_mirror(scene_name)
+    except Exception as e:
+        add_warning(f"Scene removal handling failed: {e}")
 
-def apply_equalizer(audio_data: np.ndarray) -> np.ndarray:
+def on_scene_name_changed(data):
     try:
-        gains_linear = [10 ** (gain / 20.0) for gain in EQUALIZER_GAINS]
-        avg_gain = np.mean(gains_linear) if gains_linear else 1.0
-        return audio_data * avg_gain
-    except Exception:
-        return audio_data
+        old_name = getattr(data, 'old_scene_name', None)
+        new_name = getattr(data, 'scene_name', None)
+        if not old_name or not new_name:
+            return
+        for key, (owner, sid) in list(scene_item_index.items()):
+            top = new_name if key[0] == old_name else key[0]
+            container = new_name if owner == old_name else owner
+            if (top, container) != (key[0], owner):
+                del scene_item_index[key]
+                scene_item_index[(top, key[1])] = (container, sid)
+        if old_name in scene_containers:
+            scene_containers[new_name] = scene_containers.pop(old_name)
+        for parents in scene_containers.values():
+            if old_name in parents:
+                parents.discard(old_name)
+                parents.add(new_name)
+        for old_key in [k for k in list(scene_item_mirror) if k[0] == old_name]:
+            scene_item_mirror[(new_name, old_key[1])] = scene_item_mirror.pop(old_key)
+        for old_key in [k for k in list(transform_cache) if k[0] == old_name]:
+            transform_cache[(new_name, old_key[1])] = transform_cache.pop(old_key)
+        for old_key in [k for k in list(recent_transform_sends) if k[0] == old_name]:
+            recent_transform_sends[(new_name, old_key[1])] = recent_transform_sends.pop(old_key)
+        if scene == old_name:
+            update_scene_items(new_name)
+        elif any(owner == old_name for owner, _ in bound_scene_items()):
+            update_scene_items(scene)
+    except Exception as e:
+        add_warning(f"Scene rename handling failed: {e}")
 
-def audio_callback(indata, frames, time_info, status):
-    global current_volume, mouth_state
-    
-    if not lipsync_running or not stream_active:
-        return
-    
-    if status:
-        add_warning(f"Audio warning: {status}")
-    
+def on_scene_item_created(data):
     try:
-        processed_audio = apply_equalizer(indata.copy())
-        flat = processed_audio.ravel()
-        
-        if flat.size == 0:
+        container = getattr(data, 'scene_name', None)
+        src_name = getattr(data, 'source_name', None)
+        sid = getattr(data, 'scene_item_id', None)
+        if not container or not src_name or sid is None:
             return
-        
-        volume_norm = (np.linalg.norm(flat) / math.sqrt(flat.size)) * VOLUME_MULTIPLIER
-        
-        if not isinstance(volume_norm, (int, float)) or math.isnan(volume_norm) or math.isinf(volume_norm):
-            volume_norm = 0.0
-        
-        volume_norm = min(volume_norm, 10.0)
-        current_volume = min(1.0, max(0.0, float(volume_norm)))
+        for top_scene in scene_containers.get(container, {container}):
+            scene_item_index.setdefault((top_scene, src_name), (container, sid))
+        _forget_mirror_field((container, sid), "enabled")
+        if src_name in (selected_open_source, selected_closed_source, selected_base_source, *viseme_source_names(),
+                        *(name for channel in channels for name in channel.source_names())):
+            update_scene_items(scene)
+    except Exception as e:
+        add_warning(f"Scene item creation handling failed: {e}")
 
-        target = 1.0 if volume_norm > THRESHOLD else 0.0
-        mouth_state += (target - mouth_state) * SMOOTH_FACTOR
-        
-        toggle_mouth_smooth(mouth_state)
-        
-        if BOBBING_ENABLED:
-            update_bobbing_motion()
-            
+def on_scene_item_removed(data):
+    try:
+        container = getattr(data, 'scene_name', None)
+        sid = getattr(data, 'scene_item_id', None)
+        key = (container, sid)
+        for index_key in [k for k, v in scene_item_index.items() if v == key]:
+            del scene_item_index[index_key]
+        scene_item_mirror.pop(key, None)
+        transform_cache.pop(key, None)
+        bobbing_offsets.pop(key, None)
+        recent_transform_sends.pop(key, None)
+        if key in bound_scene_items():
+            update_scene_items(scene)
     except Exception as e:
-        add_warning(f"Audio callback error: {e}")
+        add_warning(f"Scene item removal handling failed: {e}")
 
-def start_gui():
-    global THRESHOLD, VOLUME_MULTIPLIER, SMOOTH_FACTOR, SAMPLE_RATE, EQUALIZER_GAINS
-    global LIPSYNC_ENABLED, BOBBING_ENABLED, BOBBING_INTENSITY
+def on_scene_item_enable_state_changed(data):
+    scene_name = getattr(data, 'scene_name', None)
+    item_id = getattr(data, 'scene_item_id', None)
+    enabled = getattr(data, 'scene_item_enabled', None)
+    if scene_name is None or item_id is None:
+        return
+    key = (scene_name, item_id)
+    if isinstance(enabled, bool):
+        _apply_mirror_field(key, "enabled", enabled)
+    else:
+        _forget_mirror_field(key, "enabled")
+
+def on_input_name_changed(data):
     global selected_closed_source, selected_open_source, selected_base_source
+    try:
+        old_name = getattr(data, 'old_input_name', None)
+        new_name = getattr(data, 'input_name', None)
+        if not old_name or not new_name:
+            return
+        for key in [k for k in scene_item_index if k[1] == old_name]:
+            scene_item_index[(key[0], new_name)] = scene_item_index.pop(key)
+        renamed = False
+        if selected_open_source == old_name:
+            selected_open_source = new_name
+            renamed = True
+        if selected_closed_source == old_name:
+            selected_closed_source = new_name
+            renamed = True
+        if selected_base_source == old_name:
+            selected_base_source = new_name
+            renamed = True
+        for shape in VISEME_SHAPES:
+            if shape.get("source") == old_name:
+                shape["source"] = new_name
+                renamed = True
+        for channel in channels:
+            renamed = channel.rename_source(old_name, new_name) or renamed
+        if renamed:
+            save_config()
+    except Exception as e:
+        add_warning(f"Input rename handling failed: {e}")
 
-    root = tk.Tk()
-    root.title("🎙️ Lipsync Control")
-    root.geometry("700x800")
-    root.minsize(520, 480)
+def _rest_from_live_transform(key: Tuple[str, int], transform: Dict) -> Dict:
+    rest = dict(transform)
+    rest['positionY'] = rest.get('positionY', 0.0) - bobbing_offsets.get(key, 0.0)
+    return rest
 
-    bg_color = "#2b2b2b"
-    fg_color = "white"
-    accent_color = "#61afef"
-    trough_color = "#3c3f41"
-    warning_color = "#e06c75"
-    root.configure(bg=bg_color)
+def cache_scene_item_transforms(scene_name: str, items):
+    for item in items:
+        _, sid, _, transform = _item_fields(item)
+        key = (scene_name, sid)
+        if sid is None or not isinstance(transform, dict) or key in transform_cache:
+            continue
+        transform_cache[key] = _rest_from_live_transform(key, transform)
 
-    style = ttk.Style(root)
+def get_cached_transform(scene_name: str, item_id: int) -> Optional[Dict]:
+    key = (scene_name, item_id)
+    rest = transform_cache.get(key)
+    if rest is None:
+        transform = _extract_transform(safe_get_scene_item_transform(scene_name, item_id))
+        if not isinstance(transform, dict):
+            return None
+        rest = transform_cache[key] = _rest_from_live_transform(key, transform)
+    return rest
+
+def refresh_transform_cache(scene_name: Optional[str] = None):
+    for key in list(transform_cache.keys()):
+        if scene_name is not None and key[0] != scene_name:
+            continue
+        transform = _extract_transform(safe_get_scene_item_transform(key[0], key[1]))
+        if isinstance(transform, dict):
+            transform_cache[key] = _rest_from_live_transform(key, transform)
+            _forget_mirror_field(key, "transform")
+        else:
+            transform_cache.pop(key, None)
+
+def on_scene_item_transform_changed(data):
+    scene_name = getattr(data, 'scene_name', None)
+    item_id = getattr(data, 'scene_item_id', None)
+    transform = getattr(data, 'scene_item_transform', None)
+    if scene_name is None or item_id is None or not isinstance(transform, dict):
+        return
+    key = (scene_name, item_id)
+    if key not in transform_cache:
+        return
+    known = scene_item_mirror.get(key)
+    sent_y = known["transform"].get('positionY') if known else None
+    live_y = transform.get('positionY', 0.0)
+    sends = recent_transform_sends.get(key, ())
+    if ((sent_y is not None and abs(live_y - sent_y) <= TRANSFORM_ECHO_TOLERANCE)
+            or any(abs(live_y - y) <= TRANSFORM_ECHO_TOLERANCE for y, _ in sends)):
+        rest = dict(transform)
+        rest['positionY'] = transform_cache[key].get('positionY', 0.0)
+        transform_cache[key] = rest
+        return
+    rest = dict(transform)
+    rest['positionY'] = live_y - (sends[-1][1] if sends else bobbing_offsets.get(key, 0.0))
+    transform_cache[key] = rest
+    if known is not None:
+        known["transform"]['positionY'] = live_y
+
+def send_bobbing_transform(key: Tuple[str, int], rest_y: float, offset: float, batch: Optional[FrameBatch] = None):
+    sends = recent_transform_sends.get(key)
+    if sends is None:
+        sends = recent_transform_sends[key] = deque(maxlen=TRANSFORM_ECHO_HISTORY)
+    sends.append((rest_y + offset, offset))
+    set_scene_item_transform_edge(key[0], key[1], {'positionY': rest_y + offset}, batch)
+
+def update_bobbing_motion(mouth_level: float, batch: Optional[FrameBatch] = None, elapsed: float = 0.0):
+    global ws, scene, bobbing_phase
+    
+    if not ws or not scene or not BOBBING_ENABLED:
+        return
+    
     try:
-        style.theme_use("clam")
+        bobbing_phase = 2.0 * math.pi * BOBBING_SPEED_HZ * elapsed
+        offset = math.sin(bobbing_phase) * BOBBING_INTENSITY * mouth_level
+
+        hidden_shapes = set(viseme_items)
+        hidden_shapes.discard(active_mouth_item)
+        apply_bobbing([item for item in primary_scene_items()
+                       if item not in hidden_shapes or scene_item_mirror.get(item, {}).get("enabled")],
+                      offset, batch)
     except Exception:
         pass
-    
-    style.configure(".", background=bg_color, foreground=fg_color)
-    style.configure("TFrame", background=bg_color)
-    style.configure("TLabelFrame", background=bg_color, foreground=fg_color, font=("Segoe UI", 11, "bold"))
-    style.configure("TLabelFrame.Label", background=bg_color, foreground=fg_color)
-    style.configure("TLabel", background=bg_color, foreground=fg_color, font=("Segoe UI", 11))
-    style.configure("TButton", background=accent_color, foreground=fg_color, font=("Segoe UI", 10))
-    style.configure("Horizontal.TScale", background=bg_color, troughcolor=trough_color, 
-                   bordercolor=bg_color, darkcolor=accent_color, lightcolor=accent_color)
-    style.configure("Horizontal.TProgressbar", troughcolor=trough_color, background=accent_color, 
-                   bordercolor=bg_color, lightcolor=accent_color, darkcolor=accent_color)
-    style.configure("TCombobox", fieldbackground=bg_color, background=bg_color, foreground=fg_color)
-    style.map("TCombobox",
-              fieldbackground=[('readonly', bg_color), ('!readonly', bg_color)],
-              background=[('readonly', bg_color), ('!readonly', bg_color)],
-              foreground=[('readonly', fg_color), ('!readonly', fg_color)])
 
-    container = ttk.Frame(root)
-    container.pack(fill="both", expand=True)
+def apply_bobbing(items: List[Tuple[str, int]], offset: float, batch: Optional[FrameBatch] = None):
+    for item_scene, item_id in items:
+        rest = get_cached_transform(item_scene, item_id)
+        if not rest:
+            continue
+        bobbing_offsets[(item_scene, item_id)] = offset
+        send_bobbing_transform((item_scene, item_id), rest.get('positionY', 0.0), offset, batch)
 
-    canvas = tk.Canvas(container, bg=bg_color, highlightthickness=0)
-    vsb = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
-    canvas.configure(yscrollcommand=vsb.set)
+def restore_rest_transforms(batch: Optional[FrameBatch] = None, exclude=()):
+    for key in list(bobbing_offsets.keys()):
+        if key in exclude:
+            continue
+        rest = transform_cache.get(key)
+        if rest is not None:
+            send_bobbing_transform(key, rest.get('positionY', 0.0), 0.0, batch)
+        bobbing_offsets.pop(key, None)
 
-    vsb.pack(side="right", fill="y")
-    canvas.pack(side="left", fill="both", expand=True)
+def peaking_biquad(freq: float, gain_db: float, q: float, sample_rate: float) -> Optional[Tuple[float, float, float, float, float]]:
+    if abs(gain_db) < 1e-3 or freq <= 0 or freq >= 0.45 * sample_rate:
+        return None
+    a = 10 ** (gain_db / 40.0)
+    w0 = 2.0 * math.pi * freq / sample_rate
+    alpha = math.sin(w0) / (2.0 * q)
+    cos_w0 = math.cos(w0)
+    a0 = 1.0 + alpha / a
+    return ((1.0 + alpha * a) / a0, (-2.0 * cos_w0) / a0, (1.0 - alpha * a) / a0,
+            (-2.0 * cos_w0) / a0, (1.0 - alpha / a) / a0)
 
-    main_frame = ttk.Frame(canvas)
-    main_frame_id = canvas.create_window((0, 0), window=main_frame, anchor="nw")
+def _cascade_state_space(sections) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    A = np.zeros((0, 0))
+    B = np.zeros(0)
+    C = np.zeros(0)
+    D = 1.0
+    for b0, b1, b2, a1, a2 in sections:
+        As = np.array([[-a1, 1.0], [-a2, 0.0]])
+        Bs = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        Cs = np.array([1.0, 0.0])
+        m = A.shape[0]
+        An = np.zeros((m + 2, m + 2))
+        An[:m, :m] = A
+        An[m:, :m] = np.outer(Bs, C)
+        An[m:, m:] = As
+        A = An
+        B = np.concatenate([B, Bs * D])
+        C = np.concatenate([b0 * C, Cs])
+        D = b0 * D
+    return A, B, C, D
 
-    def on_frame_configure(event):
-        canvas.configure(scrollregion=canvas.bbox("all"))
-    main_frame.bind("<Configure>", on_frame_configure)
+class EqualizerKernel:
+    def __init__(self, sections, block_size: int):
+        A, B, C, D = _cascade_state_space(sections)
+        order = A.shape[0]
+        self.order = order
+        self.block_size = block_size
+        observ = np.empty((block_size, order))
+        ctrl = np.empty((block_size, order))
+        powers = np.empty((block_size + 1, order, order))
+        powers[0] = np.eye(order)
+        row = C.copy()
+        col = B.copy()
+        for n in range(block_size):
+            observ[n] = row
+            ctrl[n] = col
+            powers[n + 1] = powers[n] @ A
+            row = row @ A
+            col = A @ col
+        impulse = np.empty(block_size)
+        impulse[0] = D
+        impulse[1:] = observ[:-1] @ B
+        lag = np.subtract.outer(np.arange(block_size), np.arange(block_size))
+        self.toeplitz = np.where(lag >= 0, impulse[np.clip(lag, 0, None)], 0.0)
+        self.observ = observ
+        self.ctrl_rev = ctrl[::-1].copy()
+        self.ctrl_t = self.ctrl_rev.T
+        self.powers = powers
+        self.powers_full = powers[block_size]
+        self.tmp = np.zeros(block_size)
+        self.state_a = np.zeros(order)
+        self.state_b = np.zeros(order)
+        self._partial: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
 
-    def on_canvas_configure(event):
-        canvas.itemconfigure(main_frame_id, width=event.width)
-    canvas.bind("<Configure>", on_canvas_configure)
+    def process(self, x: np.ndarray, state: np.ndarray) -> np.ndarray:
+        n = x.shape[0]
+        y = self.toeplitz[:n, :n] @ x + self.observ[:n] @ state
+        state[:] = self.powers[n] @ state + self.ctrl_rev[self.block_size - n:].T @ x
+        return y
 
-    def on_mousewheel(event):
-        delta = 0
-        if event.num == 4:
-            delta = -1
-        elif event.num == 5:
-            delta = 1
-        elif hasattr(event, 'delta'):
-            delta = -1 * int(event.delta / 120)
-        canvas.yview_scroll(delta, "units")
+    def process_into(self, x: np.ndarray, n: int, state: np.ndarray, out: np.ndarray):
+        if n == self.block_size:
+            toeplitz, observ, power, ctrl, tmp = self.toeplitz, self.observ, self.powers_full, self.ctrl_t, self.tmp
+        else:
+            views = self._partial.get(n)
+            if views is None:
+                if len(self._partial) >= 16:
+                    self._partial.clear()
+                views = self._partial[n] = (np.ascontiguousarray(self.toeplitz[:n, :n]), self.observ[:n],
+                                            self.powers[n], self.ctrl_rev[self.block_size - n:].T, self.tmp[:n])
+            toeplitz, observ, power, ctrl, tmp = views
+        np.dot(toeplitz, x, out=out)
+        np.dot(observ, state, out=tmp)
+        np.add(out, tmp, out=out)
+        np.dot(power, state, out=self.state_a)
+        np.dot(ctrl, x, out=self.state_b)
+        np.add(self.state_a, self.state_b, out=state)
 
-    canvas.bind_all("<MouseWheel>", on_mousewheel)
-    canvas.bind_all("<Button-4>", on_mousewheel)
-    canvas.bind_all("<Button-5>", on_mousewheel)
+class EqualizerBank:
+    def __init__(self, frequencies: List[float], q: float = EQUALIZER_Q, block_size: int = BLOCK_SIZE):
+        self.frequencies = list(frequencies)
+        self.q = q
+        self.block_size = block_size
+        self.active: Optional[Tuple[EqualizerKernel, np.ndarray]] = None
+        self._config = None
 
-    device_frame = ttk.LabelFrame(main_frame, text="Device Configuration", padding=10)
-    device_frame.pack(fill="x", pady=5)
+    def configure(self, gains_db: List[float], sample_rate: float):
+        config = (tuple(round(g, 3) for g in gains_db), float(sample_rate))
+        if config == self._config:
+            return
+        sections = [sec for sec in (peaking_biquad(f, g, self.q, sample_rate)
+                                    for f, g in zip(self.frequencies, gains_db)) if sec is not None]
+        if not sections:
+            self.active = None
+        else:
+            kernel = EqualizerKernel(sections, self.block_size)
+            active = self.active
+            if active is not None and active[1].shape[0] == kernel.order:
+                state = active[1]
+            else:
+                state = np.zeros(kernel.order)
+            self.active = (kernel, state)
+        self._config = config
 
-    ttk.Label(device_frame, text="Microphone").pack(anchor="w")
-    mic_var = tk.StringVar()
-    mic_combo = ttk.Combobox(device_frame, textvariable=mic_var, state="readonly")
-    mic_combo.pack(fill="x", pady=5)
+    def set_block_size(self, block_size: int):
+        if block_size == self.block_size:
+            return
+        self.block_size = block_size
+        self.active = None
+        self._config = None
 
-    def refresh_mics():
-        global current_mic_name
-        mics = get_audio_devices()
-        mic_combo['values'] = [name for _, name in mics]
-        
-        if current_mic_name and mics:
-            for idx, name in mics:
-                if name == current_mic_name:
-                    mic_var.set(name)
-                    break
+    def reset(self):
+        active = self.active
+        if active is not None:
+            self.active = (active[0], np.zeros_like(active[1]))
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        active = self.active
+        if active is None:
+            return x
+        kernel, state = active
+        if x.shape[0] <= kernel.block_size:
+            return kernel.process(x, state)
+        return np.concatenate([kernel.process(x[i:i + kernel.block_size], state)
+                               for i in range(0, x.shape[0], kernel.block_size)])
+
+    def process_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        active = self.active
+        if active is None:
+            return blocks
+        kernel, state = active
+        forced = blocks @ kernel.ctrl_rev
+        starts = np.empty((blocks.shape[0], kernel.order))
+        for b in range(blocks.shape[0]):
+            starts[b] = state
+            state = kernel.powers_full @ state + forced[b]
+        active[1][:] = state
+        return blocks @ kernel.toeplitz.T + starts @ kernel.observ.T
+
+    def process_into(self, x: np.ndarray, n: int, out: np.ndarray) -> np.ndarray:
+        active = self.active
+        if active is None:
+            return x
+        kernel, state = active
+        if n > kernel.block_size:
+            return x
+        kernel.process_into(x, n, state, out)
+        return out
+
+class AnalysisEngine:
+    def __init__(self, block_size: int = BLOCK_SIZE, channels: int = 1):
+        self.channels = channels
+        self.equalizer = EqualizerBank(EQUALIZER_FREQUENCIES, block_size=block_size)
+        self._allocate(block_size)
+
+    def _allocate(self, block_size: int):
+        self.block_size = block_size
+        self.mono = np.zeros(block_size)
+        self.filtered = np.zeros(block_size)
+        self._mono_col = self.mono.reshape(-1, 1)
+        self._mono_row = self.mono.reshape(1, -1)
+        self._filtered_col = self.filtered.reshape(-1, 1)
+        self._filtered_row = self.filtered.reshape(1, -1)
+        self._energy = np.zeros((1, 1))
+        self.input = np.zeros((block_size, self.channels))
+        self._chunk_plans: Dict[int, Tuple[np.ndarray, List[Tuple]]] = {}
+
+    def resize(self, block_size: int):
+        if block_size == self.block_size:
+            return
+        self.equalizer.set_block_size(block_size)
+        self._allocate(block_size)
+
+    def reset(self):
+        self.equalizer.reset()
+
+    def block_rms(self, indata: np.ndarray, frames: int, gate: Optional["MouthGate"] = None) -> float:
+        if frames == 0:
+            return 0.0
+        if frames == self.block_size and self.channels == 1:
+            np.copyto(self._mono_col, indata)
+            if self.equalizer.process_into(self.mono, frames, self.filtered) is self.filtered:
+                np.dot(self._filtered_row, self._filtered_col, out=self._energy)
+                signal = self.filtered
             else:
-                if mics:
-                    mic_var.set(mics[0][1])
-                    select_mic_device(dev_index=mics[0][0])
-        elif mics:
-            mic_var.set(mics[0][1])
-            select_mic_device(dev_index=mics[0][0])
+                np.dot(self._mono_row, self._mono_col, out=self._energy)
+                signal = self.mono
+            if gate is not None:
+                gate.process(signal, frames)
+            return math.sqrt(self._energy.item() / frames)
+        source, chunks = self._chunk_plan(frames)
+        np.copyto(source, indata)
+        total = 0.0
+        for x, out, x_row, x_col, out_row, out_col, n in chunks:
+            if self.equalizer.process_into(x, n, out) is out:
+                np.dot(out_row, out_col, out=self._energy)
+                signal = out
+            else:
+                np.dot(x_row, x_col, out=self._energy)
+                signal = x
+            total += self._energy.item()
+            if gate is not None:
+                gate.process(signal, n)
+        return math.sqrt(total / frames)
+
+    def _chunk_plan(self, frames: int):
+        plan = self._chunk_plans.get(frames)
+        if plan is not None:
+            return plan
+        if frames > self.input.shape[0]:
+            self.input = np.zeros((frames, self.channels))
+            self._chunk_plans.clear()
+        elif len(self._chunk_plans) >= 64:
+            self._chunk_plans.clear()
+        chunks = []
+        for start in range(0, frames, self.block_size):
+            n = min(self.block_size, frames - start)
+            x = self.input[start:start + n, 0]
+            out = self.filtered if n == self.block_size else self.filtered[:n]
+            chunks.append((x, out, x.reshape(1, -1), x.reshape(-1, 1), out.reshape(1, -1), out.reshape(-1, 1), n))
+        plan = self._chunk_plans[frames] = (self.input[:frames], chunks)
+        return plan
+
+    def filtered_blocks(self, signal: np.ndarray, chunk_blocks: int = 4096):
+        n_blocks = signal.shape[0] // self.block_size
+        blocks = signal[:n_blocks * self.block_size].reshape(n_blocks, self.block_size)
+        for start in range(0, n_blocks, chunk_blocks):
+            chunk = blocks[start:start + chunk_blocks].astype(np.float64)
+            filtered = self.equalizer.process_blocks(chunk)
+            yield start, filtered, np.sqrt(np.einsum('ij,ij->i', filtered, filtered) / self.block_size)
+
+analysis = AnalysisEngine()
+
+class NoiseFloorTracker:
+    def __init__(self, quantile: float = NOISE_FLOOR_QUANTILE, rate_db: float = NOISE_FLOOR_RATE_DB,
+                 initial: float = THRESHOLD_MIN):
+        self.quantile = quantile
+        self.rate_db = rate_db
+        self.initial_db = 20.0 * math.log10(initial)
+        self.floor_db = self.initial_db
+        self.floor = initial
+        self.primed = False
+
+    def update(self, volume: float, frames: int, sample_rate: float) -> float:
+        level_db = 20.0 * math.log10(volume) if volume > 1e-9 else -180.0
+        step_db = self.rate_db * frames / sample_rate
+        if not self.primed:
+            self.floor_db = level_db
+            self.primed = True
+        elif level_db < self.floor_db:
+            self.floor_db -= step_db * (1.0 - self.quantile)
         else:
-            mic_var.set("No input devices")
+            self.floor_db += step_db * self.quantile
+        self.floor = 10.0 ** (self.floor_db / 20.0)
+        return self.floor
 
-    def on_mic_select(event):
-        selected_name = mic_var.get()
-        for idx, name in available_mics:
-            if name == selected_name:
-                select_mic_device(dev_index=idx)
-                print(f"Selected microphone: {name} (index {idx})")
-                break
+    def seed(self, floor: float):
+        self.floor_db = 20.0 * math.log10(max(floor, 1e-9))
+        self.floor = 10.0 ** (self.floor_db / 20.0)
+        self.primed = True
 
-    mic_combo.bind('<<ComboboxSelected>>', on_mic_select)
-    ttk.Button(device_frame, text="Refresh Microphones", command=refresh_mics).pack(pady=5)
+    def reset(self):
+        self.floor_db = self.initial_db
+        self.floor = 10.0 ** (self.floor_db / 20.0)
+        self.primed = False
+
+    def threshold(self, margin_db: float) -> float:
+        return min(THRESHOLD_MAX, max(THRESHOLD_MIN, self.floor * 10.0 ** (margin_db / 20.0)))
+
+class MouthGate:
+    def __init__(self, attack_ms: float = GATE_ATTACK_MS, hold_ms: float = GATE_HOLD_MS,
+                 release_ms: float = GATE_RELEASE_MS, close_ratio: float = GATE_CLOSE_RATIO,
+                 max_frames: int = BLOCK_SIZE):
+        self.attack_ms = attack_ms
+        self.hold_ms = hold_ms
+        self.release_ms = release_ms
+        self.close_ratio = close_ratio
+        self.sample_rate = 48000.0
+        self.sub_len = 32
+        self.sub_ms = self.sub_len * 1000.0 / self.sample_rate
+        self.energies = np.zeros(max_frames)
+        self.squares = np.zeros(max_frames)
+        self._views: List[Tuple] = []
+        self.open_energy = 0.0
+        self.close_energy = 0.0
+        self.level = 0.0
+        self.open = False
+        self.hold_left = 0.0
+
+    def configure(self, sample_rate: float, attack_ms: Optional[float] = None, hold_ms: Optional[float] = None,
+                  release_ms: Optional[float] = None, close_ratio: Optional[float] = None):
+        if attack_ms is not None:
+            self.attack_ms = attack_ms
+        if hold_ms is not None:
+            self.hold_ms = hold_ms
+        if release_ms is not None:
+            self.release_ms = release_ms
+        if close_ratio is not None:
+            self.close_ratio = close_ratio
+        sub_len = 8
+        while sub_len * 2 <= sample_rate * GATE_SUBBLOCK_MS / 1000.0:
+            sub_len *= 2
+        self.sample_rate = float(sample_rate)
+        self.sub_len = sub_len
+        self.sub_ms = sub_len * 1000.0 / self.sample_rate
+
+    def set_threshold(self, threshold: float):
+        energy = threshold * threshold * self.sub_len
+        self.open_energy = energy
+        self.close_energy = energy * self.close_ratio * self.close_ratio
+
+    def reset(self):
+        self.level = 0.0
+        self.open = False
+        self.hold_left = 0.0
+
+    def _step(self, energy: float, dt_ms: float):
+        if energy > self.open_energy:
+            self.open = True
+            self.hold_left = self.hold_ms
+        elif self.open:
+            if energy >= self.close_energy:
+                self.hold_left = self.hold_ms
+            else:
+                self.hold_left -= dt_ms
+                if self.hold_left <= 0.0:
+                    self.open = False
+        if self.open:
+            if self.level < 1.0:
+                self.level = min(1.0, self.level + dt_ms / max(self.attack_ms, 1e-3))
+        elif self.level > 0.0:
+            self.level = max(0.0, self.level - dt_ms / max(self.release_ms, 1e-3))
+
+    def _sub_blocks(self, signal: np.ndarray, full: int):
+        sub_len = self.sub_len
+        for views in self._views:
+            if views[0] is signal and views[1] == full and views[2] == sub_len:
+                return views
+        if full > self.energies.shape[0] or full * sub_len > self.squares.shape[0]:
+            self.energies = np.zeros(max(full, self.energies.shape[0]))
+            self.squares = np.zeros(max(full * sub_len, self.squares.shape[0]))
+            self._views = []
+        elif len(self._views) >= 8:
+            self._views = []
+        views = (signal, full, sub_len, signal[:full * sub_len].reshape(full, sub_len),
+                 self.squares[:full * sub_len].reshape(full, sub_len), np.ones(sub_len), self.energies[:full])
+        self._views.append(views)
+        return views
+
+    def process(self, signal: np.ndarray, n: int) -> float:
+        sub_len = self.sub_len
+        full = n // sub_len
+        if full:
+            _, _, _, blocks, squares, ones, energies = self._sub_blocks(signal, full)
+            np.multiply(blocks, blocks, out=squares)
+            np.dot(squares, ones, out=energies)
+            sub_ms = self.sub_ms
+            for i in range(full):
+                self._step(energies.item(i), sub_ms)
+        tail = n - full * sub_len
+        if tail:
+            energy = 0.0
+            for i in range(full * sub_len, n):
+                sample = signal.item(i)
+                energy += sample * sample
+            self._step(energy * sub_len / tail, tail * 1000.0 / self.sample_rate)
+        return self.level
+
+class ThresholdCalibrator:
+    def __init__(self):
+        self.phase = None
+        self.active = False
+        self._buffer = np.zeros(0)
+        self._phase_samples = 0
+        self._samples = 0
+        self._split = 0
+        self._index = 0
+
+    def start(self, seconds: float, sample_rate: int, min_frames: int = 32):
+        self._phase_samples = max(1, int(seconds * sample_rate))
+        capacity = 2 * (self._phase_samples // min_frames + 1)
+        if self._buffer.shape[0] < capacity:
+            self._buffer = np.zeros(capacity)
+        self._samples = 0
+        self._split = 0
+        self._index = 0
+        self.phase = "silence"
+        self.active = True
+
+    def feed(self, volume: float, frames: int = BLOCK_SIZE):
+        if self._index < self._buffer.shape[0]:
+            self._buffer[self._index] = volume
+            self._index += 1
+        self._samples += frames
+        if self.phase == "silence" and self._samples >= self._phase_samples:
+            self.phase = "speech"
+            self._split = self._index
+        elif self.phase == "speech" and self._samples >= 2 * self._phase_samples:
+            self.phase = "done"
+            self.active = False
+
+    def cancel(self):
+        self.active = False
+        self.phase = None
+
+    def result(self) -> Optional[Tuple[float, float]]:
+        if self.phase != "done":
+            return None
+        self.phase = None
+        if self._split == 0 or self._index == self._split:
+            return None
+        silence = self._buffer[:self._split]
+        speech = self._buffer[self._split:self._index]
+        noise = float(np.percentile(silence, 95))
+        voice = float(np.percentile(speech, 75))
+        if voice <= noise * 1.5:
+            return None
+        floor = max(float(np.percentile(silence, NOISE_FLOOR_QUANTILE * 100.0)), 1e-9)
+        return math.sqrt(noise * voice), floor
+
+class VisemeEngine:
+    F1_SCALE = 0.25
+    F2_SCALE = 0.2
+    BRIGHTNESS_SCALE = 0.1
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._allocate(block_size)
+        self.low_band = (0, 0)
+        self.high_band = (0, 0)
+        self.targets: List[Tuple[float, float, float]] = []
+        self.enter = np.zeros(0)
+        self.exit = np.zeros(0)
+        self.scores = np.zeros(0)
+        self.f1 = 0.0
+        self.f2 = 0.0
+        self.brightness = 0.0
+        self.current = -1
+
+    def _allocate(self, fft_size: int):
+        self.fft_size = fft_size
+        self.window = np.hanning(fft_size)
+        self.histories = (np.zeros(fft_size), np.zeros(fft_size))
+        self.history = self.histories[0]
+        self._parity = 0
+        self._feed_views = (0, ())
+        self._build_basis(0, 48000.0)
+
+    def _build_basis(self, bins: int, sample_rate: float):
+        phase = 2.0 * np.pi * np.outer(np.arange(self.fft_size), np.arange(bins)) / self.fft_size
+        self.basis = np.hstack((np.cos(phase), np.sin(phase))) * self.window[:, None]
+        self.spectrum = np.zeros(2 * bins)
+        self._real_sq = self.spectrum[:bins]
+        self._imag_sq = self.spectrum[bins:]
+        self.power = np.zeros(bins)
+        self.weighted = np.zeros(bins)
+        self.freqs = np.arange(bins) * sample_rate / self.fft_size
+        self.cumulative = np.zeros(bins + 1)
+        self.cumulative_weighted = np.zeros(bins + 1)
+        self._cumulative_tail = self.cumulative[1:]
+        self._cumulative_weighted_tail = self.cumulative_weighted[1:]
+
+    def _bin(self, freq: float, sample_rate: float) -> int:
+        return int(min(self.fft_size // 2 + 1, max(0, round(freq * self.fft_size / sample_rate))))
+
+    def configure(self, shapes: List[Dict], sample_rate: float):
+        fft_size = self.block_size
+        while fft_size < sample_rate * VISEME_WINDOW_SECONDS:
+            fft_size *= 2
+        if fft_size != self.fft_size:
+            self._allocate(fft_size)
+        self.low_band = (self._bin(VISEME_LOW_BAND[0], sample_rate), self._bin(VISEME_LOW_BAND[1], sample_rate))
+        self.high_band = (self._bin(VISEME_HIGH_BAND[0], sample_rate), self._bin(VISEME_HIGH_BAND[1], sample_rate))
+        self._build_basis(max(self.low_band[1], self.high_band[1]), sample_rate)
+        self.targets = [(math.log(float(shape["f1"])), math.log(float(shape["f2"])), float(shape["brightness"]))
+                        for shape in shapes]
+        self.enter = np.array([float(shape.get("enter", 0.5)) for shape in shapes])
+        self.exit = np.array([float(shape.get("exit", shape.get("enter", 0.5))) for shape in shapes])
+        self.scores = np.zeros(len(shapes))
+        self.current = -1
+
+    def reset(self):
+        self.current = -1
+        self.scores.fill(0.0)
+        for history in self.histories:
+            history.fill(0.0)
+
+    def _views_for(self, n: int):
+        keep = self.fft_size - n
+        views = []
+        for source, target in (self.histories, self.histories[::-1]):
+            views.append((target, target[:keep], source[n:], target[keep:], target[keep:].reshape(n, 1)))
+        self._feed_views = (n, views)
+        return views
+
+    def feed(self, indata: np.ndarray, frames: int):
+        n = frames if frames < self.fft_size else self.fft_size
+        views = self._feed_views[1] if self._feed_views[0] == n else self._views_for(n)
+        target, head, shifted, fresh, fresh_column = views[self._parity]
+        if n < self.fft_size:
+            np.copyto(head, shifted)
+        if frames == n:
+            np.copyto(fresh_column, indata)
+        else:
+            np.copyto(fresh, indata[frames - n:frames, 0])
+        self.history = target
+        self._parity ^= 1
+
+    def features(self) -> np.ndarray:
+        np.dot(self.history, self.basis, out=self.spectrum)
+        np.multiply(self.spectrum, self.spectrum, out=self.spectrum)
+        np.add(self._real_sq, self._imag_sq, out=self.power)
+        np.multiply(self.power, self.freqs, out=self.weighted)
+        np.add.accumulate(self.power, out=self._cumulative_tail)
+        np.add.accumulate(self.weighted, out=self._cumulative_weighted_tail)
+        cumulative = self.cumulative
+        cumulative_weighted = self.cumulative_weighted
+        lo, hi = self.low_band
+        low = cumulative.item(hi) - cumulative.item(lo)
+        low_weighted = cumulative_weighted.item(hi) - cumulative_weighted.item(lo)
+        lo, hi = self.high_band
+        high = cumulative.item(hi) - cumulative.item(lo)
+        high_weighted = cumulative_weighted.item(hi) - cumulative_weighted.item(lo)
+        if low <= 0.0 or high <= 0.0:
+            self.scores.fill(0.0)
+            return self.scores
+        self.f1 = low_weighted / low
+        self.f2 = high_weighted / high
+        self.brightness = high / (low + high)
+        log_f1 = math.log(self.f1)
+        log_f2 = math.log(self.f2)
+        for i, (t1, t2, tb) in enumerate(self.targets):
+            d1 = (log_f1 - t1) / self.F1_SCALE
+            d2 = (log_f2 - t2) / self.F2_SCALE
+            db = (self.brightness - tb) / self.BRIGHTNESS_SCALE
+            self.scores[i] = math.exp(-0.5 * (d1 * d1 + d2 * d2 + db * db))
+        return self.scores
+
+    def classify(self) -> int:
+        scores = self.features()
+        if not len(scores):
+            return -1
+        best = int(scores.argmax())
+        current = self.current
+        if current >= 0 and scores.item(current) >= self.exit.item(current):
+            if (best != current and scores.item(best) >= self.enter.item(best)
+                    and scores.item(best) > scores.item(current) + VISEME_SWITCH_MARGIN):
+                current = best
+        elif scores.item(best) >= self.enter.item(best):
+            current = best
+        else:
+            current = -1
+        self.current = current
+        return current
+
+visemes = VisemeEngine()
+
+def update_viseme_bands():
+    try:
+        visemes.configure(VISEME_SHAPES, SAMPLE_RATE)
+    except Exception as e:
+        add_warning(f"Failed to configure viseme shapes: {e}")
+
+def benchmark_visemes(blocks: int = 2000, block_size: int = BLOCK_SIZE, sample_rate: int = 48000):
+    import tracemalloc
+    engine = VisemeEngine(block_size)
+    engine.configure(VISEME_SHAPES, sample_rate)
+    signal = synthetic_signal("speech", sample_rate, blocks * block_size / sample_rate)
+    signal = signal[:blocks * block_size].reshape(blocks, block_size, 1)
+    for i in range(min(blocks, 50)):
+        engine.feed(signal[i], block_size)
+        engine.classify()
+    timings = np.empty(blocks)
+    for i in range(blocks):
+        block = signal[i]
+        t0 = time.perf_counter()
+        engine.feed(block, block_size)
+        engine.classify()
+        timings[i] = time.perf_counter() - t0
+    tracemalloc.start()
+    transient_bytes = 0
+    for i in range(blocks):
+        block = signal[i]
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        engine.feed(block, block_size)
+        engine.classify()
+        _, peak = tracemalloc.get_traced_memory()
+        transient_bytes += peak - current
+    tracemalloc.stop()
+    timings *= 1000.0
+    print(f"Visemes: block {block_size} @ {sample_rate} Hz, FFT {engine.fft_size}, {len(VISEME_SHAPES)} shapes, "
+          f"{engine.power.shape[0]} DFT bins")
+    print(f"  per block mean {timings.mean():.4f} ms  p99 {np.percentile(timings, 99):.4f} ms  "
+          f"allocated {transient_bytes / blocks:.1f} bytes/block")
+
+noise_floor = NoiseFloorTracker()
+calibrator = ThresholdCalibrator()
+mouth_gate = MouthGate()
+
+def update_mouth_gate():
+    mouth_gate.configure(SAMPLE_RATE, GATE_ATTACK_MS, GATE_HOLD_MS, GATE_RELEASE_MS, GATE_CLOSE_RATIO)
+
+def latency_profile() -> Dict:
+    return LATENCY_PROFILES.get(LATENCY_PROFILE, LATENCY_PROFILES["balanced"])
+
+def update_analysis_block():
+    analysis.resize(latency_profile()["analysis_block"])
+    update_equalizer_filters()
+
+def format_latency_report() -> str:
+    lines = []
+    for name, profile in LATENCY_PROFILES.items():
+        histogram = decision_latency[name]
+        block = f"block {profile['blocksize']}" if profile["blocksize"] else "host blocks"
+        if histogram.count:
+            measured = f"p50 {histogram.percentile(50):5.1f} ms  p95 {histogram.percentile(95):5.1f} ms"
+        else:
+            measured = "not measured yet"
+        marker = "*" if name == LATENCY_PROFILE else " "
+        lines.append(f"{marker} {name:<9} {block:<11} input->decision {measured}")
+    return "\n".join(lines)
+effective_threshold = THRESHOLD
+
+def current_threshold() -> float:
+    if ADAPTIVE_THRESHOLD:
+        return noise_floor.threshold(THRESHOLD_MARGIN_DB)
+    return THRESHOLD
+
+def start_calibration(seconds: float = CALIBRATION_SECONDS) -> bool:
+    if not lipsync_running or not stream_active:
+        add_warning("Start lipsync before calibrating the threshold")
+        return False
+    calibrator.start(seconds, SAMPLE_RATE)
+    return True
+
+def finish_calibration() -> bool:
+    global THRESHOLD, THRESHOLD_MARGIN_DB
+    result = calibrator.result()
+    if result is None:
+        add_warning("Calibration failed: speech was not clearly louder than silence")
+        return False
+    threshold, floor = result
+    THRESHOLD = min(THRESHOLD_MAX, max(THRESHOLD_MIN, threshold))
+    THRESHOLD_MARGIN_DB = round(20.0 * math.log10(THRESHOLD / floor), 1)
+    noise_floor.seed(floor)
+    save_config()
+    print(f"Calibrated threshold {THRESHOLD:.5f} (noise floor {floor:.6f}, margin {THRESHOLD_MARGIN_DB:.1f} dB)")
+    return True
+
+def update_equalizer_filters():
+    with equalizer_lock:
+        try:
+            analysis.equalizer.configure(EQUALIZER_GAINS, SAMPLE_RATE)
+        except Exception as e:
+            add_warning(f"Failed to update equalizer: {e}")
+
+def equalizer_updater():
+    while not equalizer_updater_stop.is_set():
+        if not equalizer_dirty.wait(0.5):
+            continue
+        equalizer_dirty.clear()
+        update_equalizer_filters()
+
+def request_equalizer_update():
+    global equalizer_updater_thread
+    equalizer_dirty.set()
+    if equalizer_updater_thread and equalizer_updater_thread.is_alive():
+        return
+    equalizer_updater_stop.clear()
+    equalizer_updater_thread = threading.Thread(target=equalizer_updater, name="lipsync-equalizer", daemon=True)
+    equalizer_updater_thread.start()
+
+def stop_equalizer_updater():
+    global equalizer_updater_thread
+    equalizer_updater_stop.set()
+    if equalizer_updater_thread and equalizer_updater_thread is not threading.current_thread():
+        equalizer_updater_thread.join(timeout=2.0)
+    equalizer_updater_thread = None
+
+def benchmark_equalizer(blocks: int = 2000, block_size: int = BLOCK_SIZE, sample_rate: int = 48000):
+    bank = EqualizerBank(EQUALIZER_FREQUENCIES, block_size=block_size)
+    started = time.perf_counter()
+    bank.configure([-6.0, 3.0, 0.0, 2.0, 6.0, 4.0, -3.0], sample_rate)
+    setup_ms = (time.perf_counter() - started) * 1000.0
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal((blocks, block_size)) * 0.1
+    timings = np.empty(blocks)
+    for i in range(blocks):
+        t0 = time.perf_counter()
+        bank.process(signal[i])
+        timings[i] = time.perf_counter() - t0
+    timings *= 1000.0
+    budget_ms = block_size / sample_rate * 1000.0
+    print(f"Equalizer: {len(EQUALIZER_FREQUENCIES)} bands, block {block_size} @ {sample_rate} Hz "
+          f"(budget {budget_ms:.2f} ms), coefficient update {setup_ms:.2f} ms")
+    print(f"  per block mean {timings.mean():.4f} ms  p50 {np.percentile(timings, 50):.4f} ms  "
+          f"p99 {np.percentile(timings, 99):.4f} ms  max {timings.max():.4f} ms")
+
+def benchmark_analysis(blocks: int = 2000, block_size: int = BLOCK_SIZE, sample_rate: int = 48000,
+                       host_frames: Optional[List[int]] = None):
+    import tracemalloc
+    engine = AnalysisEngine(block_size)
+    engine.equalizer.configure([-6.0, 3.0, 0.0, 2.0, 6.0, 4.0, -3.0], sample_rate)
+    gate = MouthGate(max_frames=block_size)
+    gate.configure(sample_rate)
+    gate.set_threshold(THRESHOLD)
+    sizes = [host_frames[i % len(host_frames)] if host_frames else block_size for i in range(blocks)]
+    rng = np.random.default_rng(0)
+    signal = (rng.standard_normal((sum(sizes), 1)) * 0.1).astype(np.float32)
+    offsets = np.cumsum([0] + sizes)
+    callbacks = [signal[offsets[i]:offsets[i + 1]] for i in range(blocks)]
+    for i in range(0, blocks, 3):
+        callbacks[i] *= 0.001
+    for i in range(min(blocks, 50)):
+        engine.block_rms(callbacks[i], sizes[i], gate)
+    timings = np.empty(blocks)
+    tracemalloc.start()
+    baseline_blocks = sys.getallocatedblocks()
+    transient_bytes = 0
+    for i in range(blocks):
+        block = callbacks[i]
+        frames = sizes[i]
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        t0 = time.perf_counter()
+        engine.block_rms(block, frames, gate)
+        timings[i] = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        transient_bytes += peak - current
+    leaked_blocks = sys.getallocatedblocks() - baseline_blocks
+    tracemalloc.stop()
+    timings *= 1000.0
+    host = f", host blocks {'/'.join(str(n) for n in host_frames)}" if host_frames else ""
+    print(f"Analysis: block {block_size} @ {sample_rate} Hz{host}, 7-band EQ and mouth gate active")
+    print(f"  per block mean {timings.mean():.4f} ms  p99 {np.percentile(timings, 99):.4f} ms  "
+          f"allocated {transient_bytes / blocks:.1f} bytes/block  live blocks delta {leaked_blocks}")
+
+def benchmark_gate(blocks: int = 4000, block_size: int = BLOCK_SIZE, sample_rate: int = 48000):
+    gate = MouthGate(max_frames=block_size)
+    gate.configure(sample_rate)
+    gate.set_threshold(THRESHOLD)
+    full = block_size // gate.sub_len
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal((blocks, block_size)) * 0.1
+    signal[::3] *= 0.001
+    energies = (signal[:, :full * gate.sub_len].reshape(blocks, full, gate.sub_len) ** 2).sum(axis=2)
+    for i in range(min(blocks, 50)):
+        gate.process(signal[i], block_size)
+    started = time.perf_counter()
+    for i in range(blocks):
+        gate.process(signal[i], block_size)
+    process_us = (time.perf_counter() - started) / blocks * 1e6
+    sub_ms = gate.sub_ms
+    started = time.perf_counter()
+    for i in range(blocks):
+        row = energies[i]
+        for j in range(full):
+            gate._step(row.item(j), sub_ms)
+    loop_us = (time.perf_counter() - started) / blocks * 1e6
+    rate = sample_rate / block_size
+    print(f"Mouth gate: block {block_size} @ {sample_rate} Hz, {full} sub-blocks of {gate.sub_len}, "
+          f"{rate:.0f} callbacks/s")
+    print(f"  per block {process_us:.2f} us, transitions {loop_us:.2f} us  "
+          f"(transitions {loop_us * rate / 1e4:.3f}% of one core)")
+
+def load_audio_file(path: str) -> Tuple[np.ndarray, int]:
+    try:
+        import soundfile
+    except ImportError:
+        soundfile = None
+    if soundfile is not None:
+        data, rate = soundfile.read(path, dtype="float32", always_2d=True)
+        return np.ascontiguousarray(data[:, 0]), int(rate)
+    import wave
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (packed[:, 0].astype(np.int32) | (packed[:, 1].astype(np.int32) << 8) |
+                (packed[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    return np.ascontiguousarray(data.reshape(-1, channels)[:, 0]), rate
+
+def render_timeline(signal: np.ndarray, sample_rate: int, fps: Optional[float] = None,
+                    block_size: Optional[int] = None) -> Dict:
+    profile = latency_profile()
+    block_size = block_size or profile["blocksize"] or profile["analysis_block"]
+    engine = AnalysisEngine(block_size)
+    engine.equalizer.configure(EQUALIZER_GAINS, sample_rate)
+    gate = MouthGate(max_frames=block_size)
+    gate.configure(sample_rate, GATE_ATTACK_MS, GATE_HOLD_MS, GATE_RELEASE_MS, GATE_CLOSE_RATIO)
+    tracker = NoiseFloorTracker()
+    multiplier = max(VOLUME_MULTIPLIER, 1e-9)
+    threshold = THRESHOLD
+    states = np.empty(signal.shape[0] // block_size)
+    for start, filtered, chunk_rms in engine.filtered_blocks(signal):
+        volumes = chunk_rms * VOLUME_MULTIPLIER
+        volumes = np.where(np.isfinite(volumes), np.minimum(volumes, 10.0), 0.0).tolist()
+        for i, volume in enumerate(volumes):
+            gate.set_threshold(threshold / multiplier)
+            states[start + i] = gate.process(filtered[i], block_size)
+            tracker.update(volume, block_size, sample_rate)
+            threshold = tracker.threshold(THRESHOLD_MARGIN_DB) if ADAPTIVE_THRESHOLD else THRESHOLD
+    block_ends = (np.arange(states.shape[0]) + 1) * block_size
+
+    mouth = []
+    if LIPSYNC_ENABLED:
+        open_flags = (states > 0.5).astype(np.int8)
+        changes = np.flatnonzero(np.diff(open_flags, prepend=0))
+        mouth = [[0, 0]] + [[int(block_ends[b]), int(open_flags[b])] for b in changes]
+
+    fps = fps or animation_frame_rate()
+    bobbing = []
+    if BOBBING_ENABLED and states.shape[0]:
+        frame_times = np.arange(0.0, signal.shape[0] / sample_rate, 1.0 / fps)
+        frame_samples = np.round(frame_times * sample_rate).astype(np.int64)
+        latest_block = frame_samples // block_size - 1
+        levels = np.where(latest_block >= 0, states[np.clip(latest_block, 0, None)], 0.0)
+        offsets = np.round(np.sin(2.0 * math.pi * BOBBING_SPEED_HZ * frame_times) * BOBBING_INTENSITY * levels, 3)
+        offsets[offsets == 0.0] = 0.0
+        changes = np.flatnonzero(np.diff(offsets, prepend=np.nan))
+        bobbing = [[int(frame_samples[k]), float(offsets[k])] for k in changes]
+
+    return {
+        "sample_rate": sample_rate,
+        "block_size": block_size,
+        "animation_fps": fps,
+        "duration_samples": int(signal.shape[0]),
+        "mouth": mouth,
+        "bobbing": bobbing,
+    }
+
+def write_timeline(timeline: Dict, path: str):
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            f.write(f"# sample_rate={timeline['sample_rate']} animation_fps={timeline['animation_fps']}\n")
+            f.write("sample,track,value\n")
+            for sample, value in timeline["mouth"]:
+                f.write(f"{sample},mouth,{value}\n")
+            for sample, value in timeline["bobbing"]:
+                f.write(f"{sample},bobbing,{value}\n")
+    else:
+        with open(path, "w") as f:
+            json.dump(timeline, f, separators=(",", ":"))
+
+def run_offline(input_path: str, output_path: Optional[str], fps: Optional[float]) -> int:
+    try:
+        started = time.perf_counter()
+        signal, rate = load_audio_file(input_path)
+        timeline = render_timeline(signal, rate, fps)
+        output_path = output_path or os.path.splitext(input_path)[0] + "_timeline.json"
+        write_timeline(timeline, output_path)
+        elapsed = time.perf_counter() - started
+        duration = signal.shape[0] / rate
+        print(f"Rendered {duration:.1f} s of audio in {elapsed:.2f} s ({duration / max(elapsed, 1e-9):.0f}x real time): "
+              f"{len(timeline['mouth'])} mouth and {len(timeline['bobbing'])} bobbing keyframes -> {output_path}")
+        return 0
+    except Exception as e:
+        print(f"Offline render failed: {e}")
+        return 1
+
+class Channel:
+    def __init__(self, cfg: Dict):
+        self.name = cfg.get("name") or cfg.get("open_source") or "channel"
+        self.mic_device_name = cfg.get("mic_device_name")
+        self.closed_source = cfg.get("closed_source", CLOSED_MOUTH_SOURCE)
+        self.open_source = cfg.get("open_source", OPEN_MOUTH_SOURCE)
+        self.base_source = cfg.get("base_source", AVATAR_BASE_SOURCE)
+        self.threshold = cfg.get("threshold", THRESHOLD)
+        self.multiplier = cfg.get("multiplier", VOLUME_MULTIPLIER)
+        self.gate_attack_ms = cfg.get("gate_attack_ms", GATE_ATTACK_MS)
+        self.gate_hold_ms = cfg.get("gate_hold_ms", GATE_HOLD_MS)
+        self.gate_release_ms = cfg.get("gate_release_ms", GATE_RELEASE_MS)
+        self.gate_close_ratio = cfg.get("gate_close_ratio", GATE_CLOSE_RATIO)
+        self.adaptive_threshold = cfg.get("adaptive_threshold", False)
+        self.threshold_margin_db = cfg.get("threshold_margin_db", THRESHOLD_MARGIN_DB)
+        self.equalizer_gains = list(cfg.get("equalizer_gains", [0.0] * len(EQUALIZER_FREQUENCIES)))
+        self.lipsync_enabled = cfg.get("lipsync_enabled", True)
+        self.bobbing_enabled = cfg.get("bobbing_enabled", True)
+        self.bobbing_intensity = cfg.get("bobbing_intensity", BOBBING_INTENSITY)
+        self.device_index = None
+        self.closed_item = self.open_item = self.base_item = (None, None)
+        self.analysis = AnalysisEngine()
+        self.noise_floor = NoiseFloorTracker()
+        self.gate = MouthGate()
+        self.threshold_now = self.threshold
+        self.slot = LatestValueSlot()
+        self.mouth_state = 0.0
+        self.current_volume = 0.0
+        self.level = 0.0
+
+    def to_config(self) -> Dict:
+        return {
+            "name": self.name,
+            "mic_device_name": self.mic_device_name,
+            "closed_source": self.closed_source,
+            "open_source": self.open_source,
+            "base_source": self.base_source,
+            "threshold": self.threshold,
+            "multiplier": self.multiplier,
+            "gate_attack_ms": self.gate_attack_ms,
+            "gate_hold_ms": self.gate_hold_ms,
+            "gate_release_ms": self.gate_release_ms,
+            "gate_close_ratio": self.gate_close_ratio,
+            "adaptive_threshold": self.adaptive_threshold,
+            "threshold_margin_db": self.threshold_margin_db,
+            "equalizer_gains": self.equalizer_gains,
+            "lipsync_enabled": self.lipsync_enabled,
+            "bobbing_enabled": self.bobbing_enabled,
+            "bobbing_intensity": self.bobbing_intensity,
+        }
+
+    def source_names(self) -> List[str]:
+        return [self.closed_source, self.open_source, self.base_source]
+
+    def rename_source(self, old_name: str, new_name: str) -> bool:
+        renamed = False
+        for attr in ("closed_source", "open_source", "base_source"):
+            if getattr(self, attr) == old_name:
+                setattr(self, attr, new_name)
+                renamed = True
+        return renamed
+
+    def bind(self, scene_name: str):
+        self.closed_item = lookup_scene_item(scene_name, self.closed_source)
+        self.open_item = lookup_scene_item(scene_name, self.open_source)
+        self.base_item = lookup_scene_item(scene_name, self.base_source)
+
+    def bound_items(self) -> List[Tuple[str, int]]:
+        return [item for item in (self.base_item, self.open_item, self.closed_item) if item[0] and item[1]]
+
+    def reset(self, sample_rate: int):
+        self.analysis.resize(latency_profile()["analysis_block"])
+        self.analysis.equalizer.configure(self.equalizer_gains, sample_rate)
+        self.analysis.reset()
+        self.noise_floor.reset()
+        self.gate.configure(sample_rate, self.gate_attack_ms, self.gate_hold_ms,
+                            self.gate_release_ms, self.gate_close_ratio)
+        self.gate.reset()
+        self.threshold_now = self.threshold
+        self.slot.reset()
+        self.mouth_state = 0.0
+        self.current_volume = 0.0
+        self.level = 0.0
+
+    def process(self, indata, frames: int, stamp: float):
+        if frames == 0:
+            return
+        self.gate.set_threshold(self.threshold_now / max(self.multiplier, 1e-9))
+        volume = self.analysis.block_rms(indata, frames, self.gate) * self.multiplier
+        if math.isnan(volume) or math.isinf(volume):
+            volume = 0.0
+        volume = min(volume, 10.0)
+        self.current_volume = min(1.0, max(0.0, volume))
+        self.noise_floor.update(volume, frames, SAMPLE_RATE)
+        if self.adaptive_threshold:
+            self.threshold_now = self.noise_floor.threshold(self.threshold_margin_db)
+        else:
+            self.threshold_now = self.threshold
+        self.mouth_state = self.gate.level
+        self.slot.publish(self.mouth_state, stamp)
+
+    def advance(self):
+        frame = self.slot.take(timeout=0)
+        if frame is not None:
+            self.level = frame[0]
+
+    def bobbing_offset(self, elapsed: float) -> float:
+        if not self.bobbing_enabled:
+            return 0.0
+        return math.sin(2.0 * math.pi * BOBBING_SPEED_HZ * elapsed) * self.bobbing_intensity * self.level
+
+    def render(self, batch: FrameBatch, elapsed: float):
+        self.advance()
+        if self.lipsync_enabled and self.closed_item[1] and self.open_item[1]:
+            opened = self.level > 0.5
+            set_scene_item_enabled_edge(self.closed_item[0], self.closed_item[1], not opened, batch)
+            set_scene_item_enabled_edge(self.open_item[0], self.open_item[1], opened, batch)
+        if self.bobbing_enabled:
+            apply_bobbing(self.bound_items(), self.bobbing_offset(elapsed), batch)
+
+    def release(self, batch: Optional[FrameBatch] = None):
+        self.level = 0.0
+        if self.closed_item[1] and self.open_item[1]:
+            set_scene_item_enabled_edge(self.closed_item[0], self.closed_item[1], True, batch)
+            set_scene_item_enabled_edge(self.open_item[0], self.open_item[1], False, batch)
+
+def active_channels() -> List[Channel]:
+    return [channel for channel in channels if channel.device_index is not None]
+
+def make_channel_callback(device: int, device_channels: List[Channel]):
+    def callback(indata, frames, time_info, status):
+        if not lipsync_running:
+            return
+        started = time.perf_counter()
+        channel_stream_seen[device] = started
+        if status:
+            if getattr(status, "input_overflow", False):
+                audio_stats["input_overflows"] += 1
+            add_warning(f"Audio warning (device {device}): {status}")
+        for channel in device_channels:
+            try:
+                channel.process(indata, frames, started)
+            except Exception as e:
+                add_warning(f"Channel '{channel.name}' audio error: {e}")
+    return callback
+
+def start_channels():
+    global primary_device_channels
+    shared = []
+    groups: Dict[int, List[Channel]] = {}
+    for channel in channels:
+        channel.device_index = find_mic_by_name(channel.mic_device_name) if channel.mic_device_name else None
+        if channel.device_index is None:
+            add_warning(f"Channel '{channel.name}': microphone '{channel.mic_device_name}' not found")
+            continue
+        if scene:
+            channel.bind(scene)
+        channel.reset(SAMPLE_RATE)
+        if channel.device_index == device_index:
+            shared.append(channel)
+        else:
+            groups.setdefault(channel.device_index, []).append(channel)
+    primary_device_channels = shared
+    for device, device_channels in groups.items():
+        try:
+            with device_registry.lock:
+                channel_streams[device] = open_input_stream(device, make_channel_callback(device, device_channels))
+                channel_stream_seen[device] = time.perf_counter()
+        except Exception as e:
+            for channel in device_channels:
+                channel.device_index = None
+            add_warning(f"Could not open device {device} for channels "
+                        f"{', '.join(channel.name for channel in device_channels)}: {e}")
+    if channels:
+        print(f"Channels: {len(active_channels())}/{len(channels)} active, "
+              f"{len(shared)} sharing the main microphone, {len(channel_streams)} extra stream(s)")
+
+def close_channel_stream(device: int):
+    channel_stream = channel_streams.pop(device, None)
+    channel_stream_seen.pop(device, None)
+    if channel_stream is not None:
+        try:
+            channel_stream.stop()
+            channel_stream.close()
+        except Exception:
+            pass
+    for channel in active_channels():
+        if channel.device_index == device:
+            channel.release()
+            channel.device_index = None
+
+def release_primary_channels():
+    global primary_device_channels
+    for channel in primary_device_channels:
+        channel.release()
+        channel.device_index = None
+    primary_device_channels = []
+
+def stop_channels():
+    global primary_device_channels
+    primary_device_channels = []
+    for device in list(channel_streams):
+        close_channel_stream(device)
+    for channel in active_channels():
+        channel.release()
+        channel.device_index = None
+
+def restart_channels():
+    if lipsync_running and channels:
+        stop_channels()
+        start_channels()
+
+def audio_callback(indata, frames, time_info, status):
+    global current_volume, mouth_state, effective_threshold, current_viseme
     
-    control_button_frame = ttk.Frame(device_frame)
-    control_button_frame.pack(fill="x", pady=5)
+    if not lipsync_running or not stream_active:
+        return
     
-    start_button = ttk.Button(control_button_frame, text="▶ Start Lipsync", command=lambda: start_lipsync())
-    start_button.pack(side="left", padx=5, fill="x", expand=True)
+    started = time.perf_counter()
+    audio_stats["callbacks"] += 1
+    audio_stats["last_callback_at"] = started
     
-    stop_button = ttk.Button(control_button_frame, text="⏸ Stop Lipsync", command=lambda: stop_lipsync(), state="disabled")
-    stop_button.pack(side="left", padx=5, fill="x", expand=True)
+    if status:
+        if getattr(status, "input_overflow", False):
+            audio_stats["input_overflows"] += 1
+        add_warning(f"Audio warning: {status}")
     
-    status_label = ttk.Label(device_frame, text="Status: Stopped", font=("Segoe UI", 10, "bold"))
-    status_label.pack(pady=5)
+    adc_time = getattr(time_info, "inputBufferAdcTime", 0.0)
+    current_time = getattr(time_info, "currentTime", 0.0)
+    if adc_time and current_time >= adc_time:
+        audio_stats["input_latency_ms"] = (current_time - adc_time) * 1000.0
+    else:
+        audio_stats["input_latency_ms"] = max(audio_stats["stream_latency_ms"], frames * 1000.0 / SAMPLE_RATE)
+    record_stage_ms("input buffer", audio_stats["input_latency_ms"])
     
-    refresh_mics()
+    try:
+        if frames == 0:
+            return
+        
+        analysis_started = time.perf_counter()
+        mouth_gate.set_threshold(effective_threshold / max(VOLUME_MULTIPLIER, 1e-9))
+        volume_norm = analysis.block_rms(indata, frames, mouth_gate) * VOLUME_MULTIPLIER
+        
+        if not isinstance(volume_norm, (int, float)) or math.isnan(volume_norm) or math.isinf(volume_norm):
+            volume_norm = 0.0
+        
+        volume_norm = min(volume_norm, 10.0)
+        current_volume = min(1.0, max(0.0, float(volume_norm)))
+
+        noise_floor.update(volume_norm, frames, SAMPLE_RATE)
+        if calibrator.active:
+            calibrator.feed(volume_norm, frames)
+        effective_threshold = current_threshold()
+        mouth_state = mouth_gate.level
+        if VISEME_MODE:
+            visemes.feed(indata, frames)
+            if mouth_gate.open:
+                current_viseme = visemes.classify()
+        record_stage("analysis", analysis_started)
+        decision_ms = audio_stats["input_latency_ms"] + (time.perf_counter() - started) * 1000.0
+        audio_stats["decision_latency_ms"] = decision_ms
+        decision_latency[LATENCY_PROFILE].record(decision_ms)
+        record_stage_ms("decision", decision_ms)
+        
+        output_slot.publish(mouth_state, started)
+        for channel in primary_device_channels:
+            channel.process(indata, frames, started)
+            
+    except Exception as e:
+        add_warning(f"Audio callback error: {e}")
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        audio_stats["last_callback_ms"] = elapsed_ms
+        if elapsed_ms > audio_stats["max_callback_ms"]:
+            audio_stats["max_callback_ms"] = elapsed_ms
+        audio_stats["coalesced_states"] = output_slot.overwrites
+        record_stage_ms("callback", elapsed_ms)
+
+def query_obs_output_fps() -> Optional[float]:
+    global ws
+    if ws is None:
+        return None
+    try:
+        with obs_lock:
+            settings = ws.get_video_settings()
+        numerator = getattr(settings, 'fps_numerator', None)
+        denominator = getattr(settings, 'fps_denominator', None)
+        if numerator and denominator:
+            return float(numerator) / float(denominator)
+    except Exception as e:
+        add_warning(f"Could not get OBS video settings: {e}")
+    return None
+
+def animation_frame_rate() -> float:
+    if ANIMATION_FPS and ANIMATION_FPS > 0:
+        return float(ANIMATION_FPS)
+    if obs_output_fps:
+        return obs_output_fps
+    return DEFAULT_ANIMATION_FPS
+
+def output_worker():
+    started = time.perf_counter()
+    next_tick = started
+    level = 0.0
+    while not output_stop.is_set():
+        frame_started = time.perf_counter()
+        frame = output_slot.take(timeout=0)
+        if frame is not None:
+            level = frame[0]
+            record_stage_ms("queue", (frame_started - frame[1]) * 1000.0)
+        if OUTPUT_BACKEND == "browser":
+            try:
+                if browser_source is not None:
+                    browser_source.publish(browser_frame(level, frame_started - started))
+                record_stage("frame", frame_started)
+            except Exception as e:
+                add_warning(f"Output worker error: {e}")
+        elif not obs_connected:
+            animation_stats["dropped_frames"] += 1
+        else:
+            try:
+                batch = FrameBatch()
+                toggle_mouth_smooth(level, batch)
+                if BOBBING_ENABLED:
+                    update_bobbing_motion(level, batch, frame_started - started)
+                for channel in channels:
+                    if channel.device_index is not None:
+                        channel.render(batch, frame_started - started)
+                send_frame_batch(batch, frame[1] if frame is not None else None)
+                record_stage("frame", frame_started)
+            except Exception as e:
+                add_warning(f"Output worker error: {e}")
+        animation_stats["frames"] += 1
+        next_tick += 1.0 / animation_frame_rate()
+        delay = next_tick - time.perf_counter()
+        if delay < 0:
+            animation_stats["late_frames"] += 1
+            next_tick = time.perf_counter()
+            continue
+        output_stop.wait(delay)
+
+def start_output_worker():
+    global output_thread
+    if output_thread and output_thread.is_alive():
+        return
+    output_stop.clear()
+    output_slot.reset()
+    output_thread = threading.Thread(target=output_worker, name="lipsync-output", daemon=True)
+    output_thread.start()
+
+def stop_output_worker():
+    global output_thread
+    output_stop.set()
+    if output_thread and output_thread is not threading.current_thread():
+        output_thread.join(timeout=2.0)
+    output_thread = None
+    if obs_output is not None:
+        obs_output.drain(1.0)
+
+def reset_obs_request_stats():
+    for key in obs_request_stats:
+        obs_request_stats[key] = 0
+
+def reset_browser_stats():
+    for key in browser_stats:
+        browser_stats[key] = 0
+
+def reset_animation_stats():
+    for key in animation_stats:
+        animation_stats[key] = 0
+
+def reset_audio_stats():
+    for key in audio_stats:
+        audio_stats[key] = 0.0 if key.endswith("_ms") else 0
+
+def open_input_stream(device: int, callback):
+    profile = latency_profile()
+    with device_registry.lock:
+        input_stream = sd.InputStream(device=device, channels=1, callback=callback, samplerate=SAMPLE_RATE,
+                                      blocksize=profile["blocksize"], latency=profile["latency"])
+        input_stream.start()
+    return input_stream
+
+def start_audio_stream():
+    global stream, stream_active
+    with device_registry.lock:
+        stream = open_input_stream(device_index, audio_callback)
+        stream_active = True
+    audio_stats["last_callback_at"] = time.perf_counter()
+    try:
+        audio_stats["stream_latency_ms"] = float(stream.latency) * 1000.0
+    except Exception:
+        audio_stats["stream_latency_ms"] = 0.0
+
+def close_audio_stream():
+    global stream, stream_active
+    stream_active = False
+    if stream is not None:
+        try:
+            stream.stop()
+            stream.close()
+        except Exception:
+            pass
+    stream = None
+
+def input_stream_alive(input_stream, last: float) -> bool:
+    if input_stream is None or not getattr(input_stream, "active", False):
+        return False
+    return not last or time.perf_counter() - last < DEVICE_STALL_SECONDS
+
+def audio_stream_alive() -> bool:
+    return input_stream_alive(stream, audio_stats["last_callback_at"])
+
+def audio_streams_open() -> bool:
+    return (stream is not None and stream_active) or bool(channel_streams)
+
+def default_input_device() -> Optional[int]:
+    try:
+        device = sd.default.device[0]
+    except Exception:
+        return None
+    return device if device is not None and device >= 0 else None
+
+def resolve_mic_device() -> Optional[int]:
+    if current_mic_name:
+        return device_registry.find(current_mic_name)
+    return default_input_device()
+
+def refresh_audio_devices(force: bool = False) -> bool:
+    global device_index, current_mic_device
+    with device_registry.lock:
+        idle = not audio_streams_open()
+        try:
+            changed = device_registry.refresh(rescan=idle and force)
+            if changed and idle and not force:
+                device_registry.refresh(rescan=True)
+        except Exception as e:
+            add_warning(f"Could not list audio devices: {e}")
+            return False
+        if changed and idle:
+            device_index = current_mic_device = resolve_mic_device()
+    return changed
+
+def devices_missing() -> bool:
+    return lipsync_running and (mic_lost or any(channel.mic_device_name and channel.device_index is None
+                                                for channel in channels))
+
+def recover_audio_devices():
+    global mic_lost
+    with device_registry.lock:
+        close_audio_stream()
+        stop_channels()
+        refresh_audio_devices(force=True)
+        if device_index is not None:
+            try:
+                start_audio_stream()
+                if mic_lost:
+                    mic_lost = False
+                    print(f"Microphone '{current_mic_name}' is back, rebound to device {device_index}")
+            except Exception:
+                close_audio_stream()
+                mic_lost = True
+        start_channels()
+
+def check_audio_devices():
+    global mic_lost
+    if lipsync_running and stream_active and not audio_stream_alive():
+        if not mic_lost:
+            mic_lost = True
+            add_warning(f"Microphone '{current_mic_name}' stopped delivering audio; waiting for it to come back")
+        close_audio_stream()
+        release_primary_channels()
+    for device, channel_stream in list(channel_streams.items()):
+        if not input_stream_alive(channel_stream, channel_stream_seen.get(device, 0.0)):
+            names = ", ".join(channel.name for channel in channels if channel.device_index == device)
+            add_warning(f"Audio device {device} for channel(s) {names} stopped delivering audio; "
+                        f"waiting for it to come back")
+            close_channel_stream(device)
+    if not devices_missing():
+        device_recovery["delay"] = DEVICE_REFRESH_INTERVAL
+        device_recovery["next_at"] = 0.0
+        refresh_audio_devices()
+        return
+    now = time.monotonic()
+    if audio_streams_open() and now < device_recovery["next_at"]:
+        return
+    recover_audio_devices()
+    if audio_streams_open():
+        device_recovery["next_at"] = now + device_recovery["delay"]
+        device_recovery["delay"] = min(DEVICE_RESCAN_MAX_INTERVAL, device_recovery["delay"] * 2.0)
+
+def device_watcher():
+    while not device_watch_stop.wait(DEVICE_REFRESH_INTERVAL):
+        try:
+            check_audio_devices()
+        except Exception as e:
+            add_warning(f"Audio device check failed: {e}")
+
+def start_device_watcher():
+    global device_watch_thread
+    if device_watch_thread and device_watch_thread.is_alive():
+        return
+    device_watch_stop.clear()
+    device_watch_thread = threading.Thread(target=device_watcher, name="lipsync-devices", daemon=True)
+    device_watch_thread.start()
+
+def stop_device_watcher():
+    global device_watch_thread
+    device_watch_stop.set()
+    if device_watch_thread and device_watch_thread is not threading.current_thread():
+        device_watch_thread.join(timeout=2.0)
+    device_watch_thread = None
+
+def set_sample_rate(rate: int):
+    global SAMPLE_RATE, stream
+    try:
+        SAMPLE_RATE = rate
+        update_equalizer_filters()
+        update_viseme_bands()
+        update_mouth_gate()
+        save_config()
+        if stream and stream.active:
+            stream.stop()
+            stream.close()
+            start_audio_stream()
+        restart_channels()
+    except Exception as e:
+        add_warning(f"Failed to update sample rate: {e}")
+
+def set_latency_profile(name: str):
+    global LATENCY_PROFILE, stream
+    if name not in LATENCY_PROFILES:
+        add_warning(f"Unknown latency profile '{name}'")
+        return
+    try:
+        LATENCY_PROFILE = name
+        save_config()
+        restarting = stream is not None and stream.active
+        if restarting:
+            stream.stop()
+            stream.close()
+        update_analysis_block()
+        if restarting:
+            start_audio_stream()
+            print(f"Audio stream reopened with the {name} latency profile "
+                  f"(reported input latency {audio_stats['stream_latency_ms']:.1f} ms)")
+        restart_channels()
+    except Exception as e:
+        add_warning(f"Failed to switch latency profile: {e}")
+
+def select_mic_device(dev_index=None, persist: bool = True):
+    global device_index, current_mic_device, current_mic_name, stream, stream_active
+
+    try:
+        if stream and stream.active:
+            stream.stop()
+            stream.close()
+            stream = None
+            stream_active = False
+    except Exception:
+        pass
+
+    if dev_index is not None:
+        device_index = dev_index
+        current_mic_device = dev_index
+
+        if persist:
+            current_mic_name = device_registry.name_of(dev_index) or f"Device {dev_index}"
+    else:
+        device_index = None
+        current_mic_device = None
+        current_mic_name = None
+
+    if persist:
+        save_config()
+
+    if device_index is not None and lipsync_running:
+        try:
+            start_audio_stream()
+            print(f"Started audio stream on device {device_index} ({device_registry.name_of(device_index) or current_mic_name})")
+        except Exception as e:
+            add_warning(f"Failed to start audio stream: {e}")
+            stream_active = False
+        restart_channels()
+
+def start_lipsync():
+    global lipsync_running, stream, stream_active, mouth_state, current_volume, effective_threshold
+
+    if lipsync_running:
+        return
+
+    if device_index is None:
+        add_warning("No microphone selected. Please select a microphone.")
+        return
+
+    try:
+        lipsync_running = True
+        mouth_state = 0.0
+        current_volume = 0.0
+
+        if OUTPUT_BACKEND == "browser":
+            if not start_browser_source():
+                lipsync_running = False
+                return
+        elif obs_connected:
+            update_scene_items()
+
+            if not open_item_id or not closed_item_id:
+                add_warning("Mouth sources not found in scene. Please check source configuration.")
+                lipsync_running = False
+                return
+
+            set_scene_item_enabled_edge(closed_item_scene, closed_item_id, True)
+            set_scene_item_enabled_edge(open_item_scene, open_item_id, False)
+        else:
+            add_warning("OBS not connected yet; lipsync will drive the avatar once it connects")
+
+        reset_audio_stats()
+        reset_obs_request_stats()
+        reset_browser_stats()
+        reset_animation_stats()
+        analysis.reset()
+        noise_floor.reset()
+        calibrator.cancel()
+        visemes.reset()
+        update_mouth_gate()
+        mouth_gate.reset()
+        effective_threshold = THRESHOLD
+        start_output_worker()
+
+        update_analysis_block()
+        start_audio_stream()
+        start_channels()
+
+        print(f"Lipsync started on device {device_index} ({device_registry.name_of(device_index) or current_mic_name}), "
+              f"{LATENCY_PROFILE} latency profile, reported input latency {audio_stats['stream_latency_ms']:.1f} ms")
+        add_warning("Lipsync started successfully")
+
+    except Exception as e:
+        add_warning(f"Failed to start lipsync: {e}")
+        lipsync_running = False
+        stream_active = False
+        stop_output_worker()
+        stop_channels()
+
+def stop_lipsync():
+    global lipsync_running, stream, stream_active, mouth_state, bobbing_phase, mic_lost
+
+    if not lipsync_running:
+        return
+
+    try:
+        lipsync_running = False
+        stream_active = False
+        mic_lost = False
+
+        if stream and stream.active:
+            stream.stop()
+            stream.close()
+            stream = None
+
+        stop_output_worker()
+        stop_channels()
+
+        mouth_state = 0.0
+        bobbing_phase = 0.0
+
+        if OUTPUT_BACKEND == "browser":
+            if browser_source is not None:
+                browser_source.publish(browser_idle_frame())
+        elif ws and scene and closed_item_id:
+            set_scene_item_enabled_edge(closed_item_scene, closed_item_id, True)
+            set_scene_item_enabled_edge(open_item_scene, open_item_id, False)
+            hide_viseme_shapes()
+
+            restore_rest_transforms()
+
+        print("Lipsync stopped")
+        add_warning("Lipsync stopped")
+
+    except Exception as e:
+        add_warning(f"Error stopping lipsync: {e}")
+        lipsync_running = False
+        stream_active = False
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def report_startup(mode: str, detail: str = ""):
+    elapsed_ms = (time.perf_counter() - _process_started) * 1000.0
+    rss = peak_rss_mb()
+    memory = f", peak RSS {rss:.1f} MB" if rss is not None else ""
+    print(f"Startup ({mode}) took {elapsed_ms:.0f} ms{memory}{detail}")
+
+def run_startup_task(name: str, fn):
+    started = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        startup_timings[name] = (time.perf_counter() - started) * 1000.0
+
+def resolve_configured_mic() -> List[Tuple[int, str]]:
+    global current_mic_device
+    mics = get_audio_devices()
+    current_mic_device = find_mic_by_name(current_mic_name) if current_mic_name else None
+    start_device_watcher()
+    return mics
+
+def connect_obs_and_supervise() -> bool:
+    connected = connect_obs()
+    start_obs_supervisor()
+    return connected
+
+def start_startup_tasks(list_sources: bool = True):
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix="lipsync-startup")
+    obs_task = pool.submit(run_startup_task, "OBS connect", connect_obs_and_supervise)
+    startup_tasks["obs"] = obs_task
+    startup_tasks["devices"] = pool.submit(run_startup_task, "devices", resolve_configured_mic)
+    if list_sources:
+        def list_obs_sources() -> List[str]:
+            obs_task.result()
+            return run_startup_task("sources", get_obs_sources) if ws else []
+        startup_tasks["sources"] = pool.submit(list_obs_sources)
+    pool.shutdown(wait=False)
+
+def startup_ready() -> bool:
+    return all(task.done() for task in startup_tasks.values())
+
+def wait_for_startup():
+    for name, task in list(startup_tasks.items()):
+        try:
+            task.result()
+        except Exception as e:
+            add_warning(f"Startup task '{name}' failed: {e}")
+
+def startup_timing_text() -> str:
+    return "; " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup_timings.items()) if startup_timings else ""
+
+def shutdown():
+    global stream, stream_active
+    stop_obs_supervisor()
+    stop_equalizer_updater()
+    stop_device_watcher()
+    stop_lipsync()
+    stop_output_worker()
+    try:
+        if stream and stream.active:
+            stream.stop()
+            stream.close()
+    except Exception:
+        pass
+    stream = None
+    stream_active = False
+    stop_browser_source()
+    disconnect_obs()
+    stop_config_writer()
+
+def run_headless(calibrate_seconds: Optional[float] = None) -> int:
+    stop_event = threading.Event()
+
+    def request_shutdown(signum, frame):
+        print(f"Received signal {signum}, shutting down...")
+        stop_event.set()
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            signal.signal(sig, request_shutdown)
+
+    start_startup_tasks(list_sources=False)
+    wait_for_startup()
+    mic = current_mic_device
+    if mic is None:
+        if current_mic_name:
+            add_warning(f"Microphone '{current_mic_name}' not found, using the default input device")
+        mic = default_input_device()
+        if mic is None:
+            add_warning("No microphone available. Set mic_device_name in the config file.")
+            shutdown()
+            return 1
+    select_mic_device(dev_index=mic, persist=False)
+    start_lipsync()
+    if not lipsync_running:
+        shutdown()
+        return 1
+    report_startup("headless", startup_timing_text())
+    if calibrate_seconds and start_calibration(calibrate_seconds):
+        print(f"Calibrating: stay quiet for {calibrate_seconds:.0f} s...")
+        while calibrator.active and calibrator.phase == "silence" and not stop_event.wait(0.1):
+            pass
+        print(f"Now talk normally for {calibrate_seconds:.0f} s...")
+        while calibrator.active and not stop_event.wait(0.1):
+            pass
+        if calibrator.phase == "done":
+            finish_calibration()
+        calibrator.cancel()
+    while not stop_event.wait(1.0):
+        pass
+    shutdown()
+    print(f"Audio: {audio_stats['callbacks']} callbacks, {audio_stats['input_overflows']} overflows; "
+          f"OBS: {obs_request_stats['sent']} sent, {obs_request_stats['suppressed']} suppressed, "
+          f"{obs_request_stats['batches']} batches")
+    if OUTPUT_BACKEND == "browser":
+        print(output_stats_text())
+    print(format_latency_report())
+    return 0
+
+def start_gui():
+    global THRESHOLD, VOLUME_MULTIPLIER, SAMPLE_RATE, EQUALIZER_GAINS
+    global LIPSYNC_ENABLED, BOBBING_ENABLED, BOBBING_INTENSITY
+    global selected_closed_source, selected_open_source, selected_base_source
+    import tkinter as tk
+    from tkinter import ttk
+
+    root = tk.Tk()
+    root.title("🎙️ Lipsync Control")
+    root.geometry("700x800")
+    root.minsize(520, 480)
+
+    bg_color = "#2b2b2b"
+    fg_color = "white"
+    accent_color = "#61afef"
+    trough_color = "#3c3f41"
+    warning_color = "#e06c75"
+    root.configure(bg=bg_color)
+
+    style = ttk.Style(root)
+    try:
+        style.theme_use("clam")
+    except Exception:
+        pass
+    
+    style.configure(".", background=bg_color, foreground=fg_color)
+    style.configure("TFrame", background=bg_color)
+    style.configure("TLabelFrame", background=bg_color, foreground=fg_color, font=("Segoe UI", 11, "bold"))
+    style.configure("TLabelFrame.Label", background=bg_color, foreground=fg_color)
+    style.configure("TLabel", background=bg_color, foreground=fg_color, font=("Segoe UI", 11))
+    style.configure("TButton", background=accent_color, foreground=fg_color, font=("Segoe UI", 10))
+    style.configure("Horizontal.TScale", background=bg_color, troughcolor=trough_color, 
+                   bordercolor=bg_color, darkcolor=accent_color, lightcolor=accent_color)
+    style.configure("Horizontal.TProgressbar", troughcolor=trough_color, background=accent_color, 
+                   bordercolor=bg_color, lightcolor=accent_color, darkcolor=accent_color)
+    style.configure("TCombobox", fieldbackground=bg_color, background=bg_color, foreground=fg_color)
+    style.map("TCombobox",
+              fieldbackground=[('readonly', bg_color), ('!readonly', bg_color)],
+              background=[('readonly', bg_color), ('!readonly', bg_color)],
+              foreground=[('readonly', fg_color), ('!readonly', fg_color)])
+
+    container = ttk.Frame(root)
+    container.pack(fill="both", expand=True)
+
+    canvas = tk.Canvas(container, bg=bg_color, highlightthickness=0)
+    vsb = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
+    canvas.configure(yscrollcommand=vsb.set)
+
+    vsb.pack(side="right", fill="y")
+    canvas.pack(side="left", fill="both", expand=True)
+
+    main_frame = ttk.Frame(canvas)
+    main_frame_id = canvas.create_window((0, 0), window=main_frame, anchor="nw")
+
+    def on_frame_configure(event):
+        canvas.configure(scrollregion=canvas.bbox("all"))
+    main_frame.bind("<Configure>", on_frame_configure)
+
+    def on_canvas_configure(event):
+        canvas.itemconfigure(main_frame_id, width=event.width)
+    canvas.bind("<Configure>", on_canvas_configure)
+
+    def on_mousewheel(event):
+        delta = 0
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        elif hasattr(event, 'delta'):
+            delta = -1 * int(event.delta / 120)
+        canvas.yview_scroll(delta, "units")
+
+    canvas.bind_all("<MouseWheel>", on_mousewheel)
+    canvas.bind_all("<Button-4>", on_mousewheel)
+    canvas.bind_all("<Button-5>", on_mousewheel)
+
+    device_frame = ttk.LabelFrame(main_frame, text="Device Configuration", padding=10)
+    device_frame.pack(fill="x", pady=5)
+
+    ttk.Label(device_frame, text="Microphone").pack(anchor="w")
+    mic_var = tk.StringVar()
+    mic_combo = ttk.Combobox(device_frame, textvariable=mic_var, state="readonly")
+    mic_combo.pack(fill="x", pady=5)
+
+    def refresh_mics():
+        mics = get_audio_devices()
+        mic_combo['values'] = [name for _, name in mics]
+        
+        if not mics:
+            mic_var.set("No input devices")
+        elif device_index is not None:
+            mic_var.set(device_registry.name_of(device_index) or f"Device {device_index}")
+        elif current_mic_device is not None:
+            mic_var.set(device_registry.name_of(current_mic_device) or f"Device {current_mic_device}")
+            select_mic_device(dev_index=current_mic_device, persist=False)
+        else:
+            if current_mic_name:
+                add_warning(f"Microphone '{current_mic_name}' not found, using {mics[0][1]} for now")
+            mic_var.set(mics[0][1])
+            select_mic_device(dev_index=mics[0][0], persist=not current_mic_name)
+
+    def on_mic_select(event):
+        selected_name = mic_var.get()
+        for idx, name in available_mics:
+            if name == selected_name:
+                select_mic_device(dev_index=idx)
+                print(f"Selected microphone: {name} (index {idx})")
+                break
+
+    mic_combo.bind('<<ComboboxSelected>>', on_mic_select)
+    def rescan_mics():
+        threading.Thread(target=refresh_audio_devices, args=(True,), name="lipsync-device-scan", daemon=True).start()
+
+    ttk.Button(device_frame, text="Refresh Microphones", command=rescan_mics).pack(pady=5)
+    
+    control_button_frame = ttk.Frame(device_frame)
+    control_button_frame.pack(fill="x", pady=5)
+    
+    start_button = ttk.Button(control_button_frame, text="▶ Start Lipsync", command=lambda: start_lipsync())
+    start_button.pack(side="left", padx=5, fill="x", expand=True)
+    
+    stop_button = ttk.Button(control_button_frame, text="⏸ Stop Lipsync", command=lambda: stop_lipsync(), state="disabled")
+    stop_button.pack(side="left", padx=5, fill="x", expand=True)
+    
+    status_label = ttk.Label(device_frame, text="Status: Stopped", font=("Segoe UI", 10, "bold"))
+    status_label.pack(pady=5)
+    channels_label = ttk.Label(device_frame, text="", font=("Segoe UI", 9))
+    if channels:
+        channels_label.pack(pady=2)
+    
+    mic_var.set("Looking for microphones...")
+    mic_view = {"version": device_registry.version}
+    startup_view = {"devices": False, "sources": False, "ready": False}
+
+    source_frame = ttk.LabelFrame(main_frame, text="Source Configuration", padding=10)
+    source_frame.pack(fill="x", pady=5)
+
+    ttk.Label(source_frame, text="Output").pack(anchor="w")
+    output_var = tk.StringVar(value=OUTPUT_BACKEND)
+    output_combo = ttk.Combobox(source_frame, textvariable=output_var, values=OUTPUT_BACKENDS, state="readonly")
+    output_combo.pack(fill="x", pady=5)
+    output_combo.bind('<<ComboboxSelected>>', lambda e: set_output_backend(output_var.get()))
+    ttk.Label(source_frame, text=f"Browser Source URL: {browser_source_url()}", font=("Segoe UI", 9)).pack(anchor="w")
+
+    ttk.Label(source_frame, text="Closed Mouth Source").pack(anchor="w")
+    closed_source_var = tk.StringVar(value=selected_closed_source)
+    closed_source_combo = ttk.Combobox(source_frame, textvariable=closed_source_var, state="normal")
+    closed_source_combo.pack(fill="x", pady=2)
+
+    ttk.Label(source_frame, text="Open Mouth Source").pack(anchor="w")
+    open_source_var = tk.StringVar(value=selected_open_source)
+    open_source_combo = ttk.Combobox(source_frame, textvariable=open_source_var, state="normal")
+    open_source_combo.pack(fill="x", pady=2)
+
+    ttk.Label(source_frame, text="Base Avatar Source").pack(anchor="w")
+    base_source_var = tk.StringVar(value=selected_base_source)
+    base_source_combo = ttk.Combobox(source_frame, textvariable=base_source_var, state="normal")
+    base_source_combo.pack(fill="x", pady=2)
+
+    viseme_var = tk.BooleanVar(value=VISEME_MODE)
+    viseme_check = ttk.Checkbutton(source_frame, text="Viseme mode (pick a mouth shape from the voice spectrum)",
+                                   variable=viseme_var, command=lambda: toggle_viseme_mode())
+    viseme_check.pack(anchor="w", pady=(5,5))
+    viseme_combos = []
+    for shape in VISEME_SHAPES:
+        ttk.Label(source_frame, text=f"Mouth Shape '{shape.get('name', '?')}' Source").pack(anchor="w")
+        shape_var = tk.StringVar(value=shape.get("source", ""))
+        shape_combo = ttk.Combobox(source_frame, textvariable=shape_var, state="normal")
+        shape_combo.pack(fill="x", pady=2)
+        viseme_combos.append((shape, shape_var, shape_combo))
+
+    def refresh_sources(sources=None):
+        if sources is None:
+            sources = get_obs_sources()
+        if sources:
+            closed_source_combo['values'] = sources
+            open_source_combo['values'] = sources
+            base_source_combo['values'] = sources
+            for _, _, shape_combo in viseme_combos:
+                shape_combo['values'] = sources
+        else:
+            closed_source_combo.set(selected_closed_source)
+            open_source_combo.set(selected_open_source)
+            base_source_combo.set(selected_base_source)
+            for shape, _, shape_combo in viseme_combos:
+                shape_combo.set(shape.get("source", ""))
+
+    def rebuild_sources():
+        build_scene_item_index()
+        update_scene_items()
+        refresh_sources()
+
+    def on_source_change(*args):
+        global selected_closed_source, selected_open_source, selected_base_source
+        selected_closed_source = closed_source_var.get()
+        selected_open_source = open_source_var.get()
+        selected_base_source = base_source_var.get()
+        for shape, shape_var, _ in viseme_combos:
+            shape["source"] = shape_var.get()
+        save_config()
+        update_scene_items()
+        announce_browser_avatars()
+
+    def toggle_viseme_mode():
+        global VISEME_MODE
+        VISEME_MODE = viseme_var.get()
+        visemes.reset()
+        if not VISEME_MODE and ws:
+            hide_viseme_shapes()
+        save_config()
+
+    closed_source_var.trace('w', on_source_change)
+    open_source_var.trace('w', on_source_change)
+    base_source_var.trace('w', on_source_change)
+    for _, shape_var, _ in viseme_combos:
+        shape_var.trace('w', on_source_change)
+    ttk.Button(source_frame, text="Refresh Sources", command=rebuild_sources).pack(pady=5)
+
+    audio_settings = ttk.LabelFrame(main_frame, text="Audio Settings", padding=10)
+    audio_settings.pack(fill="x", pady=5)
+
+    ttk.Label(audio_settings, text="Sample Rate").pack(anchor="w")
+    sample_rate_var = tk.StringVar(value=str(SAMPLE_RATE))
+    sample_rate_combo = ttk.Combobox(audio_settings, textvariable=sample_rate_var, 
+                                     values=["16000", "44100", "48000", "96000"], state="readonly")
+    sample_rate_combo.pack(fill="x", pady=5)
+    sample_rate_combo.bind('<<ComboboxSelected>>', lambda e: update_sample_rate())
+
+    ttk.Label(audio_settings, text="Latency Profile").pack(anchor="w")
+    latency_var = tk.StringVar(value=LATENCY_PROFILE)
+    latency_combo = ttk.Combobox(audio_settings, textvariable=latency_var,
+                                 values=list(LATENCY_PROFILES), state="readonly")
+    latency_combo.pack(fill="x", pady=5)
+    latency_combo.bind('<<ComboboxSelected>>', lambda e: set_latency_profile(latency_var.get()))
+    latency_label = ttk.Label(audio_settings, text=format_latency_report(), font=("Consolas", 9), justify="left")
+    latency_label.pack(anchor="w")
+
+    ttk.Label(audio_settings, text="Equalizer Bands", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(10,5))
+    eq_bands = []
+    eq_frequencies = ["80Hz", "250Hz", "500Hz", "1kHz", "2kHz", "4kHz", "8kHz"]
+
+    for i, freq in enumerate(eq_frequencies):
+        eq_frame = ttk.Frame(audio_settings)
+        eq_frame.pack(fill="x", pady=2)
+        ttk.Label(eq_frame, text=freq, width=8).pack(side="left")
+        eq_slider = ttk.Scale(eq_frame, from_=-12, to=12, orient="horizontal", 
+                             value=EQUALIZER_GAINS[i], 
+                             command=lambda v, idx=i: update_equalizer(idx, float(v)), 
+                             style="Horizontal.TScale")
+        eq_slider.pack(side="left", fill="x", expand=True)
+        eq_value_label = ttk.Label(eq_frame, text=f"{EQUALIZER_GAINS[i]:.1f} dB", width=8)
+        eq_value_label.pack(side="right")
+        eq_bands.append({"slider": eq_slider, "label": eq_value_label})
+
+    controls = ttk.LabelFrame(main_frame, text="Lipsync Controls", padding=10)
+    controls.pack(fill="x", pady=5)
+
+    lipsync_var = tk.BooleanVar(value=LIPSYNC_ENABLED)
+    lipsync_check = ttk.Checkbutton(controls, text="Enable Lip Sync", 
+                                     variable=lipsync_var, command=lambda: toggle_lipsync())
+    lipsync_check.pack(anchor="w", pady=(5,5))
+
+    ttk.Label(controls, text="Threshold").pack(anchor="w")
+    threshold_slider = ttk.Scale(controls, from_=THRESHOLD_MIN, to=THRESHOLD_MAX, orient="horizontal", 
+                                value=THRESHOLD, command=lambda v: update_threshold(float(v)), 
+                                style="Horizontal.TScale")
+    threshold_slider.pack(fill="x", pady=5)
+    threshold_label = ttk.Label(controls, text=f"{THRESHOLD:.5f}")
+    threshold_label.pack(anchor="w")
+
+    adaptive_var = tk.BooleanVar(value=ADAPTIVE_THRESHOLD)
+    adaptive_check = ttk.Checkbutton(controls, text="Adaptive threshold (follow the noise floor)",
+                                     variable=adaptive_var, command=lambda: toggle_adaptive_threshold())
+    adaptive_check.pack(anchor="w", pady=(5,5))
+    ttk.Label(controls, text="Margin Above Noise Floor (dB)").pack(anchor="w")
+    margin_slider = ttk.Scale(controls, from_=3.0, to=40.0, orient="horizontal",
+                              value=THRESHOLD_MARGIN_DB, command=lambda v: update_threshold_margin(float(v)),
+                              style="Horizontal.TScale")
+    margin_slider.pack(fill="x", pady=5)
+    noise_floor_label = ttk.Label(controls, text="")
+    noise_floor_label.pack(anchor="w")
+    calibrate_button = ttk.Button(controls, text="Calibrate Threshold", command=lambda: calibrate_threshold())
+    calibrate_button.pack(pady=5)
+
+    ttk.Label(controls, text="Volume Multiplier").pack(anchor="w")
+    multiplier_slider = ttk.Scale(controls, from_=0.1, to=10.0, orient="horizontal", 
+                                 value=VOLUME_MULTIPLIER, command=lambda v: update_multiplier(float(v)), 
+                                 style="Horizontal.TScale")
+    multiplier_slider.pack(fill="x", pady=5)
+    multiplier_label = ttk.Label(controls, text=f"{VOLUME_MULTIPLIER:.1f}")
+    multiplier_label.pack(anchor="w")
+
+    gate_labels = {}
+    for key, title, low, high, value in (("attack", "Mouth Attack (ms)", 0.0, 100.0, GATE_ATTACK_MS),
+                                         ("hold", "Mouth Hold (ms)", 0.0, 400.0, GATE_HOLD_MS),
+                                         ("release", "Mouth Release (ms)", 0.0, 400.0, GATE_RELEASE_MS)):
+        ttk.Label(controls, text=title).pack(anchor="w")
+        gate_slider = ttk.Scale(controls, from_=low, to=high, orient="horizontal", value=value,
+                                command=lambda v, k=key: update_gate_timing(k, float(v)),
+                                style="Horizontal.TScale")
+        gate_slider.pack(fill="x", pady=5)
+        gate_labels[key] = ttk.Label(controls, text=f"{value:.0f} ms")
+        gate_labels[key].pack(anchor="w")
+
+    bobbing_frame = ttk.LabelFrame(main_frame, text="Bobbing Controls", padding=10)
+    bobbing_frame.pack(fill="x", pady=5)
+
+    bobbing_var = tk.BooleanVar(value=BOBBING_ENABLED)
+    bobbing_check = ttk.Checkbutton(bobbing_frame, text="Enable Bobbing", 
+                                     variable=bobbing_var, command=lambda: toggle_bobbing())
+    bobbing_check.pack(anchor="w", pady=(5,5))
+
+    ttk.Label(bobbing_frame, text="Bobbing Intensity").pack(anchor="w")
+    bobbing_slider = ttk.Scale(bobbing_frame, from_=0.0, to=20.0, orient="horizontal", 
+                               value=BOBBING_INTENSITY, command=lambda v: update_bobbing_intensity(float(v)), 
+                               style="Horizontal.TScale")
+    bobbing_slider.pack(fill="x", pady=5)
+    bobbing_label = ttk.Label(bobbing_frame, text=f"{BOBBING_INTENSITY:.1f}")
+    bobbing_label.pack(anchor="w")
+    ttk.Label(bobbing_frame, text="Animation Frame Rate").pack(anchor="w")
+    fps_var = tk.StringVar(value=f"{ANIMATION_FPS:g}" if ANIMATION_FPS else "Auto (OBS)")
+    fps_combo = ttk.Combobox(bobbing_frame, textvariable=fps_var,
+                             values=["Auto (OBS)", "24", "30", "60", "120"], state="readonly")
+    fps_combo.pack(fill="x", pady=5)
+    fps_combo.bind('<<ComboboxSelected>>', lambda e: update_animation_fps())
+    ttk.Button(bobbing_frame, text="Refresh Transforms", command=lambda: refresh_transform_cache(scene)).pack(pady=5)
+
+    volume_frame = ttk.LabelFrame(main_frame, text="Volume Display", padding=10)
+    volume_frame.pack(fill="x", pady=5)
+
+    volume_bar = ttk.Progressbar(volume_frame, orient="horizontal", length=100, 
+                                 mode="determinate", style="Horizontal.TProgressbar")
+    volume_bar.pack(fill="x", pady=5)
+
+    volume_label = ttk.Label(volume_frame, text="0.00", font=("Segoe UI", 16, "bold"))
+    volume_label.pack(pady=5)
+
+    audio_stats_label = ttk.Label(volume_frame, text="", font=("Segoe UI", 9))
+    audio_stats_label.pack(pady=2)
+
+    perf_frame = ttk.LabelFrame(main_frame, text="Performance", padding=10)
+    perf_frame.pack(fill="x", pady=5)
+
+    perf_var = tk.BooleanVar(value=False)
+    perf_check = ttk.Checkbutton(perf_frame, text="Show per-stage latency",
+                                 variable=perf_var, command=lambda: toggle_performance())
+    perf_check.pack(anchor="w", pady=(5,5))
+    perf_label = ttk.Label(perf_frame, text="", font=("Consolas", 9), justify="left")
+    perf_snapshot = {"at": 0.0, "stages": {}, "requests": {}}
+
+    warnings_frame = ttk.LabelFrame(main_frame, text="Warnings", padding=10)
+    warnings_frame.pack(fill="both", expand=True, pady=5)
+
+    warnings_text = tk.Text(warnings_frame, height=8, bg="#1e1e1e", fg=warning_color, 
+                           font=("Consolas", 9), wrap="word", relief="flat")
+    warnings_text.pack(fill="both", expand=True)
+    warnings_scrollbar = ttk.Scrollbar(warnings_frame, orient="vertical", command=warnings_text.yview)
+    warnings_scrollbar.pack(side="right", fill="y")
+    warnings_text.configure(yscrollcommand=warnings_scrollbar.set)
+    warnings_view = {"version": 0, "shown": set()}
+
+    def sync_warnings():
+        if warning_log.version == warnings_view["version"]:
+            return
+        version, oldest_seq, changed = warning_log.changes_since(warnings_view["version"])
+        shown = warnings_view["shown"]
+        for seq in [seq for seq in shown if seq < oldest_seq]:
+            ranges = warnings_text.tag_ranges(f"warning{seq}")
+            if ranges:
+                warnings_text.delete(ranges[0], ranges[1])
+            shown.discard(seq)
+        at_bottom = warnings_text.yview()[1] >= 1.0
+        for record in changed:
+            tag = f"warning{record['seq']}"
+            line = format_warning(record) + "\n"
+            if record["seq"] in shown:
+                ranges = warnings_text.tag_ranges(tag)
+                if ranges:
+                    warnings_text.delete(ranges[0], ranges[1])
+                    warnings_text.insert(ranges[0], line, tag)
+                    continue
+            warnings_text.insert("end-1c", line, tag)
+            shown.add(record["seq"])
+        if at_bottom:
+            warnings_text.see(tk.END)
+        warnings_view["version"] = version
+
+    def update_ui():
+        try:
+            if not startup_view["devices"] and startup_tasks["devices"].done():
+                startup_view["devices"] = True
+                refresh_mics()
+            if not startup_view["sources"] and startup_tasks["sources"].done():
+                startup_view["sources"] = True
+                try:
+                    refresh_sources(startup_tasks["sources"].result())
+                except Exception as e:
+                    add_warning(f"Could not list OBS sources: {e}")
+            if not startup_view["ready"] and startup_ready():
+                startup_view["ready"] = True
+                report_startup("gui, ready", startup_timing_text())
+            if device_registry.version != mic_view["version"]:
+                mic_view["version"] = device_registry.version
+                mic_combo['values'] = [name for _, name in get_audio_devices()]
+            volume_bar['value'] = current_volume * 100
+            volume_label['text'] = f"{current_volume:.2f}"
+            audio_stats_label['text'] = (f"Callbacks: {audio_stats['callbacks']}  "
+                                         f"Overflows: {audio_stats['input_overflows']}  "
+                                         f"Coalesced states: {audio_stats['coalesced_states']}  "
+                                         f"Callback: {audio_stats['last_callback_ms']:.2f} ms "
+                                         f"(max {audio_stats['max_callback_ms']:.2f} ms)\n"
+                                         f"{output_stats_text()}\n"
+                                         f"Animation: {animation_frame_rate():.2f} FPS  "
+                                         f"frames: {animation_stats['frames']}  "
+                                         f"late: {animation_stats['late_frames']}  "
+                                         f"dropped: {animation_stats['dropped_frames']}\n{obs_status_text()}")
+            threshold_label['text'] = f"{THRESHOLD:.5f}"
+            noise_floor_label['text'] = (f"Margin: {THRESHOLD_MARGIN_DB:.1f} dB  "
+                                         f"Noise floor: {noise_floor.floor:.6f}  "
+                                         f"Effective threshold: {current_threshold():.5f}")
+            multiplier_label['text'] = f"{VOLUME_MULTIPLIER:.1f}"
+            gate_labels["attack"]['text'] = f"{GATE_ATTACK_MS:.0f} ms"
+            gate_labels["hold"]['text'] = f"{GATE_HOLD_MS:.0f} ms"
+            gate_labels["release"]['text'] = f"{GATE_RELEASE_MS:.0f} ms"
+            bobbing_label['text'] = f"{BOBBING_INTENSITY:.1f}"
+            for i, band in enumerate(eq_bands):
+                band["label"]["text"] = f"{EQUALIZER_GAINS[i]:.1f} dB"
+            for source_var, source_name in ((closed_source_var, selected_closed_source),
+                                            (open_source_var, selected_open_source),
+                                            (base_source_var, selected_base_source)):
+                if source_var.get() != source_name:
+                    source_var.set(source_name)
+            for shape, shape_var, _ in viseme_combos:
+                if shape_var.get() != shape.get("source", ""):
+                    shape_var.set(shape.get("source", ""))
+            if profiling_enabled:
+                now = time.perf_counter()
+                interval = now - perf_snapshot["at"]
+                if interval >= 1.0:
+                    request_rates = "  ".join(
+                        f"{key} {(obs_request_stats[key] - perf_snapshot['requests'].get(key, 0)) / interval:.1f}/s"
+                        for key in obs_request_stats)
+                    perf_label['text'] = (format_perf_report(perf_snapshot["stages"], interval) or "Waiting for samples...") + \
+                        f"\nOBS requests: {request_rates}"
+                    perf_snapshot["at"] = now
+                    perf_snapshot["stages"] = {name: h.count for name, h in list(perf_stages.items())}
+                    perf_snapshot["requests"] = dict(obs_request_stats)
+            sync_warnings()
+            latency_label['text'] = format_latency_report()
+            if lipsync_running and audio_stats["stream_latency_ms"]:
+                latency_label['text'] += f"\n  stream reports {audio_stats['stream_latency_ms']:.1f} ms input latency"
+            
+            if channels:
+                channels_label['text'] = "Channels: " + "  ".join(
+                    f"{channel.name} [{channel.mic_device_name}] "
+                    f"{'%.2f' % channel.current_volume if channel.device_index is not None else 'off'}"
+                    for channel in channels)
+            if lipsync_running:
+                status_label['text'] = "Status: Running"
+                status_label['foreground'] = "#98c379"
+                start_button['state'] = "disabled"
+                stop_button['state'] = "normal"
+            elif not startup_view["ready"]:
+                status_label['text'] = "Status: Starting..."
+                status_label['foreground'] = accent_color
+                start_button['state'] = "disabled"
+                stop_button['state'] = "disabled"
+            else:
+                status_label['text'] = "Status: Stopped"
+                status_label['foreground'] = warning_color
+                start_button['state'] = "normal"
+                stop_button['state'] = "disabled"
+                
+        except Exception as e:
+            print(f"UI update error: {e}")
+        root.after(100, update_ui)
+
+    def update_threshold(value):
+        global THRESHOLD
+        THRESHOLD = value
+        save_config()
+
+    def toggle_adaptive_threshold():
+        global ADAPTIVE_THRESHOLD
+        ADAPTIVE_THRESHOLD = adaptive_var.get()
+        save_config()
+
+    def update_threshold_margin(value):
+        global THRESHOLD_MARGIN_DB
+        THRESHOLD_MARGIN_DB = value
+        save_config()
+
+    def calibrate_threshold():
+        if not start_calibration():
+            return
+        calibrate_button['state'] = "disabled"
+        calibrate_button['text'] = "Stay quiet..."
+
+        def poll():
+            if calibrator.phase == "speech":
+                calibrate_button['text'] = "Now talk normally..."
+            if calibrator.active:
+                root.after(100, poll)
+                return
+            if calibrator.phase == "done" and finish_calibration():
+                threshold_slider.set(THRESHOLD)
+                margin_slider.set(THRESHOLD_MARGIN_DB)
+            calibrator.cancel()
+            calibrate_button['text'] = "Calibrate Threshold"
+            calibrate_button['state'] = "normal"
+
+        root.after(100, poll)
+
+    def update_multiplier(value):
+        global VOLUME_MULTIPLIER
+        VOLUME_MULTIPLIER = value
+        save_config()
+
+    def update_gate_timing(key, value):
+        global GATE_ATTACK_MS, GATE_HOLD_MS, GATE_RELEASE_MS
+        if key == "attack":
+            GATE_ATTACK_MS = value
+        elif key == "hold":
+            GATE_HOLD_MS = value
+        else:
+            GATE_RELEASE_MS = value
+        update_mouth_gate()
+        save_config()
+
+    def update_equalizer(band_index, value):
+        global EQUALIZER_GAINS
+        EQUALIZER_GAINS[band_index] = value
+        request_equalizer_update()
+        save_config()
+
+    def update_sample_rate():
+        set_sample_rate(int(sample_rate_var.get()))
+
+    def toggle_lipsync():
+        global LIPSYNC_ENABLED
+        LIPSYNC_ENABLED = lipsync_var.get()
+        save_config()
+
+    def toggle_bobbing():
+        global BOBBING_ENABLED
+        BOBBING_ENABLED = bobbing_var.get()
+        save_config()
+
+    def update_animation_fps():
+        global ANIMATION_FPS
+        value = fps_var.get()
+        ANIMATION_FPS = 0.0 if value.startswith("Auto") else float(value)
+        save_config()
+
+    def toggle_performance():
+        enabled = perf_var.get()
+        set_profiling(enabled)
+        if enabled:
+            perf_snapshot["at"] = time.perf_counter()
+            perf_snapshot["stages"] = {}
+            perf_snapshot["requests"] = dict(obs_request_stats)
+            perf_label['text'] = "Waiting for samples..."
+            perf_label.pack(anchor="w", pady=2)
+        else:
+            perf_label.pack_forget()
+
+    def update_bobbing_intensity(value):
+        global BOBBING_INTENSITY
+        BOBBING_INTENSITY = value
+        save_config()
+
+    update_ui()
+    root.after_idle(lambda: report_startup("gui, first window"))
+    root.mainloop()
+
+def toggle_mouth_smooth(mouth_state, batch: Optional[FrameBatch] = None):
+    global ws, scene, open_item_id, closed_item_id
+    
+    if not ws or not scene or not LIPSYNC_ENABLED:
+        return
+    
+    try:
+        if VISEME_MODE:
+            show_mouth_shape(mouth_state, current_viseme, batch)
+        elif mouth_state > 0.5:
+            set_scene_item_enabled_edge(closed_item_scene, closed_item_id, False, batch)
+            set_scene_item_enabled_edge(open_item_scene, open_item_id, True, batch)
+        else:
+            set_scene_item_enabled_edge(closed_item_scene, closed_item_id, True, batch)
+            set_scene_item_enabled_edge(open_item_scene, open_item_id, False, batch)
+    except Exception:
+        pass
+
+def show_mouth_shape(mouth_state, viseme: int, batch: Optional[FrameBatch] = None):
+    global active_mouth_item
+    mouths = [(closed_item_scene, closed_item_id), (open_item_scene, open_item_id), *viseme_items]
+    if mouth_state <= 0.5:
+        active = 0
+    elif 0 <= viseme < len(viseme_items) and viseme_items[viseme][1]:
+        active = 2 + viseme
+    else:
+        active = 1
+    active_mouth_item = mouths[active]
+    set_scene_item_enabled_edge(mouths[active][0], mouths[active][1], True, batch)
+    for i, (owner, sid) in enumerate(mouths):
+        if i != active and sid:
+            set_scene_item_enabled_edge(owner, sid, False, batch)
+
+def hide_viseme_shapes():
+    global active_mouth_item
+    active_mouth_item = None
+    for owner, sid in viseme_items:
+        if sid:
+            set_scene_item_enabled_edge(owner, sid, False)
+
+def connect_obs(replay: bool = False) -> bool:
+    global obs_connecting
+    obs_connecting = True
+    try:
+        return _connect_obs(replay)
+    finally:
+        obs_connecting = False
+
+def _connect_obs(replay: bool) -> bool:
+    global ws, obs_output_fps, obs_connected
+    obs_link_lost.clear()
+    try:
+        ws = obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD, timeout=OBS_REQUEST_TIMEOUT)
+        print("Connected to OBS")
+    except Exception as e:
+        add_warning(f"Failed to connect to OBS: {e}")
+        ws = None
+        return False
+    connect_obs_events()
+    start_obs_output()
+    invalidate_scene_item_mirror()
+    build_scene_item_index()
+    update_scene_items()
+    obs_output_fps = query_obs_output_fps()
+    if obs_output_fps:
+        print(f"OBS output runs at {obs_output_fps:.2f} FPS")
+    if obs_link_lost.is_set():
+        return False
+    if replay and OUTPUT_BACKEND == "obs":
+        replay_obs_state()
+    obs_connected = True
+    return True
+
+def disconnect_obs():
+    global ws, events_ws, obs_connected
+    obs_connected = False
+    stop_obs_output()
+    for client in (events_ws, ws):
+        try:
+            if client is not None:
+                client.disconnect()
+        except Exception:
+            pass
+    events_ws = None
+    ws = None
+
+def mark_obs_disconnected(reason: str):
+    global obs_connected
+    was_connected = obs_connected
+    obs_connected = False
+    obs_link_lost.set()
+    if was_connected:
+        add_warning(f"Lost connection to OBS ({reason}); reconnecting in the background")
+
+def obs_connection_alive() -> bool:
+    worker = getattr(events_ws, "worker", None)
+    if worker is not None and not worker.is_alive():
+        return False
+    if obs_output is not None and not obs_output.connected:
+        return False
+    return ws is not None
+
+def replay_obs_state():
+    batch = FrameBatch()
+    toggle_mouth_smooth(mouth_state if lipsync_running else 0.0, batch)
+    for channel in channels:
+        if channel.lipsync_enabled and channel.closed_item[1] and channel.open_item[1]:
+            opened = lipsync_running and channel.device_index is not None and channel.level > 0.5
+            set_scene_item_enabled_edge(channel.closed_item[0], channel.closed_item[1], not opened, batch)
+            set_scene_item_enabled_edge(channel.open_item[0], channel.open_item[1], opened, batch)
+    for key in bound_scene_items():
+        rest = transform_cache.get(key)
+        if rest is not None:
+            send_bobbing_transform(key, rest.get('positionY', 0.0), bobbing_offsets.get(key, 0.0), batch)
+    send_frame_batch(batch)
+    print(f"Replayed {len(batch)} scene item change(s) to OBS")
+
+def reconnect_delay(attempt: int) -> float:
+    ceiling = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2 ** attempt)
+    return random.uniform(ceiling / 2.0, ceiling)
+
+def obs_supervisor():
+    while not obs_supervisor_stop.is_set():
+        if obs_connected:
+            obs_link_lost.wait(OBS_HEALTH_INTERVAL)
+            if obs_connected and not obs_supervisor_stop.is_set() and not obs_connection_alive():
+                mark_obs_disconnected("connection closed")
+            continue
+        disconnect_obs()
+        attempt = obs_reconnect_state["attempt"]
+        delay = reconnect_delay(attempt)
+        obs_reconnect_state["next_at"] = time.time() + delay
+        if obs_supervisor_stop.wait(delay):
+            break
+        if connect_obs(replay=True):
+            obs_reconnect_state["attempt"] = 0
+            obs_reconnect_state["next_at"] = 0.0
+            obs_reconnect_state["reconnects"] += 1
+            print(f"Reconnected to OBS after {attempt + 1} attempt(s)")
+        else:
+            obs_reconnect_state["attempt"] = attempt + 1
+
+def start_obs_supervisor():
+    global obs_supervisor_thread
+    if obs_supervisor_thread and obs_supervisor_thread.is_alive():
+        return
+    obs_supervisor_stop.clear()
+    obs_supervisor_thread = threading.Thread(target=obs_supervisor, name="lipsync-obs-supervisor", daemon=True)
+    obs_supervisor_thread.start()
+
+def stop_obs_supervisor():
+    global obs_supervisor_thread
+    obs_supervisor_stop.set()
+    obs_link_lost.set()
+    if obs_supervisor_thread and obs_supervisor_thread is not threading.current_thread():
+        obs_supervisor_thread.join(timeout=OBS_REQUEST_TIMEOUT + 2.0)
+    obs_supervisor_thread = None
+
+def obs_status_text() -> str:
+    if obs_connected:
+        reconnects = obs_reconnect_state["reconnects"]
+        return "OBS: connected" + (f" ({reconnects} reconnect(s))" if reconnects else "")
+    if obs_connecting:
+        return "OBS: connecting..."
+    if obs_reconnect_state["next_at"]:
+        wait = max(0.0, obs_reconnect_state["next_at"] - time.time())
+        return f"OBS: disconnected, attempt {obs_reconnect_state['attempt'] + 1} in {wait:.1f} s"
+    return "OBS: not connected"
+
+def connect_obs_events():
+    global events_ws
+    try:
+        events_ws = obs.EventClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD,
+                                    subs=(obs.Subs.SCENES | obs.Subs.SCENEITEMS | obs.Subs.INPUTS |
+                                          obs.Subs.SCENEITEMTRANSFORMCHANGED))
+        events_ws.callback.register([
+            on_current_program_scene_changed,
+            on_scene_created,
+            on_scene_removed,
+            on_scene_name_changed,
+            on_scene_item_created,
+            on_scene_item_removed,
+            on_scene_item_enable_state_changed,
+            on_input_name_changed,
+            on_scene_item_transform_changed,
+        ])
+    except Exception as e:
+        add_warning(f"Failed to subscribe to OBS events: {e}")
+        events_ws = None
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_OP_CONTINUATION = 0x0
+WS_OP_TEXT = 0x1
+WS_OP_BINARY = 0x2
+WS_OP_CLOSE = 0x8
+WS_OP_PING = 0x9
+WS_OP_PONG = 0xA
+
+def websocket_accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+def _websocket_mask(payload: bytes, key: bytes) -> bytes:
+    n = len(payload)
+    if not n:
+        return payload
+    stream_key = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(stream_key, "big")).to_bytes(n, "big")
+
+def websocket_frame(opcode: int, payload: bytes, mask: bool = False) -> bytes:
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _websocket_mask(payload, key)
+
+def websocket_close_frame(code: int = 1000, reason: str = "", mask: bool = False) -> bytes:
+    return websocket_frame(WS_OP_CLOSE, struct.pack("!H", code) + reason.encode(), mask)
+
+async def read_websocket_message(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    opcode = WS_OP_BINARY
+    parts = []
+    while True:
+        head = await reader.readexactly(2)
+        frame_op = head[0] & 0x0F
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        key = await reader.readexactly(4) if head[1] & 0x80 else None
+        payload = await reader.readexactly(length) if length else b""
+        if key is not None:
+            payload = _websocket_mask(payload, key)
+        if frame_op >= WS_OP_CLOSE:
+            return frame_op, payload
+        if frame_op != WS_OP_CONTINUATION:
+            opcode = frame_op
+        parts.append(payload)
+        if head[0] & 0x80:
+            return opcode, b"".join(parts)
+
+def parse_http_head(head: bytes) -> Tuple[str, Dict[str, str]]:
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+def websocket_handshake_response(headers: Dict[str, str]) -> bytes:
+    response = ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {websocket_accept_key(headers.get('sec-websocket-key', ''))}\r\n")
+    protocols = [p.strip() for p in headers.get("sec-websocket-protocol", "").split(",") if p.strip()]
+    if protocols:
+        response += f"Sec-WebSocket-Protocol: {protocols[0]}\r\n"
+    return (response + "\r\n").encode()
+
+async def open_websocket(host: str, port: int, timeout: float = 5.0, protocol: str = "obswebsocket.json"):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+                  f"Sec-WebSocket-Protocol: {protocol}\r\n\r\n").encode())
+    status, headers = parse_http_head(await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout))
+    if " 101 " not in status + " " or headers.get("sec-websocket-accept") != websocket_accept_key(key):
+        writer.close()
+        raise ConnectionError(f"WebSocket upgrade refused: {status}")
+    return reader, writer
+
+async def close_stream_server(server, writers):
+    server.close()
+    for writer in list(writers):
+        writer.close()
+    await server.wait_closed()
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    if pending:
+        _, pending = await asyncio.wait(pending, timeout=0.5)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+def obs_auth_response(password: str, salt: str, challenge: str) -> str:
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest())
+    return base64.b64encode(hashlib.sha256(secret + challenge.encode()).digest()).decode()
+
+class ObsOutputPipeline:
+    def __init__(self, max_in_flight: int = OBS_MAX_IN_FLIGHT):
+        self.max_in_flight = max(1, max_in_flight)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = None
+        self.writer = None
+        self.reader_task = None
+        self.connected = False
+        self.closing = False
+        self.pending: "OrderedDict[Tuple[Tuple[str, int], str], Tuple[Dict, Optional[float]]]" = OrderedDict()
+        self.calls: List[Tuple[str, Dict, concurrent.futures.Future]] = []
+        self.in_flight: Dict[str, Tuple[str, object, float]] = {}
+        self.busy = set()
+        self.max_seen_in_flight = 0
+        self._idle = None
+        self._counter = 0
+
+    def connect(self, host: str, port: int, password: str = "", timeout: float = 5.0):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="lipsync-obs-io", daemon=True)
+        self.thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._connect(host, port, password, timeout),
+                                             self.loop).result(timeout + 1.0)
+        except Exception:
+            self.close()
+            raise
+
+    async def _read_json(self, reader) -> Dict:
+        while True:
+            opcode, payload = await read_websocket_message(reader)
+            if opcode == WS_OP_CLOSE:
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+                raise ConnectionError(f"OBS closed the connection ({code} {payload[2:].decode(errors='replace')})")
+            if opcode in (WS_OP_TEXT, WS_OP_BINARY):
+                return json.loads(payload)
+
+    async def _connect(self, host: str, port: int, password: str, timeout: float):
+        reader, writer = await open_websocket(host, port, timeout)
+        try:
+            hello = await asyncio.wait_for(self._read_json(reader), timeout)
+            identify = {"rpcVersion": 1, "eventSubscriptions": 0}
+            auth = hello.get("d", {}).get("authentication")
+            if auth:
+                identify["authentication"] = obs_auth_response(password, auth["salt"], auth["challenge"])
+            writer.write(websocket_frame(WS_OP_TEXT, json.dumps({"op": 1, "d": identify}).encode(), mask=True))
+            identified = await asyncio.wait_for(self._read_json(reader), timeout)
+            if identified.get("op") != 2:
+                raise ConnectionError(f"OBS did not identify the connection (op {identified.get('op')})")
+        except BaseException:
+            writer.close()
+            raise
+        self.writer = writer
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.connected = True
+        self.reader_task = asyncio.ensure_future(self._read_loop(reader))
+
+    async def _read_loop(self, reader):
+        reason = "connection closed"
+        try:
+            while True:
+                opcode, payload = await read_websocket_message(reader)
+                if opcode == WS_OP_CLOSE:
+                    break
+                if opcode == WS_OP_PING:
+                    self.writer.write(websocket_frame(WS_OP_PONG, payload, mask=True))
+                    continue
+                if opcode not in (WS_OP_TEXT, WS_OP_BINARY):
+                    continue
+                message = json.loads(payload)
+                if message.get("op") == 9:
+                    self._complete_batch(message.get("d", {}))
+                elif message.get("op") == 7:
+                    self._complete_call(message.get("d", {}))
+        except asyncio.CancelledError:
+            reason = "closed"
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as e:
+            reason = str(e) or type(e).__name__
+        self._disconnected(reason)
+
+    def _disconnected(self, reason: str):
+        was_connected = self.connected
+        self.connected = False
+        for kind, payload, _ in self.in_flight.values():
+            if kind == "batch":
+                for slot, _, _ in payload:
+                    _forget_mirror_field(*slot)
+            elif not payload.done():
+                payload.set_exception(ConnectionError(reason))
+        for slot in self.pending:
+            _forget_mirror_field(*slot)
+        for _, _, future in self.calls:
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+        self.in_flight.clear()
+        self.pending.clear()
+        self.calls = []
+        self.busy.clear()
+        if self._idle is not None:
+            self._idle.set()
+        if was_connected and not self.closing:
+            mark_obs_disconnected(f"pipelined output: {reason}")
+
+    def submit(self, batch: FrameBatch, stamp: Optional[float] = None) -> bool:
+        if not self.connected:
+            return False
+        for key, field, value in batch.updates:
+            _apply_mirror_field(key, field, value)
+        self.loop.call_soon_threadsafe(self._enqueue, batch.requests, batch.updates, stamp)
+        return True
+
+    def request(self, request_type: str, request_data: Optional[Dict] = None) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        if not self.connected:
+            future.set_exception(ConnectionError("pipelined OBS output is not connected"))
+            return future
+        self.loop.call_soon_threadsafe(self._enqueue_call, request_type, request_data or {}, future)
+        return future
+
+    def _enqueue(self, requests: List[Dict], updates, stamp: Optional[float]):
+        if not self.connected:
+            for key, field, _ in updates:
+                _forget_mirror_field(key, field)
+            return
+        for request, (key, field, _) in zip(requests, updates):
+            slot = (key, field)
+            if slot in self.pending:
+                del self.pending[slot]
+                obs_request_stats["coalesced"] += 1
+            self.pending[slot] = (request, stamp)
+        self._pump()
+
+    def _enqueue_call(self, request_type: str, request_data: Dict, future: concurrent.futures.Future):
+        if not self.connected:
+            future.set_exception(ConnectionError("pipelined OBS output is not connected"))
+            return
+        self.calls.append((request_type, request_data, future))
+        self._pump()
+
+    def _send(self, op: int, request_id: str, d: Dict):
+        d["requestId"] = request_id
+        self.writer.write(websocket_frame(WS_OP_TEXT, json.dumps({"op": op, "d": d}).encode(), mask=True))
+
+    def _pump(self):
+        while self.calls and len(self.in_flight) < self.max_in_flight:
+            request_type, request_data, future = self.calls.pop(0)
+            self._counter += 1
+            request_id = f"lipsync-call-{self._counter}"
+            self.in_flight[request_id] = ("call", future, time.perf_counter())
+            self._send(6, request_id, {"requestType": request_type, "requestData": request_data})
+        if self.pending and len(self.in_flight) < self.max_in_flight:
+            ready = [slot for slot in self.pending if slot not in self.busy]
+            if ready:
+                entries = [(slot, *self.pending.pop(slot)) for slot in ready]
+                self.busy.update(ready)
+                self._counter += 1
+                request_id = f"lipsync-frame-{self._counter}"
+                self.in_flight[request_id] = ("batch", entries, time.perf_counter())
+                self._send(8, request_id, {"haltOnFailure": False, "executionType": REQUEST_BATCH_SERIAL_FRAME,
+                                           "requests": [request for _, request, _ in entries]})
+        if len(self.in_flight) > self.max_seen_in_flight:
+            self.max_seen_in_flight = len(self.in_flight)
+        if self.in_flight or self.pending or self.calls:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+    def _complete_call(self, d: Dict):
+        record = self.in_flight.pop(d.get("requestId"), None)
+        if record is not None:
+            _, future, sent_at = record
+            record_stage_ms(f"rpc {d.get('requestType')}", (time.perf_counter() - sent_at) * 1000.0)
+            if not future.done():
+                future.set_result(d)
+        self._pump()
+
+    def _complete_batch(self, d: Dict):
+        record = self.in_flight.pop(d.get("requestId"), None)
+        if record is None:
+            self._pump()
+            return
+        _, entries, sent_at = record
+        now = time.perf_counter()
+        record_stage_ms("rpc RequestBatch", (now - sent_at) * 1000.0)
+        obs_request_stats["batches"] += 1
+        results = d.get("results", [])
+        newest = None
+        for i, (slot, request, stamp) in enumerate(entries):
+            self.busy.discard(slot)
+            if stamp is not None and (newest is None or stamp > newest):
+                newest = stamp
+            status = results[i].get("requestStatus", {}) if i < len(results) else {}
+            if status.get("result"):
+                obs_request_stats["sent"] += 1
+                continue
+            obs_request_stats["failed"] += 1
+            if slot not in self.pending:
+                _forget_mirror_field(*slot)
+            add_warning(f"{request['requestType']} failed for item '{slot[0][1]}' in scene '{slot[0][0]}': "
+                        f"{status.get('comment', 'no response')}")
+        if newest is not None:
+            record_stage_ms("applied", (now - newest) * 1000.0 + audio_stats["input_latency_ms"])
+        self._pump()
+
+    async def _drained(self):
+        while self.connected and (self.in_flight or self.pending or self.calls):
+            await self._idle.wait()
+        return True
+
+    def drain(self, timeout: float = 1.0) -> bool:
+        if self.loop is None or not self.connected:
+            return True
+        try:
+            return asyncio.run_coroutine_threadsafe(self._drained(), self.loop).result(timeout)
+        except Exception:
+            return False
+
+    async def _close(self):
+        if self.writer is not None:
+            try:
+                self.writer.write(websocket_close_frame(1000, mask=True))
+                await asyncio.wait_for(self.writer.drain(), 0.5)
+            except Exception:
+                pass
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except BaseException:
+                pass
+        if self.writer is not None:
+            self.writer.close()
+        self._disconnected("closed")
+
+    def close(self):
+        self.closing = True
+        loop = self.loop
+        if loop is None:
+            return
+        if loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._close(), loop).result(2.0)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        if not loop.is_running():
+            loop.close()
+        self.loop = None
+        self.connected = False
+
+def start_obs_output(host: Optional[str] = None, port: Optional[int] = None, password: Optional[str] = None):
+    global obs_output
+    stop_obs_output()
+    if not OBS_PIPELINED:
+        return
+    pipeline = ObsOutputPipeline(OBS_MAX_IN_FLIGHT)
+    try:
+        pipeline.connect(host or OBS_HOST, port or OBS_PORT, OBS_PASSWORD if password is None else password)
+        obs_output = pipeline
+        print(f"Pipelined OBS output connected ({OBS_MAX_IN_FLIGHT} requests in flight)")
+    except Exception as e:
+        add_warning(f"Pipelined OBS output unavailable, sending frames synchronously: {e}")
+
+def stop_obs_output():
+    global obs_output
+    pipeline = obs_output
+    obs_output = None
+    if pipeline is not None:
+        pipeline.drain(1.0)
+        pipeline.close()
+
+BROWSER_FRAME = struct.Struct("<BBh")
+BROWSER_OFFSET_SCALE = 100
+
+BROWSER_SOURCE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Lipsync avatar</title>
+<style>
+html, body { margin: 0; background: transparent; overflow: hidden; }
+#stage { display: flex; align-items: flex-end; }
+.avatar { position: relative; will-change: transform; }
+.avatar img { display: block; }
+.avatar img + img { position: absolute; left: 0; top: 0; }
+</style></head><body><div id="stage"></div><script>
+const params = new URLSearchParams(location.search);
+const only = params.get("avatar") || "0";
+const smoothMs = parseFloat(params.get("smooth") || "16");
+const stage = document.getElementById("stage");
+let avatars = [];
+let scale = 100;
+
+function layer(src) {
+  const img = new Image();
+  img.src = src;
+  return img;
+}
+
+function show(avatar, mouth) {
+  const visible = avatar.mouths[mouth] || avatar.mouths[mouth > 0 ? 1 : 0];
+  for (const img of avatar.mouths) {
+    if (img) img.style.visibility = img === visible ? "visible" : "hidden";
+  }
+  avatar.mouth = mouth;
+}
+
+function build(manifest) {
+  scale = manifest.scale;
+  stage.textContent = "";
+  avatars = manifest.avatars.map((spec, i) => {
+    const el = document.createElement("div");
+    el.className = "avatar";
+    if (only !== "all" && only !== String(i) && only !== spec.name) el.style.display = "none";
+    if (spec.base) el.appendChild(layer(spec.base));
+    const mouths = spec.mouths.map(src => src ? el.appendChild(layer(src)) : null);
+    stage.appendChild(el);
+    const avatar = {el, mouths, mouth: -1, y: 0, target: 0};
+    show(avatar, 0);
+    return avatar;
+  });
+}
+
+function connect() {
+  const ws = new WebSocket(`ws://${location.host}/ws`);
+  ws.binaryType = "arraybuffer";
+  ws.onmessage = (event) => {
+    if (typeof event.data === "string") {
+      build(JSON.parse(event.data));
+      return;
+    }
+    const view = new DataView(event.data);
+    for (let o = 0; o + 4 <= view.byteLength; o += 4) {
+      const avatar = avatars[view.getUint8(o)];
+      if (!avatar) continue;
+      const mouth = view.getUint8(o + 1);
+      if (mouth !== avatar.mouth) show(avatar, mouth);
+      avatar.target = view.getInt16(o + 2, true) / scale;
+    }
+  };
+  ws.onclose = () => setTimeout(connect, 1000);
+}
+
+let last = performance.now();
+function animate(now) {
+  const k = 1 - Math.exp(-(now - last) / smoothMs);
+  last = now;
+  for (const avatar of avatars) {
+    avatar.y += (avatar.target - avatar.y) * k;
+    avatar.el.style.transform = `translateY(${avatar.y.toFixed(2)}px)`;
+  }
+  requestAnimationFrame(animate);
+}
+
+connect();
+requestAnimationFrame(animate);
+</script></body></html>
+"""
+
+def browser_source_url() -> str:
+    return f"http://{BROWSER_SOURCE_HOST}:{BROWSER_SOURCE_PORT}/"
+
+def browser_avatar_sources() -> List[Tuple[str, str, List[str]]]:
+    avatars = [("main", selected_base_source,
+                [selected_closed_source, selected_open_source] + [shape.get("source", "") for shape in VISEME_SHAPES])]
+    for channel in channels:
+        avatars.append((channel.name, channel.base_source, [channel.closed_source, channel.open_source]))
+    return avatars
+
+def browser_image_path(source: str) -> Optional[str]:
+    path = BROWSER_SOURCE_IMAGES.get(source) or browser_images.get(source)
+    if path and os.path.isfile(path):
+        return path
+    return None
+
+def resolve_browser_images():
+    if ws is None:
+        return
+    for _, base, mouths in browser_avatar_sources():
+        for source in [base] + mouths:
+            if not source or source in BROWSER_SOURCE_IMAGES:
+                continue
+            try:
+                with obs_lock:
+                    settings = ws.get_input_settings(source)
+                path = (getattr(settings, "input_settings", None) or {}).get("file")
+                if path:
+                    browser_images[source] = path
+            except Exception:
+                pass
+
+def browser_avatar_manifest() -> Dict:
+    def url(source):
+        return f"/image/{quote(source, safe='')}" if source and browser_image_path(source) else None
+    return {
+        "scale": BROWSER_OFFSET_SCALE,
+        "avatars": [{"name": name, "base": url(base), "mouths": [url(source) for source in mouths]}
+                    for name, base, mouths in browser_avatar_sources()],
+    }
+
+def _browser_offset(offset: float) -> int:
+    return max(-32768, min(32767, int(round(offset * BROWSER_OFFSET_SCALE))))
+
+def browser_mouth(level: float) -> int:
+    if not LIPSYNC_ENABLED or level <= 0.5:
+        return 0
+    if VISEME_MODE and 0 <= current_viseme < len(VISEME_SHAPES):
+        return 2 + current_viseme
+    return 1
+
+def browser_frame(level: float, elapsed: float) -> bytes:
+    offset = math.sin(2.0 * math.pi * BOBBING_SPEED_HZ * elapsed) * BOBBING_INTENSITY * level if BOBBING_ENABLED else 0.0
+    parts = [BROWSER_FRAME.pack(0, browser_mouth(level), _browser_offset(offset))]
+    for i, channel in enumerate(channels[:254], 1):
+        if channel.device_index is None:
+            continue
+        channel.advance()
+        mouth = 1 if channel.lipsync_enabled and channel.level > 0.5 else 0
+        parts.append(BROWSER_FRAME.pack(i, mouth, _browser_offset(channel.bobbing_offset(elapsed))))
+    return b"".join(parts)
+
+def browser_idle_frame() -> bytes:
+    return b"".join(BROWSER_FRAME.pack(i, 0, 0) for i in range(min(len(channels), 254) + 1))
+
+class BrowserSourceServer:
+    def __init__(self, host: str = BROWSER_SOURCE_HOST, port: int = BROWSER_SOURCE_PORT):
+        self.host = host
+        self.port = port
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = None
+        self.server = None
+        self.viewers = set()
+        self.last_frame = b""
+
+    def start(self) -> int:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="lipsync-browser-source", daemon=True)
+        self.thread.start()
+        try:
+            self.server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._client, self.host, self.port), self.loop).result(5.0)
+        except Exception:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2.0)
+            self.loop.close()
+            self.loop = None
+            raise
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    def stop(self):
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(close_stream_server(self.server, self.viewers), self.loop).result(2.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2.0)
+        self.loop.close()
+        self.loop = None
+
+    def publish(self, frame: bytes) -> bool:
+        if frame == self.last_frame or self.loop is None:
+            return False
+        self.last_frame = frame
+        self.loop.call_soon_threadsafe(self._broadcast, websocket_frame(WS_OP_BINARY, frame))
+        return True
+
+    def announce(self, manifest: Dict):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._broadcast, websocket_frame(WS_OP_TEXT, json.dumps(manifest).encode()))
+        if self.last_frame:
+            self.loop.call_soon_threadsafe(self._broadcast, websocket_frame(WS_OP_BINARY, self.last_frame))
+
+    def _broadcast(self, data: bytes):
+        for writer in list(self.viewers):
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > BROWSER_SOURCE_MAX_BUFFER:
+                browser_stats["skipped"] += 1
+                continue
+            writer.write(data)
+            browser_stats["messages"] += 1
+            browser_stats["bytes"] += len(data)
+
+    def _respond(self, writer, status: str, content_type: str, body: bytes):
+        writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                      "Cache-Control: no-store\r\nConnection: close\r\n\r\n").encode() + body)
+
+    async def _client(self, reader, writer):
+        try:
+            request, headers = parse_http_head(await reader.readuntil(b"\r\n\r\n"))
+            parts = request.split(" ")
+            path = unquote(urlsplit(parts[1]).path) if len(parts) > 1 else "/"
+            image = browser_image_path(path[len("/image/"):]) if path.startswith("/image/") else None
+            if headers.get("upgrade", "").lower() == "websocket" and path == "/ws":
+                await self._viewer(reader, writer, headers)
+            elif path == "/":
+                self._respond(writer, "200 OK", "text/html; charset=utf-8", BROWSER_SOURCE_PAGE.encode())
+            elif image:
+                with open(image, "rb") as f:
+                    body = f.read()
+                self._respond(writer, "200 OK", mimetypes.guess_type(image)[0] or "application/octet-stream", body)
+            else:
+                self._respond(writer, "404 Not Found", "text/plain", b"Not found")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.viewers.discard(writer)
+            writer.close()
 
-    source_frame = ttk.LabelFrame(main_frame, text="Source Configuration", padding=10)
-    source_frame.pack(fill="x", pady=5)
+    async def _viewer(self, reader, writer, headers: Dict[str, str]):
+        writer.write(websocket_handshake_response(headers))
+        writer.write(websocket_frame(WS_OP_TEXT, json.dumps(browser_avatar_manifest()).encode()))
+        if self.last_frame:
+            writer.write(websocket_frame(WS_OP_BINARY, self.last_frame))
+        self.viewers.add(writer)
+        print(f"Browser source viewer connected ({len(self.viewers)} open)")
+        while True:
+            opcode, payload = await read_websocket_message(reader)
+            if opcode == WS_OP_CLOSE:
+                writer.write(websocket_close_frame(1000))
+                break
+            if opcode == WS_OP_PING:
+                writer.write(websocket_frame(WS_OP_PONG, payload))
 
-    ttk.Label(source_frame, text="Closed Mouth Source").pack(anchor="w")
-    closed_source_var = tk.StringVar(value=selected_closed_source)
-    closed_source_combo = ttk.Combobox(source_frame, textvariable=closed_source_var, state="normal")
-    closed_source_combo.pack(fill="x", pady=2)
+def start_browser_source(port: Optional[int] = None) -> bool:
+    global browser_source
+    if browser_source is not None:
+        return True
+    resolve_browser_images()
+    server = BrowserSourceServer(BROWSER_SOURCE_HOST, BROWSER_SOURCE_PORT if port is None else port)
+    try:
+        server.start()
+    except OSError as e:
+        add_warning(f"Could not start the browser source server on port {server.port}: {e}")
+        return False
+    browser_source = server
+    missing = [source for _, base, mouths in browser_avatar_sources()[:1] for source in [base] + mouths[:2]
+               if source and not browser_image_path(source)]
+    if missing:
+        add_warning(f"Browser source has no image file for {', '.join(missing)}; "
+                    f"set browser_source_images in the config or use OBS image sources")
+    print(f"Browser source serving the avatar at http://{BROWSER_SOURCE_HOST}:{server.port}/")
+    return True
 
-    ttk.Label(source_frame, text="Open Mouth Source").pack(anchor="w")
-    open_source_var = tk.StringVar(value=selected_open_source)
-    open_source_combo = ttk.Combobox(source_frame, textvariable=open_source_var, state="normal")
-    open_source_combo.pack(fill="x", pady=2)
+def stop_browser_source():
+    global browser_source
+    server = browser_source
+    browser_source = None
+    if server is not None:
+        server.stop()
 
-    ttk.Label(source_frame, text="Base Avatar Source").pack(anchor="w")
-    base_source_var = tk.StringVar(value=selected_base_source)
-    base_source_combo = ttk.Combobox(source_frame, textvariable=base_source_var, state="normal")
-    base_source_combo.pack(fill="x", pady=2)
+def announce_browser_avatars():
+    if browser_source is not None:
+        resolve_browser_images()
+        browser_source.announce(browser_avatar_manifest())
 
-    def refresh_sources():
-        sources = get_obs_sources()
-        if sources:
-            closed_source_combo['values'] = sources
-            open_source_combo['values'] = sources
-            base_source_combo['values'] = sources
-        else:
-            closed_source_combo.set(selected_closed_source)
-            open_source_combo.set(selected_open_source)
-            base_source_combo.set(selected_base_source)
+def set_output_backend(name: str):
+    global OUTPUT_BACKEND
+    if name not in OUTPUT_BACKENDS:
+        add_warning(f"Unknown output backend '{name}'")
+        return
+    if name == OUTPUT_BACKEND:
+        return
+    running = lipsync_running
+    if running:
+        stop_lipsync()
+    OUTPUT_BACKEND = name
+    save_config()
+    if name != "browser":
+        stop_browser_source()
+    if running:
+        start_lipsync()
 
-    def on_source_change(*args):
-        global selected_closed_source, selected_open_source, selected_base_source
-        selected_closed_source = closed_source_var.get()
-        selected_open_source = open_source_var.get()
-        selected_base_source = base_source_var.get()
-        save_config()
-        update_scene_items()
+def output_stats_text() -> str:
+    if OUTPUT_BACKEND == "browser":
+        viewers = len(browser_source.viewers) if browser_source is not None else 0
+        return (f"Browser source: {viewers} viewer(s)  messages: {browser_stats['messages']}  "
+                f"bytes: {browser_stats['bytes']}  skipped: {browser_stats['skipped']}  "
+                f"OBS requests: {obs_request_stats['sent']}")
+    return (f"OBS requests sent: {obs_request_stats['sent']}  "
+            f"suppressed: {obs_request_stats['suppressed']}  "
+            f"failed: {obs_request_stats['failed']}  "
+            f"batches: {obs_request_stats['batches']}")
 
-    closed_source_var.trace('w', on_source_change)
-    open_source_var.trace('w', on_source_change)
-    base_source_var.trace('w', on_source_change)
-    ttk.Button(source_frame, text="Refresh Sources", command=refresh_sources).pack(pady=5)
+BENCH_SCENE = "Lipsync Benchmark"
 
-    audio_settings = ttk.LabelFrame(main_frame, text="Audio Settings", padding=10)
-    audio_settings.pack(fill="x", pady=5)
+class MockObsBackend:
+    def __init__(self, latency_ms: float = 2.0, per_request_ms: float = 0.05, fps: float = 60.0):
+        self.latency = latency_ms / 1000.0
+        self.per_request = per_request_ms / 1000.0
+        self.fps = fps
+        self.lock = threading.Lock()
+        self.program_scene = BENCH_SCENE
+        self.items = {}
+        names = (selected_base_source, selected_closed_source, selected_open_source, *viseme_source_names(),
+                 *(name for channel in channels for name in channel.source_names()))
+        for sid, name in enumerate(names, start=1):
+            self.items[sid] = {
+                "sourceName": name,
+                "sceneItemId": sid,
+                "sceneItemIndex": sid - 1,
+                "sceneItemEnabled": name not in (selected_open_source, *viseme_source_names(),
+                                                 *(channel.open_source for channel in channels)),
+                "isGroup": False,
+                "sourceType": "OBS_SOURCE_TYPE_INPUT",
+                "sceneItemTransform": {"positionX": 0.0, "positionY": 100.0, "boundsWidth": 1.0, "boundsHeight": 1.0},
+            }
+        self.counts: Dict[str, int] = {}
+        self.enabled_log: List[Tuple[float, int, bool]] = []
 
-    ttk.Label(audio_settings, text="Sample Rate").pack(anchor="w")
-    sample_rate_var = tk.StringVar(value=str(SAMPLE_RATE))
-    sample_rate_combo = ttk.Combobox(audio_settings, textvariable=sample_rate_var, 
-                                     values=["16000", "44100", "48000", "96000"], state="readonly")
-    sample_rate_combo.pack(fill="x", pady=5)
-    sample_rate_combo.bind('<<ComboboxSelected>>', lambda e: update_sample_rate())
+    def reset_counts(self):
+        with self.lock:
+            self.counts = {}
+            self.enabled_log = []
 
-    ttk.Label(audio_settings, text="Equalizer Bands", font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(10,5))
-    eq_bands = []
-    eq_frequencies = ["80Hz", "250Hz", "500Hz", "1kHz", "2kHz", "4kHz", "8kHz"]
+    def _count(self, request_type: str):
+        self.counts[request_type] = self.counts.get(request_type, 0) + 1
 
-    for i, freq in enumerate(eq_frequencies):
-        eq_frame = ttk.Frame(audio_settings)
-        eq_frame.pack(fill="x", pady=2)
-        ttk.Label(eq_frame, text=freq, width=8).pack(side="left")
-        eq_slider = ttk.Scale(eq_frame, from_=-12, to=12, orient="horizontal", 
-                             value=EQUALIZER_GAINS[i], 
-                             command=lambda v, idx=i: update_equalizer(idx, float(v)), 
-                             style="Horizontal.TScale")
-        eq_slider.pack(side="left", fill="x", expand=True)
-        eq_value_label = ttk.Label(eq_frame, text=f"{EQUALIZER_GAINS[i]:.1f} dB", width=8)
-        eq_value_label.pack(side="right")
-        eq_bands.append({"slider": eq_slider, "label": eq_value_label})
+    def handle(self, request_type: str, data: Optional[Dict]) -> Tuple[bool, int, Optional[Dict], Optional[str]]:
+        data = data or {}
+        with self.lock:
+            self._count(request_type)
+            if request_type == "GetVersion":
+                return True, 100, {"obsVersion": "mock", "obsWebSocketVersion": "5.0.0", "rpcVersion": 1}, None
+            if request_type == "GetVideoSettings":
+                return True, 100, {"fpsNumerator": int(self.fps * 1000), "fpsDenominator": 1000,
+                                   "baseWidth": 1920, "baseHeight": 1080,
+                                   "outputWidth": 1920, "outputHeight": 1080}, None
+            if request_type == "GetSceneList":
+                return True, 100, {"currentProgramSceneName": self.program_scene,
+                                   "currentPreviewSceneName": None,
+                                   "scenes": [{"sceneName": BENCH_SCENE, "sceneIndex": 0}]}, None
+            if request_type in ("GetCurrentProgramScene", "GetCurrentScene"):
+                return True, 100, {"currentProgramSceneName": self.program_scene, "sceneName": self.program_scene}, None
+            if data.get("sceneName") not in (None, BENCH_SCENE):
+                return False, 600, None, f"No source was found by the name of `{data.get('sceneName')}`."
+            if request_type == "GetSceneItemList":
+                return True, 100, {"sceneItems": [json.loads(json.dumps(item)) for item in self.items.values()]}, None
+            if request_type == "GetGroupSceneItemList":
+                return False, 602, None, "The specified source is not a group."
+            item = self.items.get(data.get("sceneItemId"))
+            if request_type in ("GetSceneItemTransform", "SetSceneItemTransform", "SetSceneItemEnabled") and item is None:
+                return False, 600, None, "No scene items were found in the specified scene by that ID."
+            if request_type == "GetSceneItemTransform":
+                return True, 100, {"sceneItemTransform": dict(item["sceneItemTransform"])}, None
+            if request_type == "SetSceneItemTransform":
+                item["sceneItemTransform"].update(data.get("sceneItemTransform") or {})
+                return True, 100, None, None
+            if request_type == "SetSceneItemEnabled":
+                item["sceneItemEnabled"] = bool(data.get("sceneItemEnabled"))
+                self.enabled_log.append((time.perf_counter(), item["sceneItemId"], item["sceneItemEnabled"]))
+                return True, 100, None, None
+            return False, 204, None, f"Request type `{request_type}` is not supported by the mock."
 
-    controls = ttk.LabelFrame(main_frame, text="Lipsync Controls", padding=10)
-    controls.pack(fill="x", pady=5)
+    def response_delay(self, message: Dict) -> float:
+        if message.get("op") == 8:
+            return self.latency + self.per_request * len(message.get("d", {}).get("requests", []))
+        return self.latency + self.per_request
 
-    lipsync_var = tk.BooleanVar(value=LIPSYNC_ENABLED)
-    lipsync_check = ttk.Checkbutton(controls, text="Enable Lip Sync", 
-                                     variable=lipsync_var, command=lambda: toggle_lipsync())
-    lipsync_check.pack(anchor="w", pady=(5,5))
+    def handle_message(self, message: Dict) -> Optional[Dict]:
+        response = self.respond(message)
+        time.sleep(self.response_delay(message))
+        return response
 
-    ttk.Label(controls, text="Threshold").pack(anchor="w")
-    threshold_slider = ttk.Scale(controls, from_=0.00001, to=0.01, orient="horizontal", 
-                                value=THRESHOLD, command=lambda v: update_threshold(float(v)), 
-                                style="Horizontal.TScale")
-    threshold_slider.pack(fill="x", pady=5)
-    threshold_label = ttk.Label(controls, text=f"{THRESHOLD:.5f}")
-    threshold_label.pack(anchor="w")
+    def respond(self, message: Dict) -> Optional[Dict]:
+        op = message.get("op")
+        d = message.get("d", {})
+        if op == 6:
+            ok, code, response_data, comment = self.handle(d.get("requestType"), d.get("requestData"))
+            response = {"requestType": d.get("requestType"), "requestId": d.get("requestId"),
+                        "requestStatus": {"result": ok, "code": code}}
+            if comment:
+                response["requestStatus"]["comment"] = comment
+            if response_data is not None:
+                response["responseData"] = response_data
+            return {"op": 7, "d": response}
+        if op == 8:
+            with self.lock:
+                self._count("RequestBatch")
+            results = []
+            halted = False
+            for request in d.get("requests", []):
+                if halted:
+                    break
+                ok, code, response_data, comment = self.handle(request.get("requestType"), request.get("requestData"))
+                result = {"requestType": request.get("requestType"), "requestId": request.get("requestId"),
+                          "requestStatus": {"result": ok, "code": code}}
+                if comment:
+                    result["requestStatus"]["comment"] = comment
+                if response_data is not None:
+                    result["responseData"] = response_data
+                results.append(result)
+                halted = not ok and d.get("haltOnFailure", False)
+            return {"op": 9, "d": {"requestId": d.get("requestId"), "results": results}}
+        return None
 
-    ttk.Label(controls, text="Volume Multiplier").pack(anchor="w")
-    multiplier_slider = ttk.Scale(controls, from_=0.1, to=10.0, orient="horizontal", 
-                                 value=VOLUME_MULTIPLIER, command=lambda v: update_multiplier(float(v)), 
-                                 style="Horizontal.TScale")
-    multiplier_slider.pack(fill="x", pady=5)
-    multiplier_label = ttk.Label(controls, text=f"{VOLUME_MULTIPLIER:.1f}")
-    multiplier_label.pack(anchor="w")
+class MockObsSocket:
+    def __init__(self, backend: MockObsBackend):
+        self.backend = backend
+        self._pending: List[str] = []
 
-    bobbing_frame = ttk.LabelFrame(main_frame, text="Bobbing Controls", padding=10)
-    bobbing_frame.pack(fill="x", pady=5)
+    def send(self, payload: str):
+        response = self.backend.handle_message(json.loads(payload))
+        if response is not None:
+            self._pending.append(json.dumps(response))
 
-    bobbing_var = tk.BooleanVar(value=BOBBING_ENABLED)
-    bobbing_check = ttk.Checkbutton(bobbing_frame, text="Enable Bobbing", 
-                                     variable=bobbing_var, command=lambda: toggle_bobbing())
-    bobbing_check.pack(anchor="w", pady=(5,5))
+    def recv(self) -> str:
+        if not self._pending:
+            raise ConnectionError("mock OBS socket has no pending response")
+        return self._pending.pop(0)
 
-    ttk.Label(bobbing_frame, text="Bobbing Intensity").pack(anchor="w")
-    bobbing_slider = ttk.Scale(bobbing_frame, from_=0.0, to=20.0, orient="horizontal", 
-                               value=BOBBING_INTENSITY, command=lambda v: update_bobbing_intensity(float(v)), 
-                               style="Horizontal.TScale")
-    bobbing_slider.pack(fill="x", pady=5)
-    bobbing_label = ttk.Label(bobbing_frame, text=f"{BOBBING_INTENSITY:.1f}")
-    bobbing_label.pack(anchor="w")
+    def close(self):
+        self._pending = []
 
-    volume_frame = ttk.LabelFrame(main_frame, text="Volume Display", padding=10)
-    volume_frame.pack(fill="x", pady=5)
+def create_mock_obs_client(backend: MockObsBackend):
+    from obsws_python.baseclient import ObsClient
+    base = ObsClient.__new__(ObsClient)
+    base.logger = obs.reqs.logger.getChild("MockObsClient")
+    base.ws = MockObsSocket(backend)
+    base.host, base.port, base.password, base.timeout, base.subs = "mock", 0, "", None, 0
+    client = obs.ReqClient.__new__(obs.ReqClient)
+    client.logger = obs.reqs.logger.getChild("MockReqClient")
+    client.base_client = base
+    return client
 
-    volume_bar = ttk.Progressbar(volume_frame, orient="horizontal", length=100, 
-                                 mode="determinate", style="Horizontal.TProgressbar")
-    volume_bar.pack(fill="x", pady=5)
+class ObsStandInServer:
+    def __init__(self, backend: MockObsBackend, host: str = "127.0.0.1", port: int = 0, password: str = ""):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.password = password
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = None
+        self.server = None
+        self.clients = 0
+        self.writers = set()
 
-    volume_label = ttk.Label(volume_frame, text="0.00", font=("Segoe UI", 16, "bold"))
-    volume_label.pack(pady=5)
+    def start(self) -> int:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="obs-stand-in", daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._client, self.host, self.port), self.loop).result(5.0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
 
-    warnings_frame = ttk.LabelFrame(main_frame, text="Warnings", padding=10)
-    warnings_frame.pack(fill="both", expand=True, pady=5)
+    def stop(self):
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(close_stream_server(self.server, self.writers), self.loop).result(2.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2.0)
+        self.loop.close()
+        self.loop = None
 
-    warnings_text = tk.Text(warnings_frame, height=8, bg="#1e1e1e", fg=warning_color, 
-                           font=("Consolas", 9), wrap="word", relief="flat")
-    warnings_text.pack(fill="both", expand=True)
-    warnings_scrollbar = ttk.Scrollbar(warnings_frame, orient="vertical", command=warnings_text.yview)
-    warnings_scrollbar.pack(side="right", fill="y")
-    warnings_text.configure(yscrollcommand=warnings_scrollbar.set)
+    def _write(self, writer, op: int, d: Dict):
+        writer.write(websocket_frame(WS_OP_TEXT, json.dumps({"op": op, "d": d}).encode()))
 
-    def update_ui():
+    async def _read_json(self, reader) -> Optional[Dict]:
+        while True:
+            opcode, payload = await read_websocket_message(reader)
+            if opcode == WS_OP_CLOSE:
+                return None
+            if opcode in (WS_OP_TEXT, WS_OP_BINARY):
+                return json.loads(payload)
+
+    async def _client(self, reader, writer):
+        tasks = set()
+        self.writers.add(writer)
         try:
-            volume_bar['value'] = current_volume * 100
-            volume_label['text'] = f"{current_volume:.2f}"
-            threshold_label['text'] = f"{THRESHOLD:.5f}"
-            multiplier_label['text'] = f"{VOLUME_MULTIPLIER:.1f}"
-            bobbing_label['text'] = f"{BOBBING_INTENSITY:.1f}"
-            for i, band in enumerate(eq_bands):
-                band["label"]["text"] = f"{EQUALIZER_GAINS[i]:.1f} dB"
-            warnings_text.delete(1.0, tk.END)
-            warnings_text.insert(1.0, "\n".join(ui_warnings))
-            
-            if lipsync_running:
-                status_label['text'] = "Status: Running"
-                status_label['foreground'] = "#98c379"
-                start_button['state'] = "disabled"
-                stop_button['state'] = "normal"
-            else:
-                status_label['text'] = "Status: Stopped"
-                status_label['foreground'] = warning_color
-                start_button['state'] = "normal"
-                stop_button['state'] = "disabled"
-                
-        except Exception as e:
-            print(f"UI update error: {e}")
-        root.after(100, update_ui)
+            _, headers = parse_http_head(await reader.readuntil(b"\r\n\r\n"))
+            if headers.get("upgrade", "").lower() != "websocket":
+                writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            writer.write(websocket_handshake_response(headers))
+            hello = {"obsWebSocketVersion": "5.0.0-stand-in", "rpcVersion": 1}
+            if self.password:
+                salt = base64.b64encode(os.urandom(24)).decode()
+                challenge = base64.b64encode(os.urandom(24)).decode()
+                hello["authentication"] = {"salt": salt, "challenge": challenge}
+            self._write(writer, 0, hello)
+            identify = await self._read_json(reader)
+            if identify is None or identify.get("op") != 1:
+                writer.write(websocket_close_frame(4007, "Not identified."))
+                return
+            if self.password and identify["d"].get("authentication") != obs_auth_response(
+                    self.password, hello["authentication"]["salt"], hello["authentication"]["challenge"]):
+                writer.write(websocket_close_frame(4009, "Authentication failed."))
+                return
+            self._write(writer, 2, {"negotiatedRpcVersion": 1})
+            self.clients += 1
+            while True:
+                opcode, payload = await read_websocket_message(reader)
+                if opcode == WS_OP_CLOSE:
+                    writer.write(websocket_close_frame(1000))
+                    break
+                if opcode == WS_OP_PING:
+                    writer.write(websocket_frame(WS_OP_PONG, payload))
+                    continue
+                if opcode not in (WS_OP_TEXT, WS_OP_BINARY):
+                    continue
+                message = json.loads(payload)
+                if message.get("op") == 3:
+                    self._write(writer, 2, {"negotiatedRpcVersion": 1})
+                elif message.get("op") in (6, 8):
+                    task = asyncio.ensure_future(self._respond(writer, message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.writers.discard(writer)
+            writer.close()
 
-    def update_threshold(value):
-        global THRESHOLD
-        THRESHOLD = value
-        save_config()
+    async def _respond(self, writer, message: Dict):
+        response = self.backend.respond(message)
+        await asyncio.sleep(self.backend.response_delay(message))
+        if response is not None and not writer.is_closing():
+            writer.write(websocket_frame(WS_OP_TEXT, json.dumps(response).encode()))
 
-    def update_multiplier(value):
-        global VOLUME_MULTIPLIER
-        VOLUME_MULTIPLIER = value
-        save_config()
+def run_obs_standin(port: int, latency_ms: float) -> int:
+    server = ObsStandInServer(MockObsBackend(latency_ms=latency_ms), host="127.0.0.1", port=port)
+    server.start()
+    print(f"obs-websocket stand-in listening on ws://127.0.0.1:{server.port} (scene '{BENCH_SCENE}', "
+          f"{latency_ms:.1f} ms simulated latency, no password). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    return 0
 
-    def update_equalizer(band_index, value):
-        global EQUALIZER_GAINS
-        EQUALIZER_GAINS[band_index] = value
-        save_config()
+def benchmark_obs_transport(requests: int = 2000, latency_ms: float = 2.0, windows=(1, 4, 16)) -> int:
+    backend = MockObsBackend(latency_ms=latency_ms)
+    server = ObsStandInServer(backend)
+    port = server.start()
+    data = {"sceneName": BENCH_SCENE, "sceneItemId": 1, "sceneItemTransform": {"positionY": 100.0}}
+    print(f"OBS transport: {requests} SetSceneItemTransform requests against the local stand-in, "
+          f"{latency_ms:.1f} ms simulated round trip")
+    try:
+        client = obs.ReqClient(host="127.0.0.1", port=port, password="", timeout=5)
+        latencies = np.empty(requests)
+        started = time.perf_counter()
+        for i in range(requests):
+            t0 = time.perf_counter()
+            client.send("SetSceneItemTransform", data)
+            latencies[i] = (time.perf_counter() - t0) * 1000.0
+        elapsed = time.perf_counter() - started
+        client.disconnect()
+        print(f"  obsws-python ReqClient:   {requests / elapsed:8.0f} req/s  {_percentiles(latencies.tolist())}")
+        for window in windows:
+            pipeline = ObsOutputPipeline(window)
+            pipeline.connect("127.0.0.1", port)
+            done_at = np.zeros(requests)
+            submitted_at = np.empty(requests)
+            futures = []
+            started = time.perf_counter()
+            for i in range(requests):
+                submitted_at[i] = time.perf_counter()
+                future = pipeline.request("SetSceneItemTransform", data)
+                future.add_done_callback(lambda f, i=i: done_at.__setitem__(i, time.perf_counter()))
+                futures.append(future)
+            failed = sum(1 for future in futures if not future.result(30.0)["requestStatus"]["result"])
+            elapsed = time.perf_counter() - started
+            peak = pipeline.max_seen_in_flight
+            pipeline.close()
+            latencies = ((done_at - submitted_at) * 1000.0).tolist()
+            print(f"  pipelined, window {window:<3}  {requests / elapsed:8.0f} req/s  {_percentiles(latencies)}  "
+                  f"peak in flight {peak}, failed {failed}")
+    finally:
+        server.stop()
+    return 0
 
-    def update_sample_rate():
-        global SAMPLE_RATE, stream
-        try:
-            SAMPLE_RATE = int(sample_rate_var.get())
-            save_config()
-            if stream and stream.active:
-                stream.stop()
-                stream.close()
-                stream = sd.InputStream(device=device_index, channels=1, 
-                                       callback=audio_callback, samplerate=SAMPLE_RATE, blocksize=512)
-                stream.start()
-        except Exception as e:
-            add_warning(f"Failed to update sample rate: {e}")
+class BenchStatus:
+    def __init__(self, overflow: bool):
+        self.input_overflow = overflow
 
-    def toggle_lipsync():
-        global LIPSYNC_ENABLED
-        LIPSYNC_ENABLED = lipsync_var.get()
-        save_config()
+    def __bool__(self):
+        return self.input_overflow
 
-    def toggle_bobbing():
-        global BOBBING_ENABLED
-        BOBBING_ENABLED = bobbing_var.get()
-        save_config()
+    def __str__(self):
+        return "input overflow" if self.input_overflow else ""
 
-    def update_bobbing_intensity(value):
-        global BOBBING_INTENSITY
-        BOBBING_INTENSITY = value
-        save_config()
+class BrowserBenchViewer:
+    def __init__(self, port: int):
+        self.ws = create_connection(f"ws://127.0.0.1:{port}/ws", timeout=5)
+        self.manifest = json.loads(self.ws.recv())
+        self.log: List[Tuple[float, bool]] = []
+        self.messages = 0
+        self.bytes = 0
+        self.thread = threading.Thread(target=self._run, name="browser-bench-viewer", daemon=True)
+        self.thread.start()
 
-    def select_mic_device(dev_index=None):
-        global device_index, current_mic_device, current_mic_name, stream, stream_active
-        
-        try:
-            if stream and stream.active:
-                stream.stop()
-                stream.close()
-                stream = None
-                stream_active = False
-        except Exception:
-            pass
-        
-        if dev_index is not None:
-            device_index = dev_index
-            current_mic_device = dev_index
-            
+    def _run(self):
+        while True:
             try:
-                devices = sd.query_devices()
-                if dev_index < len(devices):
-                    current_mic_name = devices[dev_index]['name']
-                else:
-                    current_mic_name = f"Device {dev_index}"
+                data = self.ws.recv()
             except Exception:
-                current_mic_name = f"Device {dev_index}"
-        else:
-            device_index = None
-            current_mic_device = None
-            current_mic_name = None
-        
-        save_config()
-        
-        if device_index is not None and lipsync_running:
-            try:
-                stream = sd.InputStream(device=device_index, channels=1, 
-                                       callback=audio_callback, samplerate=SAMPLE_RATE, blocksize=512)
-                stream.start()
-                stream_active = True
-                print(f"Started audio stream on device {device_index} ({current_mic_name})")
-            except Exception as e:
-                add_warning(f"Failed to start audio stream: {e}")
-                stream_active = False
-
-    def start_lipsync():
-        global lipsync_running, stream, stream_active, mouth_state, current_volume
-        
-        if lipsync_running:
-            return
-        
-        if not ws:
-            add_warning("OBS not connected. Cannot start lipsync.")
-            return
-        
-        if device_index is None:
-            add_warning("No microphone selected. Please select a microphone.")
-            return
-        
-        try:
-            lipsync_running = True
-            mouth_state = 0.0
-            current_volume = 0.0
-            
-            update_scene_items()
-            
-            if not open_item_id or not closed_item_id:
-                add_warning("Mouth sources not found in scene. Please check source configuration.")
-                lipsync_running = False
                 return
-            
-            safe_set_scene_item_enabled(scene, closed_item_id, True)
-            safe_set_scene_item_enabled(scene, open_item_id, False)
-            
-            stream = sd.InputStream(device=device_index, channels=1, 
-                                   callback=audio_callback, samplerate=SAMPLE_RATE, blocksize=512)
-            stream.start()
-            stream_active = True
-            
-            print(f"Lipsync started on device {device_index} ({current_mic_name})")
-            add_warning("Lipsync started successfully")
-            
-        except Exception as e:
-            add_warning(f"Failed to start lipsync: {e}")
-            lipsync_running = False
-            stream_active = False
+            if isinstance(data, bytes) and len(data) >= BROWSER_FRAME.size:
+                self.log.append((time.perf_counter(), data[1] != 0))
+                self.messages += 1
+                self.bytes += len(data)
 
-    def stop_lipsync():
-        global lipsync_running, stream, stream_active, mouth_state, bobbing_phase
-        
-        if not lipsync_running:
-            return
-        
+    def reset(self):
+        self.log = []
+        self.messages = 0
+        self.bytes = 0
+
+    def close(self):
         try:
-            lipsync_running = False
-            stream_active = False
-            
-            if stream and stream.active:
-                stream.stop()
-                stream.close()
-                stream = None
-            
-            mouth_state = 0.0
-            bobbing_phase = 0.0
-            
-            if ws and scene and closed_item_id:
-                safe_set_scene_item_enabled(scene, closed_item_id, True)
-                safe_set_scene_item_enabled(scene, open_item_id, False)
-                
-                for key in list(_original_positions.keys()):
-                    if key.startswith(f"{scene}:"):
-                        item_id = int(key.split(":")[1])
-                        orig_y = _original_positions[key]
-                        try:
-                            transform_resp = safe_get_scene_item_transform(scene, item_id)
-                            transform = _extract_transform(transform_resp)
-                            if transform:
-                                if isinstance(transform, dict):
-                                    transform['positionY'] = orig_y
-                                else:
-                                    setattr(transform, 'positionY', orig_y)
-                                safe_set_scene_item_transform(scene, item_id, transform)
-                        except Exception:
-                            pass
-            
-            print("Lipsync stopped")
-            add_warning("Lipsync stopped")
-            
-        except Exception as e:
-            add_warning(f"Error stopping lipsync: {e}")
-            lipsync_running = False
-            stream_active = False
+            self.ws.close()
+        except Exception:
+            pass
+        self.thread.join(timeout=2.0)
 
-    refresh_sources()
-    update_ui()
-    root.mainloop()
+def synthetic_signal(kind: str, sample_rate: int, seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    noise = rng.standard_normal(t.size) * 1e-4
+    if kind == "silence":
+        return noise.astype(np.float32)
+    pitch = 150.0 + 40.0 * np.sin(2.0 * math.pi * 0.7 * t)
+    phase = 2.0 * math.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8) if k * 190.0 < sample_rate / 2)
+    syllables = np.clip(np.sin(2.0 * math.pi * 4.0 * t), 0.0, None) ** 0.5
+    phrases = (np.sin(2.0 * math.pi * 0.4 * t) > -0.3).astype(float)
+    return (0.05 * voice * syllables * phrases + noise).astype(np.float32)
 
-def toggle_mouth_smooth(mouth_state):
-    global ws, scene, open_item_id, closed_item_id
-    
-    if not ws or not scene or not LIPSYNC_ENABLED:
-        return
-    
-    try:
-        if mouth_state > 0.5:
-            safe_set_scene_item_enabled(scene, closed_item_id, False)
-            safe_set_scene_item_enabled(scene, open_item_id, True)
-        else:
-            safe_set_scene_item_enabled(scene, closed_item_id, True)
-            safe_set_scene_item_enabled(scene, open_item_id, False)
-    except Exception:
-        pass
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    arr = np.asarray(values)
+    return (f"p50 {np.percentile(arr, 50):.3f}  p95 {np.percentile(arr, 95):.3f}  "
+            f"p99 {np.percentile(arr, 99):.3f}  max {arr.max():.3f}")
 
-def connect_obs():
-    global ws
-    try:
-        ws = obs.ReqClient(host=OBS_HOST, port=OBS_PORT, password=OBS_PASSWORD)
-        print("Connected to OBS")
-        update_scene_items()
-    except Exception as e:
-        add_warning(f"Failed to connect to OBS: {e}")
-        ws = None
+def benchmark_pipeline(kind: str, sample_rate: int, seconds: float, backend: MockObsBackend,
+                       server: Optional[ObsStandInServer] = None, viewer: Optional[BrowserBenchViewer] = None) -> Dict:
+    global ws, events_ws, SAMPLE_RATE, lipsync_running, stream_active, mouth_state, current_volume, scene
+    global effective_threshold, obs_connected
+    SAMPLE_RATE = sample_rate
+    update_analysis_block()
+    update_viseme_bands()
+    update_mouth_gate()
+    mouth_gate.reset()
+    effective_threshold = THRESHOLD
+    analysis.reset()
+    backend.reset_counts()
+    scene = None
+    scene_item_mirror.clear()
+    transform_cache.clear()
+    bobbing_offsets.clear()
+    recent_transform_sends.clear()
+    if server is not None:
+        ws = obs.ReqClient(host="127.0.0.1", port=server.port, password="", timeout=5)
+        start_obs_output("127.0.0.1", server.port, "")
+    else:
+        ws = create_mock_obs_client(backend)
+    events_ws = None
+    build_scene_item_index()
+    update_scene_items()
+    reset_audio_stats()
+    reset_obs_request_stats()
+    reset_animation_stats()
+    reset_browser_stats()
+    reset_perf_stages()
+    backend.reset_counts()
+    if viewer is not None:
+        viewer.reset()
+    mouth_state = 0.0
+    current_volume = 0.0
+    lipsync_running = True
+    stream_active = True
+    obs_connected = True
+
+    signal = synthetic_signal(kind, sample_rate, seconds)
+    block_size = latency_profile()["blocksize"]
+    if block_size:
+        sizes = np.full(signal.shape[0] // block_size, block_size)
+    else:
+        sizes = np.random.default_rng(1).integers(96, 289, signal.shape[0] // 96)
+    ends = np.cumsum(sizes)
+    ends = ends[ends <= signal.shape[0]].tolist()
+    column = signal.reshape(-1, 1)
+    callback_ms: List[float] = []
+    decision_ms: List[float] = []
+    decisions: List[Tuple[float, bool]] = []
+    mouth_open = False
 
-def main():
+    start_output_worker()
+    started = time.perf_counter()
+    deadline = started
+    block_start = 0
+    for block_end in ends:
+        frames = block_end - block_start
+        block = column[block_start:block_end]
+        block_start = block_end
+        period = frames / sample_rate
+        deadline += period
+        behind = time.perf_counter() - deadline
+        if behind < 0:
+            time.sleep(-behind)
+        now = time.perf_counter()
+        time_info = types.SimpleNamespace(inputBufferAdcTime=now - period, currentTime=now, outputBufferDacTime=0.0)
+        t0 = time.perf_counter()
+        audio_callback(block, frames, time_info, BenchStatus(behind > period))
+        t1 = time.perf_counter()
+        callback_ms.append((t1 - t0) * 1000.0)
+        decision_ms.append(audio_stats["decision_latency_ms"])
+        if (mouth_state > 0.5) != mouth_open:
+            mouth_open = mouth_state > 0.5
+            decisions.append((t1, mouth_open))
+    time.sleep(2.0 / animation_frame_rate())
+    elapsed = time.perf_counter() - started
+    stop_output_worker()
+    peak_in_flight = obs_output.max_seen_in_flight if obs_output is not None else 1
+    lipsync_running = False
+    stream_active = False
+
+    open_id = open_item_id
+    if viewer is not None:
+        applied = list(viewer.log)
+    else:
+        applied = [(t, enabled) for t, sid, enabled in backend.enabled_log if sid == open_id]
+    latencies = []
+    cursor = 0
+    for decided_at, wanted in decisions:
+        while cursor < len(applied) and (applied[cursor][0] < decided_at or applied[cursor][1] != wanted):
+            cursor += 1
+        if cursor < len(applied):
+            latencies.append((applied[cursor][0] - decided_at) * 1000.0)
+            cursor += 1
+    result = {
+        "kind": kind,
+        "sample_rate": sample_rate,
+        "seconds": elapsed,
+        "callback_ms": callback_ms,
+        "decision_ms": decision_ms,
+        "latency_ms": latencies,
+        "decisions": len(decisions),
+        "rpcs": dict(backend.counts),
+        "overflows": audio_stats["input_overflows"],
+        "coalesced": audio_stats["coalesced_states"],
+        "late_frames": animation_stats["late_frames"],
+        "suppressed": obs_request_stats["suppressed"],
+        "coalesced_requests": obs_request_stats["coalesced"],
+        "peak_in_flight": peak_in_flight,
+        "viewer_messages": viewer.messages if viewer is not None else 0,
+        "viewer_bytes": viewer.bytes if viewer is not None else 0,
+        "stages": format_perf_report(),
+    }
+    stop_obs_output()
+    if server is not None:
+        ws.disconnect()
+    ws = None
+    obs_connected = False
+    return result
+
+def run_benchmark(seconds: float = 3.0, latency_ms: float = 2.0, rates=(16000, 44100, 48000, 96000),
+                  profiles: Optional[List[str]] = None, transport: str = "mock") -> int:
+    global LIPSYNC_ENABLED, BOBBING_ENABLED, LATENCY_PROFILE, OUTPUT_BACKEND
+    LIPSYNC_ENABLED = True
+    BOBBING_ENABLED = True
+    set_profiling(True)
+    backend = MockObsBackend(latency_ms=latency_ms)
+    server = None
+    viewer = None
+    if transport == "standin":
+        server = ObsStandInServer(backend)
+        server.start()
+        description = "pipelined over the local stand-in"
+    elif transport == "browser":
+        OUTPUT_BACKEND = "browser"
+        if not start_browser_source(port=0):
+            return 1
+        viewer = BrowserBenchViewer(browser_source.port)
+        description = "browser source over a local WebSocket viewer"
+    else:
+        description = "synchronous in-process mock"
+    print(f"Benchmark: {seconds:.1f} s per run, mock OBS round trip {latency_ms:.1f} ms, "
+          f"animation {animation_frame_rate():.0f} FPS, {description}")
+    for profile in profiles or [LATENCY_PROFILE]:
+        LATENCY_PROFILE = profile
+        block_size = latency_profile()["blocksize"]
+        block = f"block {block_size}" if block_size else "simulated host blocks of 96-288 frames"
+        for rate in rates:
+            for kind in ("speech", "silence"):
+                r = benchmark_pipeline(kind, rate, seconds, backend, server, viewer)
+                rates_text = ", ".join(f"{name} {count / r['seconds']:.1f}/s"
+                                       for name, count in sorted(r["rpcs"].items()))
+                print(f"\n[{kind} @ {rate} Hz, {profile} profile, {block}] "
+                      f"{len(r['callback_ms'])} callbacks, {r['decisions']} mouth changes")
+                print(f"  callback ms:        {_percentiles(r['callback_ms'])}")
+                print(f"  input->decision ms: {_percentiles(r['decision_ms'])}")
+                print(f"  {'state->' + ('page' if viewer else 'OBS') + ' ms:':<20}{_percentiles(r['latency_ms'])}")
+                print(f"  OBS requests:       {rates_text or 'none'}")
+                print(f"  overflows {r['overflows']}  coalesced states {r['coalesced']}  "
+                      f"late frames {r['late_frames']}  suppressed sends {r['suppressed']}")
+                if server is not None:
+                    print(f"  peak batches in flight {r['peak_in_flight']}  "
+                          f"coalesced requests {r['coalesced_requests']}")
+                if viewer is not None:
+                    per_message = r["viewer_bytes"] / r["viewer_messages"] if r["viewer_messages"] else 0.0
+                    print(f"  viewer messages {r['viewer_messages'] / r['seconds']:.1f}/s  "
+                          f"{per_message:.1f} bytes/message  {r['viewer_bytes'] / r['seconds']:.0f} bytes/s")
+                for line in r["stages"].splitlines():
+                    print(f"  {line}")
+    if server is not None:
+        server.stop()
+    if viewer is not None:
+        viewer.close()
+        stop_browser_source()
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PNGTuber lip sync controller for OBS")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without the GUI using the settings from the config file")
+    parser.add_argument("--config", default=CONFIG_FILE, help="path to the config file")
+    parser.add_argument("--calibrate", type=float, nargs="?", const=CALIBRATION_SECONDS, metavar="SECONDS",
+                        help="headless: learn the threshold from SECONDS of silence then speech at startup")
+    parser.add_argument("--offline", metavar="AUDIO_FILE",
+                        help="render a mouth/bobbing keyframe timeline from a WAV (or FLAC with soundfile) file and exit")
+    parser.add_argument("--output", help="timeline output path (.json or .csv) for --offline")
+    parser.add_argument("--fps", type=float, help="animation frame rate for --offline (default: config or 60)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="drive the pipeline with synthetic audio against a mock OBS and report timings")
+    parser.add_argument("--bench-seconds", type=float, default=3.0, help="seconds of audio per benchmark run")
+    parser.add_argument("--bench-latency-ms", type=float, default=2.0, help="mock OBS round-trip latency")
+    parser.add_argument("--bench-profile", choices=list(LATENCY_PROFILES) + ["all"], default=LATENCY_PROFILE,
+                        help="audio latency profile to benchmark (default: %(default)s)")
+    parser.add_argument("--bench-transport", choices=["mock", "standin", "browser"], default="mock",
+                        help="benchmark against the in-process mock (synchronous batches), the local "
+                             "obs-websocket stand-in (pipelined output) or the browser source server")
+    parser.add_argument("--benchmark-obs", action="store_true",
+                        help="compare synchronous and pipelined OBS request throughput against the local stand-in")
+    parser.add_argument("--obs-standin", type=int, nargs="?", const=OBS_PORT, metavar="PORT",
+                        help="run a local obs-websocket v5 stand-in server (for testing without OBS) and exit on Ctrl+C")
+    parser.add_argument("--benchmark-eq", action="store_true", help="benchmark the equalizer and exit")
+    parser.add_argument("--benchmark-analysis", action="store_true",
+                        help="benchmark the audio analysis path and exit")
+    parser.add_argument("--benchmark-visemes", action="store_true",
+                        help="benchmark the spectral viseme classifier and exit")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    global CONFIG_FILE
+    args = parse_args(argv)
+    if args.benchmark_eq:
+        for rate in (16000, 48000, 96000):
+            benchmark_equalizer(sample_rate=rate)
+        return 0
+    if args.benchmark_analysis:
+        for rate in (16000, 48000, 96000):
+            benchmark_analysis(sample_rate=rate)
+        low_block = LATENCY_PROFILES["low"]["analysis_block"]
+        benchmark_analysis(block_size=low_block, host_frames=[192, 441, 256, 600, 128])
+        for rate in (16000, 48000, 96000):
+            benchmark_gate(block_size=low_block, sample_rate=rate)
+        return 0
+    if args.benchmark_visemes:
+        for rate in (16000, 48000, 96000):
+            benchmark_visemes(sample_rate=rate)
+        return 0
+    if args.benchmark:
+        profiles = list(LATENCY_PROFILES) if args.bench_profile == "all" else [args.bench_profile]
+        return run_benchmark(args.bench_seconds, args.bench_latency_ms, profiles=profiles,
+                             transport=args.bench_transport)
+    if args.benchmark_obs:
+        return benchmark_obs_transport(latency_ms=args.bench_latency_ms)
+    if args.obs_standin is not None:
+        return run_obs_standin(args.obs_standin, args.bench_latency_ms)
+    CONFIG_FILE = args.config
     print("Starting Lipsync Controller...")
     load_config()
-    connect_obs()
+    update_analysis_block()
+    update_viseme_bands()
+    update_mouth_gate()
+    if args.offline:
+        return run_offline(args.offline, args.output, args.fps)
+    if args.headless or args.calibrate:
+        return run_headless(args.calibrate)
+    start_startup_tasks()
     start_gui()
+    shutdown()
+    return 0
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\nShutting down...")
-        if stream and stream.active:
-            stream.stop()
-            stream.close()
+        shutdown()
         sys.exit(0)